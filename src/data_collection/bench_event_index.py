@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from event_index import EventIndex, filter_events_for_deployment, filter_events_for_node, filter_events_for_pod
+
+# Microbenchmark: per-object event filtering over a synthetic cycle,
+# linear scans over the event list vs. lookups in an EventIndex.
+
+
+def make_cycle(n_events, n_pods, n_nodes, n_deployments, seed=0):
+    rng = random.Random(seed)
+    namespaces = [f"ns-{i}" for i in range(20)]
+    pods = [(rng.choice(namespaces), f"pod-{i}") for i in range(n_pods)]
+    nodes = [f"node-{i}" for i in range(n_nodes)]
+    deployments = [(rng.choice(namespaces), f"deploy-{i}") for i in range(n_deployments)]
+
+    events = []
+    for i in range(n_events):
+        kind = rng.choices(["Pod", "Node", "Deployment"], weights=[8, 1, 1])[0]
+        if kind == "Pod":
+            namespace, name = rng.choice(pods)
+        elif kind == "Node":
+            namespace, name = "", rng.choice(nodes)
+        else:
+            namespace, name = rng.choice(deployments)
+        involved = SimpleNamespace(kind=kind, namespace=namespace, name=name)
+        events.append(SimpleNamespace(involved_object=involved, message=f"event {i}"))
+    return events, pods, nodes, deployments
+
+
+def filter_all(events, pods, nodes, deployments):
+    return (
+        [filter_events_for_pod(events, namespace, name) for namespace, name in pods],
+        [filter_events_for_node(events, name) for name in nodes],
+        [filter_events_for_deployment(events, namespace, name) for namespace, name in deployments],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark linear event filters against EventIndex.")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--pods", type=int, default=5000)
+    parser.add_argument("--nodes", type=int, default=50)
+    parser.add_argument("--deployments", type=int, default=500)
+    args = parser.parse_args()
+
+    events, pods, nodes, deployments = make_cycle(args.events, args.pods, args.nodes, args.deployments)
+    print(f"{len(events)} events, {len(pods)} pods, {len(nodes)} nodes, {len(deployments)} deployments")
+
+    start = time.perf_counter()
+    linear = filter_all(events, pods, nodes, deployments)
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = EventIndex(events)
+    build_time = time.perf_counter() - start
+    indexed = filter_all(index, pods, nodes, deployments)
+    indexed_time = time.perf_counter() - start
+
+    assert linear == indexed, "EventIndex results differ from the linear filters"
+    print(f"linear scans : {linear_time * 1000:10.1f} ms")
+    print(f"event index  : {indexed_time * 1000:10.1f} ms (build {build_time * 1000:.1f} ms)")
+    print(f"speed-up     : {linear_time / indexed_time:10.1f}x")
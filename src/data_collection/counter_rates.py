@@ -0,0 +1,122 @@
+import re
+import time
+
+from promql_bulk import GROUP_LABELS, _derivations, _drop_matchers
+
+# Client-side rate() for counter queries.
+#
+# Templates of the form  sum(rate(<selector>[<range>])) [or vector(c)]  are
+# answered without a range evaluation in Prometheus: each cycle fetches the raw
+# counter series and their sample timestamps with two instant queries, and the
+# per-second rate of every series is computed from its previous sample kept
+# here. Counter resets (a value lower than the previous one, e.g. after a
+# container restart) count from zero, as rate() does. Series rates are then
+# summed per object in memory.
+
+_RATE_TEMPLATE_RE = re.compile(
+    r'^\s*sum\s*\(\s*rate\s*\(\s*(?P<selector>[A-Za-z_:][\w:]*\s*(?:\{(?:[^}"]|"[^"]*")*\})?)\s*\[[^\]]+\]\s*\)\s*\)'
+    r"\s*(?:or\s+vector\(\s*(?P<default>[-+0-9.eE]+)\s*\))?\s*$",
+    re.IGNORECASE,
+)
+
+
+def split_rate_template(template):
+    """(selector, default) if `template` is a plain sum of one rate(), else None."""
+    match = _RATE_TEMPLATE_RE.match(template)
+    if not match:
+        return None
+    default = match.group("default")
+    return match.group("selector").strip(), float(default) if default is not None else None
+
+
+def raw_queries(selector, placeholder):
+    """Instant queries for every series of the counter and for their sample timestamps."""
+    selector = _drop_matchers(selector, placeholder) if placeholder in selector else selector
+    return selector, f"timestamp({selector})"
+
+
+def _series_labels(result):
+    return frozenset((k, v) for k, v in result.get("metric", {}).items() if k != "__name__")
+
+
+class CounterRates:
+    """
+    Previous sample of every counter series, keyed by (metric, labels).
+    Series not scraped for `max_age` seconds are forgotten.
+    """
+
+    def __init__(self, max_age=600):
+        self.max_age = max_age
+        self.samples = {}
+        self.primed = set()
+        self.last_evict = time.monotonic()
+
+    def update(self, metric, value_results, timestamp_results):
+        """
+        Record one scrape of `metric` and return [(labels, rate)] for every
+        series with an earlier sample. A series whose sample has not changed
+        since the last scrape keeps its last rate.
+        """
+        sample_times = {_series_labels(r): float(r["value"][1]) for r in timestamp_results}
+        rates = []
+        for result in value_results:
+            labels = _series_labels(result)
+            value = float(result["value"][1])
+            sample_time = sample_times.get(labels, float(result["value"][0]))
+
+            key = (metric, labels)
+            previous = self.samples.get(key)
+            if previous is None:
+                self.samples[key] = (sample_time, value, None)
+                continue
+
+            last_time, last_value, last_rate = previous
+            if sample_time <= last_time:
+                rate = last_rate
+            else:
+                delta = value - last_value
+                if delta < 0:
+                    delta = value
+                rate = delta / (sample_time - last_time)
+            self.samples[key] = (max(sample_time, last_time), value, rate)
+            if rate is not None:
+                rates.append((dict(labels), rate))
+
+        self.primed.add(metric)
+        self._evict()
+        return rates
+
+    def _evict(self):
+        now = time.monotonic()
+        if now - self.last_evict < self.max_age:
+            return
+        self.last_evict = now
+        cutoff = time.time() - self.max_age
+        for key in [key for key, (sample_time, _, _) in self.samples.items() if sample_time < cutoff]:
+            del self.samples[key]
+
+
+def object_key(labels, template, placeholder):
+    """Object key (GROUP_LABELS order) a series belongs to, or None if it matches no object."""
+    group_labels = GROUP_LABELS[placeholder]
+    target = group_labels[-1]
+    key = {label: labels.get(label) for label in group_labels}
+    for source, regex in _derivations(template, placeholder, target):
+        match = re.fullmatch(regex, labels.get(source, ""))
+        if not match:
+            return None
+        key[target] = match.group(1)
+    if any(value is None for value in key.values()):
+        return None
+    return tuple(key[label] for label in group_labels)
+
+
+def sum_by_object(rates, template, placeholder):
+    """{object key: summed rate}; cluster-wide templates sum into the key None."""
+    totals = {}
+    for labels, rate in rates:
+        key = object_key(labels, template, placeholder) if placeholder in template else None
+        if key is None and placeholder in template:
+            continue
+        totals[key] = totals.get(key, 0.0) + rate
+    return totals
@@ -0,0 +1,68 @@
+import json
+import os
+import re
+
+# Error classification rules for events and log lines, loaded from
+# error_rules.json.
+#
+# The file maps an object kind ("pod", "node", "deployment", "log") to rules
+# of the form {"error": <label>, "patterns": [<substring>, ...]}; a kind may
+# also be {"ignore_case": true, "rules": [...]}. All patterns of a kind are
+# compiled into one regex, so a message is scanned once however many rules
+# there are. The regex is a lookahead alternation tried at each position,
+# longest pattern first; a match also counts every shorter pattern it
+# contains, so the result is the same as testing each substring separately.
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "error_rules.json")
+
+
+class PatternMatcher:
+    """Labels of every rule with a pattern occurring in a text, in rule order."""
+
+    def __init__(self, rules, ignore_case=False):
+        self.errors = []
+        labels_by_pattern = {}
+        for rule in rules:
+            error = rule["error"]
+            if error not in self.errors:
+                self.errors.append(error)
+            for pattern in rule["patterns"]:
+                labels_by_pattern.setdefault(pattern.lower() if ignore_case else pattern, set()).add(error)
+
+        order = {error: i for i, error in enumerate(self.errors)}
+        # A pattern found in the text implies each pattern it contains
+        self.labels = {
+            pattern: sorted({error for other, errors in labels_by_pattern.items() if other in pattern for error in errors},
+                            key=order.get)
+            for pattern in labels_by_pattern
+        }
+        self.ignore_case = ignore_case
+
+        alternation = "|".join(re.escape(p) for p in sorted(labels_by_pattern, key=len, reverse=True))
+        self.regex = re.compile(f"(?=({alternation}))", re.IGNORECASE if ignore_case else 0) if alternation else None
+
+    def search(self, text):
+        """True if any pattern occurs in `text`."""
+        return bool(text) and self.regex is not None and self.regex.search(text) is not None
+
+    def classify(self, text):
+        if not text or self.regex is None:
+            return []
+        found = set()
+        for match in self.regex.finditer(text):
+            pattern = match.group(1)
+            found.update(self.labels[pattern.lower() if self.ignore_case else pattern])
+        return [error for error in self.errors if error in found]
+
+
+def load_rules(path=RULES_PATH):
+    """{kind: PatternMatcher} from a rules file."""
+    with open(path) as f:
+        config = json.load(f)
+    matchers = {}
+    for kind, spec in config.items():
+        if isinstance(spec, dict):
+            matchers[kind] = PatternMatcher(spec["rules"], spec.get("ignore_case", False))
+        else:
+            matchers[kind] = PatternMatcher(spec)
+    return matchers
@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+# Involved objects that are not namespaced; their events are matched on name only
+CLUSTER_SCOPED_KINDS = {"Node"}
+
+
+class EventIndex:
+    """
+    A cycle's events grouped by the (kind, namespace, name) of their
+    involved object. Built once per cycle so each per-object lookup is a
+    dictionary hit instead of a scan over every event.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.index = defaultdict(list)
+        for event in events:
+            obj = event.involved_object
+            namespace = None if obj.kind in CLUSTER_SCOPED_KINDS else obj.namespace
+            self.index[(obj.kind, namespace, obj.name)].append(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def get(self, kind, namespace, name):
+        return list(self.index.get((kind, namespace, name), []))
+
+
+# The filters accept either a plain list of events (linear scan) or an EventIndex.
+
+def filter_events_for_node(events, node_name):
+    if isinstance(events, EventIndex):
+        return events.get("Node", None, node_name)
+    node_related_events = []
+    for event in events:
+        obj = event.involved_object
+        if obj.kind == "Node" and obj.name == node_name:
+            node_related_events.append(event)
+    return node_related_events
+
+def filter_events_for_deployment(events, namespace, deployment_name):
+    if isinstance(events, EventIndex):
+        return events.get("Deployment", namespace, deployment_name)
+    deployment_related_events = []
+    for event in events:
+        obj = event.involved_object
+        if (obj.kind == "Deployment" and
+            obj.name == deployment_name and
+            obj.namespace == namespace):
+            deployment_related_events.append(event)
+
+    return deployment_related_events
+
+def filter_events_for_pod(events, namespace, pod_name):
+    if isinstance(events, EventIndex):
+        return events.get("Pod", namespace, pod_name)
+    pod_related_events = []
+    for event in events:
+        obj = event.involved_object
+        if (obj.kind == "Pod" and
+            obj.name == pod_name and
+            obj.namespace == namespace):
+            pod_related_events.append(event)
+
+    return pod_related_events
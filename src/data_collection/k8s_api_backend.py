@@ -0,0 +1,269 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from kubernetes import client, config
+from kubernetes.client.rest import ApiException
+from kubernetes.config.config_exception import ConfigException
+from kubernetes.utils import parse_quantity
+
+from log_follower import LogFollower
+
+# In-process replacement for the kubectl calls of the v1-v3 generators.
+#
+# One cycle is one LIST each of pods, deployments and events plus the
+# metrics.k8s.io pod metrics (what `kubectl top pod` reads). Network and disk
+# counters come from each node's kubelet cAdvisor endpoint, read once per
+# node through the API server proxy, and logs are followed incrementally per
+# pod (log_follower.py). Resource changes are patches of the listed pods
+# instead of `kubectl apply`. No processes are started; the rows have the same
+# columns and units as the kubectl-based get_trainable_params().
+
+LOG_TAIL_LINES = 10
+
+_CADVISOR_METRICS = {
+    "container_network_transmit_bytes_total": "network",
+    "container_fs_reads_bytes_total": "disk",
+    "container_fs_writes_bytes_total": "disk",
+}
+
+
+def load_config():
+    """In-cluster config when running in a pod, else the current kubeconfig context (as kubectl)."""
+    try:
+        config.load_incluster_config()
+    except ConfigException:
+        config.load_kube_config()
+
+
+def cpu_millicores(quantity):
+    return int(parse_quantity(quantity) * 1000) if quantity else 0
+
+
+def memory_mib(quantity):
+    return int(parse_quantity(quantity) / 2 ** 20) if quantity else 0
+
+
+def _parse_labels(text):
+    labels = {}
+    for part in text.split('",'):
+        name, _, value = part.partition('="')
+        labels[name.strip().lstrip(",")] = value.rstrip('"')
+    return labels
+
+
+def parse_cadvisor(text):
+    """{(namespace, pod): {"network": KB transmitted on eth0, "disk": KB read + written}}."""
+    totals = {}
+    for line in text.splitlines():
+        name, brace, rest = line.partition("{")
+        kind = _CADVISOR_METRICS.get(name)
+        if kind is None or not brace:
+            continue
+        label_text, _, value_text = rest.rpartition("}")
+        labels = _parse_labels(label_text)
+        if kind == "network" and labels.get("interface", "eth0") != "eth0":
+            continue
+        # Disk I/O is also reported for the pod cgroup (container="") and the
+        # sandbox (container="POD"); only the containers' series are summed
+        if kind == "disk" and labels.get("container", "") in ("", "POD"):
+            continue
+        key = (labels.get("namespace"), labels.get("pod"))
+        if not key[1]:
+            continue
+        try:
+            value = float(value_text.split()[0])
+        except (IndexError, ValueError):
+            continue
+        pod_totals = totals.setdefault(key, {"network": 0.0, "disk": 0.0})
+        pod_totals[kind] += value / 1024
+    return totals
+
+
+def _age(timestamp, now):
+    if timestamp is None:
+        return "<unknown>"
+    seconds = int((now - timestamp).total_seconds())
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= 2 * size:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def format_events(events, now):
+    """Events as the table `kubectl get events --sort-by=.lastTimestamp` prints."""
+    if not events:
+        return ""
+    events = sorted(events, key=lambda e: e.last_timestamp or e.event_time or now)
+    rows = [("LAST SEEN", "TYPE", "REASON", "OBJECT", "MESSAGE")]
+    for event in events:
+        obj = event.involved_object
+        rows.append((_age(event.last_timestamp or event.event_time, now), event.type or "", event.reason or "",
+                     f"{(obj.kind or '').lower()}/{obj.name}", (event.message or "").strip()))
+    widths = [max(len(row[i]) for row in rows) for i in range(4)]
+    return "\n".join("   ".join(cell.ljust(width) for cell, width in zip(row[:4], widths)) + "   " + row[4]
+                     for row in rows)
+
+
+def pod_details(pod):
+    """Same keys as the kubectl-based get_pod_details()."""
+    cpu_limit = memory_limit = cpu_request = memory_request = 0
+    for container in pod.spec.containers or []:
+        resources = container.resources
+        limits = (resources and resources.limits) or {}
+        requests = (resources and resources.requests) or {}
+        cpu_limit += cpu_millicores(limits.get("cpu"))
+        memory_limit += memory_mib(limits.get("memory"))
+        cpu_request += cpu_millicores(requests.get("cpu"))
+        memory_request += memory_mib(requests.get("memory"))
+
+    statuses = pod.status.container_statuses or []
+    return {
+        "cpu_limit": cpu_limit,
+        "memory_limit": memory_limit,
+        "cpu_request": cpu_request,
+        "memory_request": memory_request,
+        "restart_count": statuses[0].restart_count if statuses else 0,
+        "pod_status": pod.status.phase or "unknown",
+        "node_name": pod.spec.node_name or "unknown",
+    }
+
+
+def deployment_metrics(deployments, pod):
+    """Same keys as the kubectl-based get_deployment_metrics(): first deployment whose matchLabels select the pod."""
+    labels = pod.metadata.labels or {}
+    for deployment in deployments:
+        if deployment.metadata.namespace != pod.metadata.namespace:
+            continue
+        selector = (deployment.spec.selector and deployment.spec.selector.match_labels) or {}
+        if selector and selector.items() <= labels.items():
+            conditions = deployment.status.conditions or []
+            return {
+                "deployment_name": deployment.metadata.name,
+                "replicas": deployment.spec.replicas or 0,
+                "available_replicas": deployment.status.available_replicas or 0,
+                "deployment_status": conditions[0].type if conditions else "unknown",
+            }
+    return {}
+
+
+class ApiBackend:
+    """
+    Builds the generators' per-pod rows from bulk API reads. `details` adds
+    the v3 columns (limits, requests, status, deployment, events) and `logs`
+    the log_lines / error_count columns.
+    """
+
+    def __init__(self, max_workers=8):
+        load_config()
+        self.core = client.CoreV1Api()
+        self.apps = client.AppsV1Api()
+        self.custom = client.CustomObjectsApi()
+        self.logs = LogFollower(self.core, tail_lines=LOG_TAIL_LINES)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="k8s-api")
+        # Pods of the last trainable_params() LIST, by (namespace, name)
+        self.pods = {}
+
+    def pod_usage(self):
+        """{(namespace, pod): (cpu millicores, memory MiB)} from metrics.k8s.io, summed over containers."""
+        result = self.custom.list_cluster_custom_object("metrics.k8s.io", "v1beta1", "pods")
+        usage = {}
+        for item in result.get("items", []):
+            metadata = item["metadata"]
+            containers = item.get("containers", [])
+            usage[(metadata["namespace"], metadata["name"])] = (
+                sum(cpu_millicores(c["usage"].get("cpu")) for c in containers),
+                sum(memory_mib(c["usage"].get("memory")) for c in containers),
+            )
+        return usage
+
+    def node_io(self, nodes):
+        """parse_cadvisor() totals of every pod, one kubelet read per node."""
+        def read(node):
+            try:
+                return parse_cadvisor(self.core.connect_get_node_proxy_with_path(node, "metrics/cadvisor"))
+            except ApiException as e:
+                print(f"[WARNING] Could not read cAdvisor metrics of node {node}: {e.status} {e.reason}")
+                return {}
+
+        totals = {}
+        for node_totals in self.pool.map(read, nodes):
+            totals.update(node_totals)
+        return totals
+
+    def pod_logs(self, namespace, pod_name, pod):
+        """(recent lines, running error count) after reading the pod's new log lines."""
+        containers = [container.name for container in pod.spec.containers or []] if pod is not None else None
+        state = self.logs.poll(namespace, pod_name, containers)
+        return "\n".join(state.recent), state.error_count
+
+    def set_pod_resources(self, namespace, pod_name, limits, requests):
+        """
+        Patches the limits and requests ({"cpu": "100m", "memory": "128Mi"})
+        of the pod's first container, the one-container Pod the generators'
+        `kubectl apply` described. False when the API server rejects it.
+        """
+        pod = self.pods.get((namespace, pod_name))
+        containers = (pod.spec.containers or []) if pod is not None else []
+        container = containers[0].name if containers else pod_name
+        body = {"spec": {"containers": [{"name": container, "resources": {"limits": limits, "requests": requests}}]}}
+        try:
+            self.core.patch_namespaced_pod(pod_name, namespace, body)
+        except ApiException as e:
+            print(f"[WARNING] Could not update resources of pod {pod_name} in {namespace}: {e.status} {e.reason}")
+            return False
+        return True
+
+    def trainable_params(self, timestamp, details=False, logs=False):
+        usage = self.pod_usage()
+        pods = {(pod.metadata.namespace, pod.metadata.name): pod
+                for pod in self.core.list_pod_for_all_namespaces(watch=False).items}
+        self.pods = pods
+        io = self.node_io(sorted({pod.spec.node_name for pod in pods.values() if pod.spec.node_name}))
+
+        log_results = {}
+        if logs:
+            log_results = dict(zip(usage, self.pool.map(lambda key: self.pod_logs(*key, pods.get(key)), usage)))
+            self.logs.retain(usage)
+
+        deployments = []
+        events_by_pod = {}
+        now = datetime.now(timezone.utc)
+        if details:
+            deployments = self.apps.list_deployment_for_all_namespaces(watch=False).items
+            for event in self.core.list_event_for_all_namespaces(watch=False).items:
+                key = (event.involved_object.namespace, event.involved_object.name)
+                events_by_pod.setdefault(key, []).append(event)
+
+        rows = []
+        for (namespace, pod_name), (cpu, mem) in usage.items():
+            pod_io = io.get((namespace, pod_name), {})
+            row = {
+                "timestamp": timestamp,
+                "namespace": namespace,
+                "pod_name": pod_name,
+                "cpu_usage_millicores": cpu,
+                "memory_usage_mib": mem,
+            }
+            pod = pods.get((namespace, pod_name))
+            info = pod_details(pod) if details and pod is not None else {}
+            if details:
+                row.update({
+                    "cpu_limit_millicores": info.get("cpu_limit", 0),
+                    "memory_limit_mib": info.get("memory_limit", 0),
+                    "cpu_request_millicores": info.get("cpu_request", 0),
+                    "memory_request_mib": info.get("memory_request", 0),
+                })
+            row["network_io_kbps"] = pod_io.get("network", 0.0)
+            row["disk_io_kbps"] = pod_io.get("disk", 0)
+            if logs:
+                row["log_lines"], row["error_count"] = log_results[(namespace, pod_name)]
+            if details:
+                row.update({
+                    "restart_count": info.get("restart_count", 0),
+                    "pod_status": info.get("pod_status", "unknown"),
+                    "node_name": info.get("node_name", "unknown"),
+                    **(deployment_metrics(deployments, pod) if pod is not None else {}),
+                    "event_logs": format_events(events_by_pod.get((namespace, pod_name), []), now),
+                })
+            rows.append(row)
+        return rows
@@ -0,0 +1,317 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from kubernetes import client, watch
+from kubernetes.client.rest import ApiException
+
+from owner_refs import build_pod_deployment_map, controller_of
+
+
+class _Watcher:
+    """
+    LIST once, then follow a watch resumed from the last resourceVersion on
+    a background thread, relisting when the API server answers 410 Gone.
+    Subclasses handle the listed items and the watch events.
+    """
+
+    def __init__(self, list_func, name, watch_timeout=300, retry_delay=5):
+        self.list_func = list_func
+        self.name = name
+        self.watch_timeout = watch_timeout
+        self.retry_delay = retry_delay
+        self.resource_version = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def on_list(self, items):
+        raise NotImplementedError
+
+    def on_event(self, event_type, obj):
+        raise NotImplementedError
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.resource_version is None:
+                    self._list()
+                self._watch()
+            except ApiException as e:
+                if e.status == 410:
+                    # resourceVersion too old, start again from a fresh LIST
+                    self.resource_version = None
+                else:
+                    print(f"[WARNING] {self.name} watch failed: {e.status} {e.reason}")
+                    self._stop.wait(self.retry_delay)
+            except Exception as e:
+                print(f"[WARNING] {self.name} watch interrupted: {e}")
+                self._stop.wait(self.retry_delay)
+
+    def _list(self):
+        result = self.list_func(watch=False)
+        self.on_list(result.items)
+        self.resource_version = result.metadata.resource_version
+
+    def _watch(self):
+        stream = watch.Watch()
+        for item in stream.stream(self.list_func,
+                                  resource_version=self.resource_version,
+                                  timeout_seconds=self.watch_timeout,
+                                  allow_watch_bookmarks=True):
+            if self._stop.is_set():
+                stream.stop()
+                return
+
+            obj = item["object"]
+            if item["type"] == "ERROR":
+                if isinstance(obj, dict) and obj.get("code") == 410:
+                    self.resource_version = None
+                    stream.stop()
+                    return
+                continue
+
+            self.resource_version = obj.metadata.resource_version
+            if item["type"] != "BOOKMARK":
+                self.on_event(item["type"], obj)
+
+
+def _numeric_resource_version(obj):
+    # Opaque by contract, but an etcd revision (an integer) in practice
+    resource_version = obj.metadata.resource_version
+    return int(resource_version) if resource_version and resource_version.isdigit() else None
+
+
+def _event_time(event):
+    series = event.series
+    return (event.last_timestamp or (series and series.last_observed_time) or event.event_time
+            or event.metadata.creation_timestamp)
+
+
+def _newer_event(event, last_resource_version, last_time):
+    """Whether `event` was created or updated after the last one handled."""
+    resource_version = _numeric_resource_version(event)
+    if resource_version is not None and last_resource_version is not None:
+        return resource_version > last_resource_version
+    event_time = _event_time(event)
+    return last_time is None or event_time is None or event_time > last_time
+
+
+class EventStream(_Watcher):
+    """
+    Follows cluster events so each cycle only pays for events that are new.
+
+    New event UIDs are pushed into a bounded queue (the oldest queued event
+    is dropped when it is full) and seen UIDs are forgotten after `uid_ttl`
+    seconds. Call drain() once per collection cycle.
+
+    A relist after 410 Gone returns every event the API server still keeps,
+    including ones whose UIDs have expired, so listed events are only taken
+    when they are newer than the last event handled: by resourceVersion, or
+    by event time where a resourceVersion is not numeric.
+    """
+
+    def __init__(self, max_queue=10000, uid_ttl=7200, **kwargs):
+        super().__init__(client.CoreV1Api().list_event_for_all_namespaces, "k8s-event-stream", **kwargs)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.uid_ttl = uid_ttl
+        self.seen_uids = OrderedDict()
+        self.last_resource_version = None
+        self.last_time = None
+        self.dropped = 0
+
+    def drain(self):
+        """Return the events received since the last call."""
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def on_list(self, items):
+        # Compared against the events handled before this LIST, not during it
+        last_resource_version, last_time = self.last_resource_version, self.last_time
+        for event in items:
+            if _newer_event(event, last_resource_version, last_time):
+                self._offer(event)
+
+    def on_event(self, event_type, obj):
+        if event_type in ("ADDED", "MODIFIED"):
+            self._offer(obj)
+
+    def _offer(self, event):
+        resource_version = _numeric_resource_version(event)
+        if resource_version is not None:
+            self.last_resource_version = max(resource_version, self.last_resource_version or 0)
+        event_time = _event_time(event)
+        if event_time is not None and (self.last_time is None or event_time > self.last_time):
+            self.last_time = event_time
+
+        now = time.monotonic()
+        while self.seen_uids and next(iter(self.seen_uids.values())) < now - self.uid_ttl:
+            self.seen_uids.popitem(last=False)
+
+        uid = event.metadata.uid
+        if uid in self.seen_uids:
+            return
+        self.seen_uids[uid] = now
+
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class Informer(_Watcher):
+    """
+    Local copy of one resource type kept current by a watch. Only the
+    `project(obj)` view of each object is stored, keyed by namespace/name.
+
+    With a `fingerprint(obj)` function, keys of existing objects whose
+    fingerprint changed are collected for drain_changed().
+    """
+
+    def __init__(self, list_func, project, name, fingerprint=None, **kwargs):
+        super().__init__(list_func, name, **kwargs)
+        self.project = project
+        self.fingerprint = fingerprint
+        self.store = {}
+        self.fingerprints = {}
+        self.changed = set()
+        self.lock = threading.Lock()
+        self.synced = threading.Event()
+
+    @staticmethod
+    def _key(obj):
+        return (obj.metadata.namespace, obj.metadata.name)
+
+    def on_list(self, items):
+        store = {self._key(obj): self.project(obj) for obj in items}
+        fingerprints = {self._key(obj): self.fingerprint(obj) for obj in items} if self.fingerprint else {}
+        with self.lock:
+            self.store = store
+            for key, fingerprint in fingerprints.items():
+                if key in self.fingerprints and self.fingerprints[key] != fingerprint:
+                    self.changed.add(key)
+            self.fingerprints = fingerprints
+        self.synced.set()
+
+    def on_event(self, event_type, obj):
+        key = self._key(obj)
+        with self.lock:
+            if event_type == "DELETED":
+                self.store.pop(key, None)
+                self.fingerprints.pop(key, None)
+            else:
+                self.store[key] = self.project(obj)
+                if self.fingerprint:
+                    fingerprint = self.fingerprint(obj)
+                    if key in self.fingerprints and self.fingerprints[key] != fingerprint:
+                        self.changed.add(key)
+                    self.fingerprints[key] = fingerprint
+
+    def drain_changed(self):
+        """(namespace, name) keys whose fingerprint changed since the last call."""
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def items(self):
+        with self.lock:
+            return list(self.store.values())
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.store)
+
+
+def _pod_resources(pod):
+    return [(c.name, c.resources and c.resources.limits, c.resources and c.resources.requests)
+            for c in pod.spec.containers or []]
+
+
+def _node_resources(node):
+    status = node.status
+    return (status and status.capacity, status and status.allocatable, node.spec and node.spec.unschedulable)
+
+
+def _deployment_generation(deployment):
+    # metadata.generation is bumped on every spec change
+    return deployment.metadata.generation
+
+
+class ClusterCache:
+    """
+    Shared in-process cache of pods, nodes, deployments and replicasets: one
+    LIST per resource at start-up, then watches. get_pods(), get_nodes() and
+    get_deployments() return the same tuples as the collector's
+    get_k8s_pods(), get_k8s_nodes() and get_k8s_deployments().
+    """
+
+    def __init__(self, **kwargs):
+        core = client.CoreV1Api()
+        apps = client.AppsV1Api()
+        self.pods = Informer(core.list_pod_for_all_namespaces,
+                             lambda pod: (pod.metadata.namespace, pod.metadata.name, pod.spec.node_name, controller_of(pod)),
+                             "k8s-pod-cache", fingerprint=_pod_resources, **kwargs)
+        self.nodes = Informer(core.list_node,
+                              lambda node: node.metadata.name,
+                              "k8s-node-cache", fingerprint=_node_resources, **kwargs)
+        self.deployments = Informer(apps.list_deployment_for_all_namespaces,
+                                    lambda deployment: (deployment.metadata.namespace, deployment.metadata.name),
+                                    "k8s-deployment-cache", fingerprint=_deployment_generation, **kwargs)
+        self.replicasets = Informer(apps.list_replica_set_for_all_namespaces,
+                                    controller_of,
+                                    "k8s-replicaset-cache", **kwargs)
+        self.informers = [self.pods, self.nodes, self.deployments, self.replicasets]
+
+    def start(self, sync_timeout=60):
+        for informer in self.informers:
+            informer.start()
+        for informer in self.informers:
+            if not informer.synced.wait(sync_timeout):
+                print(f"[WARNING] {informer.name} not synced after {sync_timeout}s")
+        return self
+
+    def stop(self):
+        for informer in self.informers:
+            informer.stop()
+
+    def get_pods(self):
+        return [pod[:3] for pod in self.pods.items()]
+
+    def get_nodes(self):
+        return self.nodes.items()
+
+    def get_deployments(self):
+        return self.deployments.items()
+
+    def get_pod_deployments(self):
+        """{(namespace, pod): "namespace/deployment"} from ownerReferences."""
+        pod_owners = {(namespace, name): owner for namespace, name, _, owner in self.pods.items()}
+        return build_pod_deployment_map(pod_owners, self.replicasets.snapshot())
+
+    def drain_spec_changes(self):
+        """
+        {"pod": [(namespace, pod)], "node": [(node,)], "deployment": [(namespace, deployment)]}
+        whose resources or spec changed since the last call.
+        """
+        return {
+            "pod": list(self.pods.drain_changed()),
+            "node": [(name,) for _, name in self.nodes.drain_changed()],
+            "deployment": list(self.deployments.drain_changed()),
+        }
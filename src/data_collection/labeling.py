@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from error_rules import load_rules
+from event_index import EventIndex
+from metric_schema import DEPLOYMENT_ERRORS, FLAG_DTYPE, NODE_FLAGS, POD_FLAGS
+from threshold_rules import ThresholdFile, numeric_column
+
+# Error labels of a whole cycle at once.
+#
+# label_frame() evaluates the threshold rules of threshold_rules.json (one
+# NumPy comparison per rule over a column of the cycle's DataFrame, with
+# per-namespace / workload-class thresholds) and ORs in the labels of the
+# cycle's events (error_rules.json), walking the EventIndex once instead of
+# filtering it per object. The result is one uint8 column per label, aligned
+# with the frame.
+#
+# check_pod_error / check_node_error / check_deployment_error evaluate the same
+# rules for a single object and are kept for per-object callers and as the
+# reference the vectorized path is benchmarked against (bench_labeling.py).
+#
+# The rule file is reloaded when it changes, so thresholds can be tuned
+# without restarting a collector; callers take THRESHOLDS.current() once per
+# cycle and pass it along so a cycle is labeled with one table.
+
+# Label columns of each kind, in output order
+LABELS = {"pod": POD_FLAGS, "node": NODE_FLAGS, "deployment": DEPLOYMENT_ERRORS}
+
+# involved_object.kind of the events of each kind
+EVENT_KINDS = {"pod": "Pod", "node": "Node", "deployment": "Deployment"}
+
+# Event message patterns per object kind, each kind compiled into one matcher
+# so a message is scanned once
+ERROR_RULES = load_rules()
+
+THRESHOLDS = ThresholdFile()
+
+
+def threshold_errors(kind, metrics, table=None, attributes=None):
+    """Labels of the threshold rules of `kind` tripped by one object's metrics, in rule order."""
+    return (table or THRESHOLDS.current()).errors(kind, metrics, attributes)
+
+
+def check_errors(kind, metrics, events, table=None, attributes=None):
+    errors = threshold_errors(kind, metrics, table, attributes)
+    for event in events:
+        errors.extend(ERROR_RULES[kind].classify(event.message))
+    return errors
+
+
+def check_node_error(metrics, events, table=None, attributes=None):
+    return check_errors("node", metrics, events, table, attributes)
+
+
+def check_pod_error(metrics, events, table=None, attributes=None):
+    return check_errors("pod", metrics, events, table, attributes)
+
+
+def check_deployment_error(metrics, events, table=None, attributes=None):
+    return check_errors("deployment", metrics, events, table, attributes)
+
+
+def event_flags(kind, events, keys, labels=None):
+    """
+    uint8 matrix of shape (len(keys), len(labels)): 1 where an event of the
+    object in that row carries the label. `keys` are (namespace, name) per
+    row, with namespace None for nodes.
+    """
+    labels = LABELS[kind] if labels is None else labels
+    flags = np.zeros((len(keys), len(labels)), dtype=FLAG_DTYPE)
+    if not events:
+        return flags
+    if not isinstance(events, EventIndex):
+        events = EventIndex(events)
+
+    rows = {tuple(key): i for i, key in enumerate(keys)}
+    columns = {label: j for j, label in enumerate(labels)}
+    matcher = ERROR_RULES[kind]
+    event_kind = EVENT_KINDS[kind]
+    # Only the objects that have events this cycle are visited
+    for (involved_kind, namespace, name), object_events in events.index.items():
+        if involved_kind != event_kind:
+            continue
+        row = rows.get((namespace, name))
+        if row is None:
+            continue
+        for event in object_events:
+            for label in matcher.classify(event.message):
+                column = columns.get(label)
+                if column is not None:
+                    flags[row, column] = 1
+    return flags
+
+
+def label_frame(kind, frame, events=None, keys=None, table=None, attributes=None):
+    """
+    One uint8 column per label of `kind` (LABELS), with the index of
+    `frame`: threshold rules evaluated over its columns, OR-ed with the
+    labels of `events` (a list or EventIndex) of the objects in `keys`.
+    `attributes` ({"namespace": [...], "deployment": [...]}, one value per
+    row) select each row's rule class; by default they are read from the
+    frame's columns.
+    """
+    labels = LABELS[kind]
+    flags = np.zeros((len(frame), len(labels)), dtype=FLAG_DTYPE)
+    columns = {label: j for j, label in enumerate(labels)}
+    for label, hit in (table or THRESHOLDS.current()).evaluate(kind, frame, attributes).items():
+        if label in columns:
+            flags[:, columns[label]] |= hit.astype(FLAG_DTYPE)
+    if events is not None and keys is not None:
+        flags |= event_flags(kind, events, keys, labels)
+    return pd.DataFrame(flags, columns=list(labels), index=frame.index)
+
+
+def label_records(kind, records, events=None, keys=None, table=None, attributes=None, prefix=""):
+    """
+    label_frame() over a list of metric dicts, writing the labels back into
+    each dict as 0/1 ints (under prefix + label) in LABELS order.
+    """
+    frame = pd.DataFrame.from_records(records, index=range(len(records))) if records else pd.DataFrame()
+    flags = label_frame(kind, frame, events, keys, table, attributes)
+    names = [prefix + label for label in flags.columns]
+    for metrics, values in zip(records, flags.to_numpy().tolist()):
+        metrics.update(zip(names, values))
+    return flags
+
+
+# performance_label of the kubectl-based v1-v3 rows (millicores, MiB, KB):
+# the "usage" rules of threshold_rules.json
+
+def over_threshold(df, table=None, attributes=None):
+    """Bool array: rows tripping any "usage" rule."""
+    over = np.zeros(len(df), dtype=bool)
+    for hit in (table or THRESHOLDS.current()).evaluate("usage", df, attributes).values():
+        over |= hit
+    return over
+
+
+def performance_labels(df, table=None, attributes=None):
+    """Per row: "alert" where error_count > 0, else "bad" over a usage threshold, else "good"."""
+    alert = numeric_column(df, "error_count") > 0
+    return np.select([alert, over_threshold(df, table, attributes)], ["alert", "bad"], default="good")
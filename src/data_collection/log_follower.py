@@ -0,0 +1,130 @@
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from error_rules import load_rules
+
+# Incremental pod log reader for the log_lines / error_count columns.
+#
+# The first read of a container fetches its whole log once (so error counts
+# cover the same history `kubectl logs | grep -i error | wc -l` did). After
+# that each poll asks the API server only for lines since the container's
+# cursor (the timestamp of the last line seen, via sinceSeconds plus a small
+# margin for clock skew) and drops the overlap, so a cycle costs only the new
+# log bytes. Error counts (lines matching the "log" rules of error_rules.json)
+# are kept as running totals and the last lines in a bounded ring.
+
+
+def _sortable(timestamp):
+    # RFC3339Nano trims trailing zeros; pad the fraction so strings compare in time order
+    base, _, fraction = timestamp.rstrip("Z").partition(".")
+    return f"{base}.{fraction.ljust(9, '0')}"
+
+
+def _epoch(sortable):
+    return datetime.strptime(sortable[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+
+
+class PodLog:
+    """Follow state of one pod: a cursor per container, running error count and recent lines."""
+
+    def __init__(self, tail_lines):
+        self.cursors = {}
+        self.error_count = 0
+        self.recent = deque(maxlen=tail_lines)
+        self.polled_at = None
+        self.bytes_read = 0
+
+
+class LogFollower:
+    """
+    Running error counters and recent log lines per (namespace, pod).
+
+    poll() reads what is new since the previous poll; calls for the same pod
+    within `min_interval` seconds reuse the last result, so log_lines and
+    error_count columns filled one after the other cost one read.
+    """
+
+    def __init__(self, core=None, tail_lines=10, since_margin=5, min_interval=1.0, error_matcher=None):
+        self.core = core or client.CoreV1Api()
+        self.error_matcher = error_matcher or load_rules()["log"]
+        self.tail_lines = tail_lines
+        self.since_margin = since_margin
+        self.min_interval = min_interval
+        self.pods = {}
+
+    def poll(self, namespace, pod_name, containers=None):
+        """Read new lines of the pod (each of `containers`, or its only container) and return its PodLog."""
+        key = (namespace, pod_name)
+        state = self.pods.get(key)
+        if state is None:
+            state = self.pods[key] = PodLog(self.tail_lines)
+
+        now = time.monotonic()
+        if state.polled_at is not None and now - state.polled_at < self.min_interval:
+            return state
+        state.polled_at = now
+
+        new_lines = []
+        for container in containers or [None]:
+            new_lines.extend(self._read_new(state, namespace, pod_name, container))
+
+        # Containers are read one after the other; keep the ring in time order
+        new_lines.sort(key=lambda line: line[0])
+        for _, message in new_lines:
+            if self.error_matcher.search(message):
+                state.error_count += 1
+            state.recent.append(message)
+        return state
+
+    def _read_new(self, state, namespace, pod_name, container):
+        cursor, seen_at_cursor = state.cursors.get(container, (None, 0))
+        kwargs = {"timestamps": True}
+        if container is not None:
+            kwargs["container"] = container
+        if cursor is not None:
+            kwargs["since_seconds"] = max(1, math.ceil(time.time() - _epoch(cursor)) + self.since_margin)
+
+        try:
+            text = self.core.read_namespaced_pod_log(pod_name, namespace, **kwargs)
+        except ApiException as e:
+            print(f"[WARNING] Could not fetch logs for {pod_name}: {e.status} {e.reason}")
+            return []
+        state.bytes_read += len(text)
+
+        new_lines = []
+        skip = seen_at_cursor
+        for line in text.splitlines():
+            timestamp, _, message = line.partition(" ")
+            timestamp = _sortable(timestamp)
+            if cursor is not None:
+                if timestamp < cursor:
+                    continue
+                if timestamp == cursor and skip:
+                    # Already counted on the previous poll
+                    skip -= 1
+                    continue
+            if timestamp == cursor:
+                seen_at_cursor += 1
+            else:
+                cursor, seen_at_cursor = timestamp, 1
+            new_lines.append((timestamp, message))
+
+        state.cursors[container] = (cursor, seen_at_cursor)
+        return new_lines
+
+    def log_lines(self, namespace, pod_name, containers=None):
+        return "\n".join(self.poll(namespace, pod_name, containers).recent)
+
+    def error_count(self, namespace, pod_name, containers=None):
+        return self.poll(namespace, pod_name, containers).error_count
+
+    def retain(self, keys):
+        """Forget pods that are not in `keys` (e.g. deleted since the last cycle)."""
+        keys = set(keys)
+        for key in [key for key in self.pods if key not in keys]:
+            del self.pods[key]
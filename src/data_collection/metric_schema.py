@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+# Storage types for every collected column, shared by the collector, the
+# sinks and the training loaders.
+#
+# Gauges from the PromQL tables are float32 (about 7 significant digits, more
+# than Prometheus samples carry), the 0/1 error labels derived each cycle are
+# uint8, and identifiers are categoricals. Unknown numeric columns default to
+# float32 as well.
+
+IDENTIFIER_COLUMNS = ("namespace", "pod", "node", "deployment", "pod_name", "node_name", "deployment_name")
+
+# Free text kept as strings
+TEXT_COLUMNS = ("pod_status", "deployment_status", "performance_label", "status", "log_lines", "event_logs")
+
+POD_GAUGES = (
+    "cpu_usage", "cpu_limit", "cpu_request", "cpu_throttling",
+    "memory_usage", "memory_limit", "memory_request", "memory_rss",
+    "network_receive_bytes", "network_transmit_bytes", "network_errors",
+    "restarts", "oom_killed", "pod_ready", "pod_phase",
+    "disk_read_bytes", "disk_write_bytes", "disk_io_errors",
+    "pod_scheduled", "pod_pending", "pod_unschedulable",
+    "container_running", "container_terminated", "container_waiting",
+    "pod_uptime_seconds", "cpu_utilization_ratio", "memory_utilization_ratio",
+)
+
+NODE_GAUGES = (
+    "node_cpu_usage", "node_cpu_capacity", "node_cpu_allocatable", "node_cpu_utilization_ratio",
+    "node_memory_usage", "node_memory_capacity", "node_memory_allocatable", "node_memory_utilization_ratio",
+    "node_memory_pressure", "node_disk_read_bytes", "node_disk_usage", "node_disk_write_bytes",
+    "node_disk_pressure", "node_disk_capacity", "node_disk_utilization_ratio",
+    "node_network_receive_bytes", "node_network_transmit_bytes", "node_network_errors",
+    "node_ready", "node_unschedulable", "node_out_of_disk",
+    "node_pods_running", "node_pods_allocatable", "node_pods_usage_ratio",
+    "node_uptime_seconds", "node_kubelet_healthy", "node_disk_io_errors",
+    "node_inode_utilization_ratio", "node_pid_pressure",
+)
+
+DEPLOYMENT_GAUGES = (
+    "deployment_replicas", "deployment_available_replicas", "deployment_unavailable_replicas",
+    "deployment_updated_replicas", "deployment_mismatch_replicas",
+    "deployment_cpu_usage", "deployment_cpu_requests", "deployment_cpu_limits", "deployment_cpu_utilization_ratio",
+    "deployment_memory_usage", "deployment_memory_requests", "deployment_memory_limits",
+    "deployment_memory_utilization_ratio", "deployment_disk_read_bytes", "deployment_disk_write_bytes",
+    "deployment_memory_pressure", "deployment_disk_pressure", "deployment_pid_pressure",
+    "deployment_waiting_pods", "deployment_age_seconds", "deployment_unavailable_duration",
+    "deployment_progressing", "deployment_available", "deployment_paused",
+)
+
+# Error labels set by labeling.py (threshold rules and event patterns)
+POD_FLAGS = (
+    "CPU Throttling", "High CPU Usage", "OOMKilled (Out of Memory)",
+    "CrashLoopBackOff", "ContainerNotReady", "PodUnschedulable",
+    "NodePressure", "ImagePullFailure",
+)
+NODE_FLAGS = (
+    "CPU Pressure", "Memory Pressure", "Disk Pressure", "Network Unavailable",
+    "Node Not Ready", "PID Pressure", "Node Unschedulable",
+)
+DEPLOYMENT_ERRORS = (
+    "Replica Mismatch", "Unavailable Pods", "ImagePullFailure", "CrashLoopBackOff",
+    "FailedScheduling", "QuotaExceeded", "ProgressDeadlineExceeded",
+)
+# Deployment labels are stored with a "deployment " prefix
+DEPLOYMENT_FLAGS = tuple(f"deployment {error}" for error in DEPLOYMENT_ERRORS)
+
+GAUGE_DTYPE = "float32"
+FLAG_DTYPE = "uint8"
+IDENTIFIER_DTYPE = "category"
+
+SCHEMA = {
+    **{col: IDENTIFIER_DTYPE for col in IDENTIFIER_COLUMNS},
+    **{col: "string" for col in TEXT_COLUMNS},
+    **{col: GAUGE_DTYPE for col in POD_GAUGES + NODE_GAUGES + DEPLOYMENT_GAUGES},
+    **{col: FLAG_DTYPE for col in POD_FLAGS + NODE_FLAGS + DEPLOYMENT_FLAGS},
+}
+
+# printf format giving gauges float32 precision in CSV output
+CSV_FLOAT_FORMAT = "%.7g"
+
+
+def dtype_for(column):
+    return SCHEMA.get(column, GAUGE_DTYPE)
+
+
+def apply_schema(df):
+    """Return `df` with every column converted to its schema dtype."""
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        dtype = dtype_for(col)
+        if col == "timestamp":
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                values = pd.to_datetime(values, unit="s" if pd.api.types.is_numeric_dtype(values) else None,
+                                        errors="coerce")
+        elif dtype == FLAG_DTYPE:
+            values = pd.to_numeric(values, errors="coerce").fillna(0).astype(FLAG_DTYPE)
+        elif dtype == GAUGE_DTYPE:
+            if col in SCHEMA or pd.api.types.is_numeric_dtype(values):
+                values = pd.to_numeric(values, errors="coerce").astype(GAUGE_DTYPE)
+        else:
+            values = values.astype(dtype)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index)
+
+
+def read_dtypes(columns):
+    """dtype= for pd.read_csv; flags are read as float32 since padded rows can be empty."""
+    dtypes = {}
+    for col in columns:
+        if col in SCHEMA:
+            dtype = SCHEMA[col]
+            dtypes[col] = GAUGE_DTYPE if dtype == FLAG_DTYPE else dtype
+    return dtypes
+
+
+def read_csv(path, chunksize=None, **kwargs):
+    """
+    pd.read_csv that parses straight into schema dtypes (no float64 or
+    object intermediate for known columns). With chunksize, returns an
+    iterator of typed chunks.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    reader = pd.read_csv(path, dtype=read_dtypes(header), chunksize=chunksize, **kwargs)
+    if chunksize is None:
+        return apply_schema(reader)
+    return (apply_schema(chunk) for chunk in reader)
+
+
+def format_csv_value(value):
+    """Cell text for CsvAppendSink: floats at float32 precision, 0/1 flags as integers."""
+    if isinstance(value, (float, np.floating)):
+        if value != value:
+            return ""
+        if float(value).is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return CSV_FLOAT_FORMAT % value
+    return value
@@ -0,0 +1,81 @@
+import csv
+import os
+import time
+
+
+class CsvAppendSink:
+    """
+    Appends each cycle's rows to a CSV file instead of rewriting the whole
+    capture. The header order is fixed by the first rows written; metric
+    columns that appear later are added to the end of the header (existing
+    rows are padded once) so every row lines up with the header.
+
+    Rows are buffered and flushed when `flush_rows` rows are pending or
+    `flush_interval` seconds have passed since the last flush. If given,
+    `format_value(value)` produces the text written for each cell.
+    """
+
+    def __init__(self, path, flush_rows=5000, flush_interval=30, format_value=None):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.format_value = format_value
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.columns = self._read_header()
+
+    def _read_header(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        with open(self.path, newline="") as f:
+            return next(csv.reader(f), None)
+
+    def _extend_header(self, columns):
+        # Rewrite the file once with the wider header, padding old rows
+        padding = [""] * (len(columns) - len(self.columns))
+        tmp_path = self.path + ".tmp"
+        with open(self.path, newline="") as src, open(tmp_path, "w", newline="") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst, lineterminator="\n")
+            next(reader, None)
+            writer.writerow(columns)
+            for row in reader:
+                writer.writerow(row + padding)
+        os.replace(tmp_path, self.path)
+        self.columns = columns
+
+    def write(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+
+        known = set(self.columns or [])
+        new_columns = []
+        for row in self.buffer:
+            for column in row:
+                if column not in known:
+                    known.add(column)
+                    new_columns.append(column)
+
+        if self.columns is None:
+            self.columns = new_columns
+            with open(self.path, "w", newline="") as f:
+                csv.writer(f, lineterminator="\n").writerow(self.columns)
+        elif new_columns:
+            self._extend_header(self.columns + new_columns)
+
+        rows = self.buffer
+        if self.format_value is not None:
+            rows = ({column: self.format_value(value) for column, value in row.items()} for row in rows)
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns, restval="", lineterminator="\n")
+            writer.writerows(rows)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
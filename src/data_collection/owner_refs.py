@@ -0,0 +1,28 @@
+# Pod -> ReplicaSet -> Deployment resolution from ownerReferences, so the
+# collector joins pods to deployments with a dictionary lookup instead of
+# matching name prefixes (which attaches "api-gateway-..." pods to "api").
+
+
+def controller_of(obj):
+    """Return (kind, name) of the object's controlling owner, or None."""
+    for ref in obj.metadata.owner_references or []:
+        if ref.controller:
+            return (ref.kind, ref.name)
+    return None
+
+
+def build_pod_deployment_map(pod_owners, replicaset_owners):
+    """
+    Map each pod to the "namespace/deployment" key it belongs to.
+
+    pod_owners and replicaset_owners map (namespace, name) to the
+    controller_of() result. Pods not owned by a Deployment are left out.
+    """
+    pod_deployments = {}
+    for (namespace, pod_name), owner in pod_owners.items():
+        if owner is None or owner[0] != "ReplicaSet":
+            continue
+        replicaset_owner = replicaset_owners.get((namespace, owner[1]))
+        if replicaset_owner is not None and replicaset_owner[0] == "Deployment":
+            pod_deployments[(namespace, pod_name)] = f"{namespace}/{replicaset_owner[1]}"
+    return pod_deployments
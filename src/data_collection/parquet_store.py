@@ -0,0 +1,173 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from metric_schema import IDENTIFIER_COLUMNS, IDENTIFIER_DTYPE, SCHEMA, apply_schema
+from metric_schema import TEXT_COLUMNS as FREE_TEXT_COLUMNS
+
+# Typed, hour-partitioned Parquet storage for collected metrics.
+#
+# Layout: <root>/date=YYYY-MM-DD/hour=HH/part-<ns>.parquet
+# Columns are stored with their metric_schema types (float32 gauges, uint8
+# flags); everything except the text columns below is numeric, so readers
+# never parse text and can load only the columns and hours they need.
+
+TEXT_COLUMNS = set(IDENTIFIER_COLUMNS) | set(FREE_TEXT_COLUMNS)
+
+
+def typed_frame(df, text_columns=TEXT_COLUMNS):
+    """Convert a frame of collected rows to storage types."""
+    df = apply_schema(df)
+    for col in df.columns:
+        if col == "timestamp":
+            continue
+        if col in text_columns:
+            # Parquet dictionary-encodes strings itself; plain strings keep
+            # the schema identical across files
+            df[col] = df[col].astype("string")
+        elif col not in SCHEMA:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+class ParquetSink:
+    """
+    Buffers collected rows and writes them as typed Parquet files, one file
+    per hour touched by each flush. Same flush policy as CsvAppendSink.
+    """
+
+    def __init__(self, root, flush_rows=50000, flush_interval=300, text_columns=TEXT_COLUMNS):
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.text_columns = set(text_columns)
+        self.buffer = []
+        self.buffered_rows = 0
+        self.last_flush = time.monotonic()
+
+    def write(self, rows):
+        self.write_frame(pd.DataFrame(rows))
+
+    def write_frame(self, df):
+        if df.empty:
+            return
+        self.buffer.append(df)
+        self.buffered_rows += len(df)
+        if self.buffered_rows >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+
+        df = typed_frame(pd.concat(self.buffer, ignore_index=True), self.text_columns)
+        self.buffer = []
+        self.buffered_rows = 0
+
+        df = df.dropna(subset=["timestamp"])
+        for hour, part in df.groupby(df["timestamp"].dt.floor("h")):
+            directory = self.root / f"date={hour:%Y-%m-%d}" / f"hour={hour:%H}"
+            directory.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            pq.write_table(table, directory / f"part-{time.time_ns()}.parquet")
+
+    def close(self):
+        self.flush()
+
+
+def _partition_files(root, start=None, end=None):
+    files = []
+    for path in sorted(Path(root).glob("date=*/hour=*/*.parquet")):
+        date = path.parent.parent.name.split("=", 1)[1]
+        hour = pd.Timestamp(f"{date} {path.parent.name.split('=', 1)[1]}:00")
+        if start is not None and hour + pd.Timedelta(hours=1) <= start:
+            continue
+        if end is not None and hour > end:
+            continue
+        files.append(str(path))
+    return files
+
+
+def read_metrics(root, columns=None, start=None, end=None):
+    """
+    Load metrics written by ParquetSink, reading only the given columns and
+    the hour partitions overlapping [start, end].
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    files = _partition_files(root, start, end)
+    if not files:
+        return pd.DataFrame(columns=columns)
+
+    # Columns can be added between cycles (and older files hold float64), so
+    # read with the union of all schemas
+    schemas = [pq.read_schema(f) for f in files]
+    try:
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+    except TypeError:
+        schema = pa.unify_schemas(schemas)
+    dataset = ds.dataset(files, schema=schema, format="parquet")
+
+    condition = None
+    if start is not None:
+        condition = ds.field("timestamp") >= start
+    if end is not None:
+        upper = ds.field("timestamp") <= end
+        condition = upper if condition is None else condition & upper
+
+    df = dataset.to_table(columns=columns, filter=condition).to_pandas()
+    return df.astype({col: IDENTIFIER_DTYPE for col in df.columns if col in IDENTIFIER_COLUMNS})
+
+
+def _has_header(csv_path):
+    with open(csv_path) as f:
+        first = f.readline().split(",", 1)[0]
+    try:
+        float(first)
+        return False
+    except ValueError:
+        return True
+
+
+def convert_csv(csv_path, root, chunksize=100000):
+    """Convert a collected CSV (e.g. datasets/Dataset_4.csv) into a partitioned Parquet dataset."""
+    header = _has_header(csv_path)
+    chunks = pd.read_csv(csv_path, header=0 if header else None, chunksize=chunksize)
+
+    sink = None
+    for chunk in chunks:
+        if not header:
+            chunk.columns = ["timestamp"] + [f"column_{i}" for i in range(1, len(chunk.columns))]
+        if sink is None:
+            # Columns holding non-numeric values in the first chunk stay text
+            text_columns = set(TEXT_COLUMNS)
+            for col in chunk.columns[1:]:
+                numeric = pd.to_numeric(chunk[col], errors="coerce")
+                if numeric.isna().sum() > chunk[col].isna().sum():
+                    text_columns.add(col)
+            sink = ParquetSink(root, flush_rows=chunksize, flush_interval=float("inf"), text_columns=text_columns)
+        sink.write_frame(chunk)
+
+    if sink is not None:
+        sink.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert collected metric CSVs to hour-partitioned Parquet.")
+    parser.add_argument("csv_files", nargs="+", help="CSV files to convert, e.g. ../../datasets/*.csv")
+    parser.add_argument("--out", default="parquet", help="Output directory; each CSV gets its own sub-directory")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+
+    for csv_file in args.csv_files:
+        target = os.path.join(args.out, Path(csv_file).stem)
+        convert_csv(csv_file, target, chunksize=args.chunksize)
+        print(f"Converted {csv_file} -> {target}")
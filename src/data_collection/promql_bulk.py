@@ -0,0 +1,290 @@
+import re
+
+# Rewrites the per-object PromQL templates used by the collectors into one
+# query per metric that returns every object at once, grouped by the labels
+# that identify the object. The returned vector is then fanned out to the
+# objects in memory, so a cycle costs O(metrics) requests instead of
+# O(objects x metrics).
+
+AGGREGATIONS = ("sum", "max", "min", "avg", "count")
+
+# Labels used to key each object kind in a bulk result
+GROUP_LABELS = {
+    "{pod}": ("namespace", "pod"),
+    "{node}": ("node",),
+    "{deployment}": ("namespace", "deployment"),
+}
+
+# A series per object of each kind, used to give every object its own copy of
+# a fallback (`or vector(0)`, `or sum(...)`) inside a bulk query
+OBJECT_SERIES = {
+    "{pod}": "kube_pod_info",
+    "{node}": "kube_node_info",
+    "{deployment}": "kube_deployment_spec_replicas",
+}
+
+# When a template selects an object through a different label (for example
+# pod=~"{deployment}-.*"), the object label is rebuilt with label_replace
+# using these patterns, keyed by (object label, source label).
+DERIVED_LABELS = {
+    ("deployment", "pod"): "(.+)-[a-z0-9]+-[a-z0-9]+",
+    ("node", "instance"): "([^:]+)(?::.*)?",
+}
+
+# Aggregations with agg(vector(c)) == c, so a fallback can move outside them
+_HOISTABLE = ("sum", "max", "min", "avg")
+
+_AGG_RE = re.compile(r"\b(" + "|".join(AGGREGATIONS) + r")\s*\(")
+_OR_VECTOR_RE = re.compile(r"\s*\bor\s+vector\(\s*([-+0-9.eE]+)\s*\)", re.IGNORECASE)
+_OR_RE = re.compile(r"\bor\s+", re.IGNORECASE)
+_NAME_RE = re.compile(r"[a-zA-Z_:][\w:]*")
+
+
+def _matching_paren(expr, open_index):
+    depth = 0
+    for i in range(open_index, len(expr)):
+        if expr[i] == "(":
+            depth += 1
+        elif expr[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"Unbalanced parentheses in query: {expr}")
+
+
+def _matcher_re(placeholder):
+    return re.compile(r'(\w+)\s*(=~|=)\s*"([^"]*)' + re.escape(placeholder) + r'([^"]*)"')
+
+
+def _derivations(expr, placeholder, target):
+    """Return the (source label, regex) pairs needed to rebuild `target` in expr."""
+    derived = []
+    for label, op, prefix, suffix in _matcher_re(placeholder).findall(expr):
+        if label == target and op == "=" and not prefix and not suffix:
+            continue
+        regex = DERIVED_LABELS.get((target, label), "(.+?)" + suffix)
+        if (label, regex) not in derived:
+            derived.append((label, regex))
+    return derived
+
+
+def _drop_matchers(expr, placeholder):
+    expr = _matcher_re(placeholder).sub("", expr)
+    expr = re.sub(r",\s*,", ",", expr)
+    expr = re.sub(r"\{\s*,\s*", "{", expr)
+    expr = re.sub(r"\s*,\s*\}", "}", expr)
+    return re.sub(r"\{\s*\}", "", expr)
+
+
+def _group(expr, placeholder, labels):
+    out = []
+    pos = 0
+    while True:
+        match = _AGG_RE.search(expr, pos)
+        if not match:
+            break
+        open_index = match.end() - 1
+        close_index = _matching_paren(expr, open_index)
+        inner = expr[open_index + 1:close_index]
+        out.append(expr[pos:match.start()])
+        if placeholder in inner:
+            grouped = _group(inner, placeholder, labels)
+            for source, regex in _derivations(inner, placeholder, labels[-1]):
+                grouped = f'label_replace({grouped}, "{labels[-1]}", "$1", "{source}", "{regex}")'
+            out.append(f"{match.group(1)} by ({', '.join(labels)}) ({grouped})")
+        else:
+            out.append(expr[match.start():close_index + 1])
+        pos = close_index + 1
+    out.append(expr[pos:])
+    return "".join(out)
+
+
+def _depth(expr, index):
+    head = expr[:index]
+    return head.count("(") - head.count(")")
+
+
+def _operand_end(expr, start):
+    # End of the operand starting at `start`: a parenthesised expression or a
+    # name with optional {matchers} and (arguments)
+    if expr[start] == "(":
+        return _matching_paren(expr, start) + 1
+    match = _NAME_RE.match(expr, start)
+    if not match:
+        raise ValueError(f"Unsupported fallback operand in query: {expr[start:]}")
+    end = match.end()
+    if expr.startswith("{", end):
+        end = expr.index("}", end) + 1
+    if expr.startswith("(", end):
+        end = _matching_paren(expr, end) + 1
+    return end
+
+
+def _hoist_fallbacks(expr):
+    # sum(X or vector(c)) is sum(X) for an object with X series, else c:
+    # rewrite it as (sum(X) or vector(c)) so the fallback is applied per object
+    pos = 0
+    while True:
+        match = _AGG_RE.search(expr, pos)
+        if not match:
+            return expr
+        open_index = match.end() - 1
+        close_index = _matching_paren(expr, open_index)
+        inner = expr[open_index + 1:close_index]
+        fallback = None
+        for candidate in _OR_VECTOR_RE.finditer(inner):
+            if _depth(inner, candidate.start()) == 0 and not inner[candidate.end():].strip():
+                fallback = candidate
+        if match.group(1) in _HOISTABLE and fallback is not None:
+            hoisted = f"({match.group(1)}({inner[:fallback.start()]}){inner[fallback.start():]})"
+            expr = expr[:match.start()] + hoisted + expr[close_index + 1:]
+        pos = match.start() + 1
+
+
+def _broadcast_fallbacks(expr, placeholder, labels):
+    # `A or B` with B the same for every object: B is repeated for each object
+    # and only fills in for objects that A has no series for
+    by = ", ".join(labels)
+    out = []
+    pos = 0
+    for match in _OR_RE.finditer(expr):
+        if match.start() < pos:
+            continue
+        end = _operand_end(expr, match.end())
+        operand = expr[match.end():end]
+        if placeholder in operand:
+            continue
+        out.append(expr[pos:match.start()])
+        out.append(f"or on({by}) (0 * group by ({by}) ({OBJECT_SERIES[placeholder]}) + on() group_left {operand})")
+        pos = end
+    out.append(expr[pos:])
+    return "".join(out)
+
+
+def to_bulk_query(template, placeholder):
+    """
+    Rewrite a per-object query template into a query over all objects.
+
+    Returns (query, default). A top-level `or vector(c)` fallback is stripped
+    and becomes the default for objects missing from the result. Fallbacks
+    inside the query are kept per object: repeated for every object of the
+    kind (OBJECT_SERIES) and matched on the object labels, after moving any
+    fallback inside sum/max/min/avg to just outside it.
+    """
+    labels = GROUP_LABELS[placeholder]
+    default = None
+    if placeholder not in template:
+        return template, default
+    query = _hoist_fallbacks(template)
+    top_level = [match for match in _OR_VECTOR_RE.finditer(query) if _depth(query, match.start()) == 0]
+    for match in reversed(top_level):
+        default = float(match.group(1)) if default is None else default
+        query = query[:match.start()] + query[match.end():]
+    query = _broadcast_fallbacks(query, placeholder, labels)
+    query = _group(query, placeholder, labels)
+    return _drop_matchers(query, placeholder), default
+
+
+def fan_out(results, labels):
+    """Map each series of a bulk result to its object key (first series wins)."""
+    values = {}
+    for result in results:
+        metric = result.get("metric", {})
+        if all(label in metric for label in labels):
+            key = tuple(metric[label] for label in labels)
+            values.setdefault(key, float(result["value"][1]))
+    return values
+
+
+def _fail(per_object, placeholder, metric_name, failed):
+    for obj, metrics in per_object.items():
+        metrics[metric_name] = None
+        if failed is not None:
+            failed.add((placeholder, obj, metric_name))
+
+
+def collect_bulk(query_sets, run_many, rates=None, failed=None):
+    """
+    Run each query once for all objects of its kind.
+
+    `query_sets` maps a placeholder to (queries, objects), where objects are
+    key tuples in the order of GROUP_LABELS[placeholder]. `run_many` takes
+    {key: query} and returns {key: results}, with None for a query that
+    failed, so every set can be issued in one concurrent batch. A failed
+    query gives None for every object; the `or vector(c)` default is only
+    used when a query succeeds without a sample for the object. With a set
+    as `failed`, (placeholder, object, metric) of failed queries are added
+    to it. Returns {placeholder: {object key: metrics}}.
+    Queries that do not reference the object are cluster-wide and their
+    single value is given to every object.
+
+    With a counter_rates.CounterRates as `rates`, plain sum(rate(...))
+    templates are computed client-side from raw counter samples; until a
+    counter has a previous sample its server-side query is run as well.
+    """
+    from counter_rates import raw_queries, split_rate_template, sum_by_object
+
+    prepared = {}
+    client_rates = {}
+    queries_to_run = {}
+    for placeholder, (queries, _) in query_sets.items():
+        for metric_name, template in queries.items():
+            key = (placeholder, metric_name)
+            prepared[key] = to_bulk_query(template, placeholder)
+            rate_template = split_rate_template(template) if rates is not None else None
+            if rate_template is not None:
+                selector, _ = rate_template
+                client_rates[key] = rate_template
+                value_query, timestamp_query = raw_queries(selector, placeholder)
+                queries_to_run[key + ("value",)] = value_query
+                queries_to_run[key + ("timestamp",)] = timestamp_query
+                if key in rates.primed:
+                    continue
+            queries_to_run[key] = prepared[key][0]
+
+    results = run_many(queries_to_run)
+
+    collected = {}
+    for placeholder, (queries, objects) in query_sets.items():
+        labels = GROUP_LABELS[placeholder]
+        per_object = collected[placeholder] = {tuple(obj): {} for obj in objects}
+
+        for metric_name, template in queries.items():
+            key = (placeholder, metric_name)
+            _, default = prepared[key]
+
+            if key in client_rates:
+                primed = key in rates.primed
+                value_results, timestamp_results = results[key + ("value",)], results[key + ("timestamp",)]
+                if value_results is None or timestamp_results is None:
+                    # A failed scrape is missing data, not "no traffic"
+                    if primed:
+                        _fail(per_object, placeholder, metric_name, failed)
+                        continue
+                    series_rates = []
+                else:
+                    series_rates = rates.update(key, value_results, timestamp_results)
+                if primed:
+                    totals = sum_by_object(series_rates, template, placeholder)
+                    rate_default = client_rates[key][1]
+                    for obj, metrics in per_object.items():
+                        metrics[metric_name] = totals.get(None if placeholder not in template else obj, rate_default)
+                    continue
+
+            metric_results = results[key]
+            if metric_results is None:
+                # Failed query: the default only stands in for a missing sample
+                _fail(per_object, placeholder, metric_name, failed)
+                continue
+
+            if placeholder not in template:
+                value = float(metric_results[0]['value'][1]) if metric_results else default
+                for metrics in per_object.values():
+                    metrics[metric_name] = value
+                continue
+
+            values = fan_out(metric_results, labels)
+            for obj, metrics in per_object.items():
+                metrics[metric_name] = values.get(obj, default)
+
+    return collected
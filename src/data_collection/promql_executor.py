@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying; anything else (bad query, auth) fails at once
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class PromQLExecutor:
+    """
+    Runs PromQL instant queries on a bounded thread pool that shares one
+    keep-alive session, so a batch of queries takes about as long as the
+    slowest query instead of the sum of all of them.
+    """
+
+    def __init__(self, prometheus_url, max_workers=16, timeout=10, retries=2, backoff=0.5):
+        self.url = f"{prometheus_url}/api/v1/query"
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="promql")
+
+    def query(self, query):
+        """Run one query with a timeout, retrying transient failures with exponential backoff."""
+        params = {"query": query, "timeout": f"{self.timeout}s"}
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                    response.raise_for_status()
+                    return response.json().get("data", {}).get("result", [])
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def run_many(self, queries):
+        """
+        Run {key: query} concurrently and return {key: results}.
+        A query that still fails after its retries is logged and yields None,
+        so callers can tell a failure from an empty result.
+        """
+        futures = {key: self.pool.submit(self.query, query) for key, query in queries.items()}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"[ERROR] PromQL query {key} failed: {e}")
+                results[key] = None
+        return results
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,126 @@
+import time
+
+# Cache for slow-changing metrics (limits, requests, capacities).
+#
+# Query tables mark such metrics as  "cpu_limit": (template, refresh_seconds).
+# Their values are kept per (metric, object) and only queried again once the
+# entry is older than the refresh interval, an object without an entry shows
+# up, or the object was invalidated because a watch saw its spec change. Only
+# those objects are queried in per-object mode; in bulk mode the metric's one
+# query is run when any object needs it. Every other metric is queried each
+# cycle as before.
+#
+# A None value (no series for the object) is cached like any other; only the
+# values of queries that failed are not, so they are retried next cycle.
+
+
+def split_refresh_intervals(queries):
+    """
+    ({metric: template}, {metric: refresh seconds}) of a query table whose
+    cached metrics are written as (template, refresh seconds).
+    """
+    templates = {}
+    intervals = {}
+    for metric, query in queries.items():
+        if isinstance(query, tuple):
+            query, intervals[metric] = query
+        templates[metric] = query
+    return templates, intervals
+
+
+class QueryCache:
+    """
+    Values of the metrics in `refresh_intervals`, keyed by (metric, object).
+
+    An invalidated object is re-queried every cycle for `settle` seconds so
+    the new value is picked up once exporters (e.g. kube-state-metrics) have
+    been scraped, rather than caching the old one again.
+    """
+
+    def __init__(self, refresh_intervals, settle=60):
+        self.refresh_intervals = dict(refresh_intervals)
+        self.settle = settle
+        self.values = {}
+        self.unsettled = {}
+        self.hits = 0
+        self.misses = 0
+        self.last_evict = time.monotonic()
+
+    def invalidate(self, placeholder, obj):
+        """Drop the cached values of one object, e.g. ("{pod}", (namespace, pod))."""
+        self.unsettled[(placeholder, tuple(obj))] = time.monotonic() + self.settle
+
+    def expire(self, metrics):
+        """Make `metrics` be queried again on the next collect, for every object."""
+        metrics = set(metrics)
+        self.values = {key: entry for key, entry in self.values.items() if key[0] not in metrics}
+
+    def collect(self, query_sets, collect):
+        """
+        Same arguments and result as `collect` (collect_bulk or
+        collect_per_object), which is called as collect(query_sets, failed,
+        skip): with only the metrics that are not fresh for every object, a
+        set it adds the (placeholder, object, metric) of failed queries to,
+        and the (placeholder, object, metric) whose cached values are fresh.
+        Per-object collection leaves those out; a bulk query covers every
+        object, so a metric is queried whole once any object needs it.
+        """
+        now = time.monotonic()
+        to_query = {}
+        fresh = {}
+        for placeholder, (templates, objects) in query_sets.items():
+            objects = [tuple(obj) for obj in objects]
+            run = {}
+            for metric, template in templates.items():
+                if metric not in self.refresh_intervals:
+                    run[metric] = template
+                    continue
+                values = self._lookup(metric, placeholder, objects, now)
+                self.hits += len(values)
+                self.misses += len(objects) - len(values)
+                if len(values) < len(objects):
+                    run[metric] = template
+                for obj, value in values.items():
+                    fresh[(placeholder, obj, metric)] = value
+            to_query[placeholder] = (run, objects)
+
+        failed = set()
+        collected = collect(to_query, failed, set(fresh))
+
+        for placeholder, (templates, objects) in query_sets.items():
+            run, objects = to_query[placeholder]
+            per_object = collected[placeholder]
+            for obj in objects:
+                fetched = per_object[obj]
+                for metric in run:
+                    ttl = self.refresh_intervals.get(metric)
+                    if ttl is not None and metric in fetched and (placeholder, obj, metric) not in failed:
+                        self.values[(metric, obj)] = (now + ttl, fetched[metric])
+
+                # Rebuilt in table order so rows keep the same column order
+                per_object[obj] = {
+                    metric: fetched[metric] if metric in fetched else fresh.get((placeholder, obj, metric))
+                    for metric in templates
+                }
+
+        self._evict(now)
+        return collected
+
+    def _lookup(self, metric, placeholder, objects, now):
+        # {object: value} of the objects with a fresh entry that are not unsettled
+        values = {}
+        for obj in objects:
+            if self.unsettled.get((placeholder, obj), 0) > now:
+                continue
+            entry = self.values.get((metric, obj))
+            if entry is not None and entry[0] > now:
+                values[obj] = entry[1]
+        return values
+
+    def _evict(self, now):
+        # Entries of deleted objects expire and are swept once per longest interval
+        if now - self.last_evict < max(self.refresh_intervals.values(), default=0):
+            return
+        self.last_evict = now
+        self.values = {key: entry for key, entry in self.values.items() if entry[0] > now}
+        self.unsettled = {key: until for key, until in self.unsettled.items() if until > now}
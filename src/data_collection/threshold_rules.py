@@ -0,0 +1,233 @@
+import json
+import operator
+import os
+import time
+from fnmatch import fnmatchcase
+
+import numpy as np
+import pandas as pd
+
+# Threshold rules for the error labels, loaded from threshold_rules.json.
+#
+# "defaults" maps a kind ("pod", "node", "deployment", and "usage" for the
+# v1-v3 performance_label) to rules of the form
+#   {"error": <label>, "metric": <column>, "op": ">", "value": <number or column>}
+# Several rules for one label are OR-ed; a missing metric never trips a rule.
+#
+# "classes" tunes the defaults per namespace or workload class. The first
+# class whose "match" globs all match an object applies to it, e.g.
+#   {"name": "batch", "match": {"namespace": ["batch-*"], "deployment": ["etl-*"]},
+#    "pod": [{"error": "High CPU Usage", "metric": "cpu_usage", "op": ">", "value": 95}]}
+# Match attributes are "namespace", "deployment" and "node". A class rule
+# replaces the default rule with the same error, metric and op (a null value
+# disables it); other class rules are added for that class only.
+#
+# A table is compiled once into one threshold per rule and class, so a frame
+# is evaluated with one comparison per rule whatever the number of classes.
+# ThresholdFile reloads the table when the file changes on disk.
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "threshold_rules.json")
+
+# How often ThresholdFile looks at the file's modification time
+RELOAD_CHECK_SECONDS = 5
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Columns an object's match attributes are read from, in order of preference
+MATCH_COLUMNS = {
+    "namespace": ("namespace",),
+    "deployment": ("deployment", "deployment_name"),
+    "node": ("node", "node_name"),
+}
+
+
+def numeric_column(frame, name):
+    # float64 values of a column, NaN where missing or not numeric
+    if name not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _missing(value):
+    # NaN != NaN: treated as missing, like None
+    return value is None or value != value
+
+
+def match_attributes(values):
+    """{attribute: value(s)} of a metrics dict or DataFrame, read from MATCH_COLUMNS."""
+    attributes = {}
+    for attribute, columns in MATCH_COLUMNS.items():
+        for column in columns:
+            if column in values:
+                attributes[attribute] = values[column]
+                break
+    return attributes
+
+
+class ThresholdTable:
+    """Compiled threshold rules: defaults plus per-class overrides."""
+
+    def __init__(self, config):
+        self.classes = []
+        for i, spec in enumerate(config.get("classes", [])):
+            match = {attribute: [globs] if isinstance(globs, str) else list(globs)
+                     for attribute, globs in spec.get("match", {}).items()}
+            unknown = set(match) - set(MATCH_COLUMNS)
+            if unknown:
+                raise ValueError(f"class {spec.get('name', i)!r}: unknown match attributes {sorted(unknown)}")
+            self.classes.append((spec.get("name", f"class {i}"), match))
+
+        defaults = config.get("defaults", {})
+        kinds = list(defaults)
+        for spec in config.get("classes", []):
+            kinds.extend(kind for kind in spec if kind not in ("name", "match") and kind not in kinds)
+
+        # kind -> [(label, metric, op, operand column or None, thresholds)], where
+        # thresholds[i] applies to class i and thresholds[-1] to unclassified
+        # objects; NaN means the rule is off. Column operands store 1.0 for on.
+        self.rules = {}
+        for kind in kinds:
+            rules = {}
+            for rule in defaults.get(kind, []):
+                # Until a class overrides it, a default applies to every class
+                self._add(rules, rule)[:] = self._threshold(rule)
+            for i, spec in enumerate(config.get("classes", [])):
+                for rule in spec.get(kind, []):
+                    self._add(rules, rule)[i] = self._threshold(rule)
+            self.rules[kind] = [(*key, thresholds) for key, thresholds in rules.items()]
+
+    @staticmethod
+    def _key(rule):
+        if rule["op"] not in OPERATORS:
+            raise ValueError(f"unknown operator {rule['op']!r} in rule {rule}")
+        value = rule.get("value")
+        return rule["error"], rule["metric"], rule["op"], value if isinstance(value, str) else None
+
+    @staticmethod
+    def _threshold(rule):
+        value = rule.get("value")
+        if value is None:
+            return np.nan
+        return 1.0 if isinstance(value, str) else float(value)
+
+    def _add(self, rules, rule):
+        key = self._key(rule)
+        if key not in rules:
+            rules[key] = np.full(len(self.classes) + 1, np.nan)
+        return rules[key]
+
+    def class_of(self, attributes):
+        """Index of the first class matching an object's attributes, or -1."""
+        for i, (_, match) in enumerate(self.classes):
+            if all(not _missing(attributes.get(attribute)) and
+                   any(fnmatchcase(str(attributes[attribute]), glob) for glob in globs)
+                   for attribute, globs in match.items()):
+                return i
+        return -1
+
+    def class_ids(self, attributes, length):
+        """class_of() for each of `length` rows, given {attribute: values per row}."""
+        ids = np.full(length, -1, dtype=np.int64)
+        if not self.classes or not length:
+            return ids
+        columns = {attribute: pd.Series(list(values), dtype=object) for attribute, values in attributes.items()}
+        for i, (_, match) in enumerate(self.classes):
+            hit = ids == -1
+            for attribute, globs in match.items():
+                if attribute not in columns:
+                    hit[:] = False
+                    continue
+                values = columns[attribute]
+                # Globs are tried once per distinct value
+                matching = [value for value in values.dropna().unique()
+                            if any(fnmatchcase(str(value), glob) for glob in globs)]
+                hit &= values.isin(matching).to_numpy()
+            ids[hit] = i
+        return ids
+
+    def resolve(self, kind, attributes=None):
+        """[(label, metric, op, threshold or column)] in effect for one object of `kind`."""
+        i = self.class_of(attributes or {}) if self.classes else -1
+        resolved = []
+        for label, metric, op, operand, thresholds in self.rules.get(kind, []):
+            threshold = thresholds[i]
+            if not np.isnan(threshold):
+                resolved.append((label, metric, op, operand if operand is not None else float(threshold)))
+        return resolved
+
+    def errors(self, kind, metrics, attributes=None):
+        """Labels of the rules of `kind` tripped by one object's metrics, in rule order."""
+        errors = []
+        for label, metric, op, operand in self.resolve(kind, match_attributes(metrics) if attributes is None else attributes):
+            left = metrics.get(metric)
+            right = metrics.get(operand) if isinstance(operand, str) else operand
+            if not _missing(left) and not _missing(right) and OPERATORS[op](left, right) and label not in errors:
+                errors.append(label)
+        return errors
+
+    def evaluate(self, kind, frame, attributes=None):
+        """{label: bool array over the rows of `frame`} for the rules of `kind`."""
+        ids = self.class_ids(match_attributes(frame) if attributes is None else attributes, len(frame))
+        flags = {}
+        columns = {}
+        for label, metric, op, operand, thresholds in self.rules.get(kind, []):
+            if metric not in columns:
+                columns[metric] = numeric_column(frame, metric)
+            left = columns[metric]
+            enabled = thresholds[ids]
+            if operand is not None:
+                if operand not in columns:
+                    columns[operand] = numeric_column(frame, operand)
+                right = columns[operand]
+            else:
+                right = enabled
+            with np.errstate(invalid="ignore"):
+                hit = OPERATORS[op](left, right) & ~np.isnan(left) & ~np.isnan(right) & ~np.isnan(enabled)
+            flags[label] = flags[label] | hit if label in flags else hit
+        return flags
+
+
+def load_thresholds(path=THRESHOLDS_PATH):
+    with open(path) as f:
+        return ThresholdTable(json.load(f))
+
+
+class ThresholdFile:
+    """
+    The ThresholdTable of a file, reloaded when the file's modification time
+    changes (looked at no more than every `check_interval` seconds). A file
+    that fails to load is reported and the previous table kept.
+    """
+
+    def __init__(self, path=THRESHOLDS_PATH, check_interval=RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self.mtime = os.stat(path).st_mtime_ns
+        self.table = load_thresholds(path)
+        self.checked_at = time.monotonic()
+
+    def current(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return self.table
+        self.checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            print(f"[WARNING] Could not stat threshold rules {self.path}: {e}")
+            return self.table
+        if mtime != self.mtime:
+            self.mtime = mtime
+            try:
+                self.table = load_thresholds(self.path)
+                print(f"[INFO] Reloaded threshold rules from {self.path}")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"[WARNING] Keeping previous threshold rules, {self.path} failed to load: {e}")
+        return self.table
@@ -0,0 +1,124 @@
+import math
+import time
+
+# Fixed wall-clock scheduling for the collectors.
+#
+# Each task runs on the multiples of its period since the epoch (every 5 s at
+# :00, :05, ... rather than 5 s after the previous cycle finished), so the
+# collection period does not drift with the cycle time. A task is called with
+# the intended tick (epoch seconds) and stamps its rows with it.
+#
+# Tasks run one at a time in the calling thread. A run that lasts past the
+# task's next tick is reported as an overrun. A tick is late once it is more
+# than `tolerance` seconds in the past (the tolerance covers sleep wake-up
+# jitter). Ticks that pass entirely while a task is behind are dropped; for the
+# most recent late tick, "skip" waits for the next one on schedule while
+# "coalesce" runs it at once, stamped with its own time.
+
+LATE_POLICIES = ("skip", "coalesce")
+
+
+class ScheduledTask:
+    def __init__(self, period, func, name, offset=0.0):
+        self.period = period
+        self.func = func
+        self.name = name
+        self.offset = offset
+        self.next_tick = None
+        self.last_tick = None
+        self.last_duration = None
+        self.runs = 0
+        self.overruns = 0
+        self.missed = 0
+
+    def tick_at_or_before(self, now):
+        return math.floor((now - self.offset) / self.period) * self.period + self.offset
+
+    def tick_after(self, now):
+        return self.tick_at_or_before(now) + self.period
+
+
+class TickScheduler:
+    """
+    Runs tasks at fixed wall-clock cadences, e.g.
+
+        scheduler = TickScheduler()
+        scheduler.every(5, collect_usage, "usage")
+        scheduler.every(60, collect_capacity, "capacity")
+        scheduler.run()
+
+    Tasks due on the same tick run in the order they were added.
+    """
+
+    def __init__(self, late="skip", tolerance=0.25, clock=time.time, sleep=time.sleep):
+        if late not in LATE_POLICIES:
+            raise ValueError(f"late must be one of {LATE_POLICIES}, got {late!r}")
+        self.late = late
+        self.tolerance = tolerance
+        self.clock = clock
+        self.sleep = sleep
+        self.tasks = []
+
+    def every(self, period, func, name=None, offset=0.0):
+        """Call func(tick) on every multiple of `period` seconds (plus `offset`)."""
+        if period <= 0:
+            raise ValueError("period must be positive")
+        self.tasks.append(ScheduledTask(period, func, name or getattr(func, "__name__", "task"), offset))
+        return self
+
+    def run_pending(self):
+        """Run every task whose tick has come; return seconds until the next tick."""
+        now = self.clock()
+        for task in self.tasks:
+            if task.next_tick is None:
+                # Start on the next tick, not immediately
+                task.next_tick = task.tick_after(now)
+
+        for task in sorted(self.tasks, key=lambda task: task.next_tick):
+            now = self.clock()
+            if task.next_tick > now:
+                continue
+
+            latest = task.tick_at_or_before(now)
+            # Ticks before the latest one were passed over entirely
+            missed = round((latest - task.next_tick) / task.period)
+            late = now - latest > self.tolerance
+            if self.late == "skip" and late:
+                missed += 1
+            if missed:
+                task.missed += missed
+                print(f"[WARNING] {task.name}: {missed} tick(s) missed, "
+                      f"{'running the latest late' if self.late == 'coalesce' else 'waiting for the next tick'}")
+            if self.late == "skip" and late:
+                task.next_tick = latest + task.period
+                continue
+
+            self._run(task, latest)
+
+        return max(0.0, min(task.next_tick for task in self.tasks) - self.clock())
+
+    def _run(self, task, tick):
+        started = self.clock()
+        try:
+            task.func(tick)
+        finally:
+            finished = self.clock()
+            task.runs += 1
+            task.last_tick = tick
+            task.last_duration = finished - started
+            task.next_tick = tick + task.period
+            if finished > task.next_tick:
+                task.overruns += 1
+                print(f"[WARNING] {task.name} overran: took {task.last_duration:.2f}s, "
+                      f"finished {finished - tick:.2f}s after its tick (interval {task.period}s)")
+
+    def run(self, stop=None):
+        """Run until `stop` (a threading.Event) is set, or forever."""
+        if not self.tasks:
+            raise ValueError("no tasks scheduled")
+        while stop is None or not stop.is_set():
+            delay = self.run_pending()
+            if stop is not None:
+                stop.wait(delay)
+            else:
+                self.sleep(delay)
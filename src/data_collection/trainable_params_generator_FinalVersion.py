@@ -1,223 +1,171 @@
-import requests
+import os
+import sys
 import pandas as pd
 import time
-import subprocess
-import json
 from kubernetes import client, config
+from event_index import EventIndex
+from k8s_watch import ClusterCache, EventStream
+from labeling import THRESHOLDS, label_records
+from metric_schema import format_csv_value
+from metrics_sink import CsvAppendSink
+from owner_refs import build_pod_deployment_map, controller_of
+from counter_rates import CounterRates
+from promql_bulk import collect_bulk
+from promql_executor import PromQLExecutor
+from query_cache import QueryCache, split_refresh_intervals
+from tick_scheduler import TickScheduler
 
 config.load_kube_config(context="kind-kind")
 prometheus_url = "http://localhost:9090"
 v1 = client.CoreV1Api()
 
+# Output written incrementally each cycle: "csv" appends to OUTPUT_CSV,
+# "parquet" writes typed hour-partitioned files under OUTPUT_PARQUET_DIR
+OUTPUT_FORMAT = "csv"
+OUTPUT_CSV = "k8s_pod_metrics.csv"
+OUTPUT_PARQUET_DIR = "k8s_pod_metrics"
+CSV_FLUSH_ROWS = 5000
+CSV_FLUSH_SECONDS = 30
+PARQUET_FLUSH_ROWS = 50000
+PARQUET_FLUSH_SECONDS = 300
+
+# Collect on fixed wall-clock ticks (every COLLECT_INTERVAL seconds at :00, :05, ...)
+# and stamp rows with the tick. LATE_TICKS is "skip" (wait for the next tick after
+# an overrun) or "coalesce" (run the latest late tick at once)
+COLLECT_INTERVAL = 5
+LATE_TICKS = "skip"
+
+# Query every metric once for all objects instead of once per object
+BULK_QUERIES = True
+
+# With BULK_QUERIES, compute sum(rate(counter[5m])) queries from raw counter
+# samples kept between cycles instead of a range evaluation in Prometheus
+CLIENT_SIDE_RATES = False
+counter_rates = CounterRates()
+
+# Metrics written as (query, refresh seconds) in the query tables are cached per
+# object for that long; watched spec changes invalidate them early
+QUERY_CACHE = True
+SPEC_REFRESH_SECONDS = 300
+CAPACITY_REFRESH_SECONDS = 600
+
+# Concurrent PromQL executor settings
+PROMQL_MAX_WORKERS = 16
+PROMQL_TIMEOUT = 10
+PROMQL_RETRIES = 2
+executor = PromQLExecutor(prometheus_url, max_workers=PROMQL_MAX_WORKERS, timeout=PROMQL_TIMEOUT, retries=PROMQL_RETRIES)
 
-def run_promql_query(query):
-    response = requests.get(f"{prometheus_url}/api/v1/query", params={"query": query})
-    response.raise_for_status()
-    return response.json().get("data", {}).get("result", [])
 
-seen_event_uids = set()
+def run_promql_query(query):
+    return executor.query(query)
+
+def collect_per_object(query_sets, failed=None, skip=None):
+    # Same result shape (and failed set) as collect_bulk, one query per object
+    # and metric; the (placeholder, object, metric) in `skip` are not queried
+    # and left out of the result
+    queries = {}
+    for placeholder, (templates, objects) in query_sets.items():
+        for obj in objects:
+            for metric_name, query in templates.items():
+                key = (placeholder, tuple(obj), metric_name)
+                if skip is None or key not in skip:
+                    queries[key] = query.replace(placeholder, obj[-1])
+
+    results = executor.run_many(queries)
+
+    collected = {placeholder: {tuple(obj): {} for obj in objects} for placeholder, (_, objects) in query_sets.items()}
+    for (placeholder, obj, metric_name), result in results.items():
+        collected[placeholder][obj][metric_name] = float(result[0]['value'][1]) if result else None
+        if result is None and failed is not None:
+            failed.add((placeholder, obj, metric_name))
+    return collected
+
+# Started on first use; keeps a watch open instead of listing every event each cycle
+event_stream = None
 def fetch_new_k8s_events():
-    config.load_kube_config()
-    v1 = client.CoreV1Api()
-    try:
-        all_events = v1.list_event_for_all_namespaces(watch=False).items
-        new_events = []
-        for event in all_events:
-            if event.metadata.uid not in seen_event_uids:
-                seen_event_uids.add(event.metadata.uid)
-                new_events.append(event)
-        return new_events
-    except Exception as e:
-        return []
+    global event_stream
+    if event_stream is None:
+        event_stream = EventStream().start()
+    return event_stream.drain()
+
+# Read pods, nodes and deployments from a watch-fed local cache instead of a full LIST every cycle
+USE_WATCH_CACHE = True
+cluster_cache = None
+def get_cluster_cache():
+    global cluster_cache
+    if cluster_cache is None:
+        cluster_cache = ClusterCache().start()
+    return cluster_cache
 
 def get_k8s_pods():
+    if USE_WATCH_CACHE:
+        return get_cluster_cache().get_pods()
     v1 = client.CoreV1Api()
     pods = v1.list_pod_for_all_namespaces(watch=False)
     return [(pod.metadata.namespace, pod.metadata.name, pod.spec.node_name) for pod in pods.items]
 
 def get_k8s_nodes():
+    if USE_WATCH_CACHE:
+        return get_cluster_cache().get_nodes()
     v1 = client.CoreV1Api()
     nodes = v1.list_node(watch=False)
     return [node.metadata.name for node in nodes.items]
 
 def get_k8s_deployments():
+    if USE_WATCH_CACHE:
+        return get_cluster_cache().get_deployments()
     v1 = client.AppsV1Api()
     deployments = v1.list_deployment_for_all_namespaces(watch=False)
     return [(deployment.metadata.namespace, deployment.metadata.name) for deployment in deployments.items]
 
-def check_node_error(metrics, events):
-   
-    errors = []
-
-    # CPU Pressure
-    cpu_usage_threshold = 80  
-    cpu_usage = metrics.get("node_cpu_usage")
-    if cpu_usage is not None and cpu_usage > cpu_usage_threshold:
-        errors.append("CPU Pressure")
-    # Disk Pressure
-    disk_usage_threshold = 90
-    if metrics.get("node_disk_pressure", 0) == 1:
-        errors.append("Disk Pressure")
-
-    # Memory Pressure
-    memory_usage_threshold = 90  
-    memory_usage = metrics.get("node_memory_usage")
-    if memory_usage is not None and memory_usage > memory_usage_threshold:
-        errors.append("Memory Pressure")
-
-    disk_usage = metrics.get("node_disk_usage")
-    if disk_usage is not None and disk_usage > disk_usage_threshold:
-        errors.append("Disk Pressure")
-
-    for event in events:
-        a = "".join(event.message) if event.message else "" 
-
-        if "MemoryPressure" in a:
-            errors.append("Memory Pressure")
-
-        if "DiskPressure" in a:
-            errors.append("Disk Pressure")
-
-        if "NetworkUnavailable" in a:
-            errors.append("Network Unavailable")
-
-        if "NodeNotReady" in a:
-            errors.append("Node Not Ready")
-
-        if "PIDPressure" in a:
-            errors.append("PID Pressure")
-
-        if "Taint" in a or "node.kubernetes.io/unsche":
-            errors.append("Node Unschedulable")
-
-    return errors
-
-def check_pod_error(metrics, events):
-    
-    errors = []
-
-
-    # CPU Throttling
-    cpu_throttle_threshold = 0.75  
-    if metrics.get("cpu_throttling", 0) > cpu_throttle_threshold:
-        errors.append("CPU Throttling")
-
-    # Check CPU usage
-    cpu_usage_threshold = 80
-    cpu_usage = metrics.get("cpu_usage")
-    if cpu_usage is not None and cpu_usage > cpu_usage_threshold:
-        errors.append("High CPU Usage")
-  
-
-
-
-    for event in events:
-        a = "".join(event.message) if event.message else ""  
-
-        if "OOMKilled" in a:
-            errors.append("Out of Memory (OOMKilled)")
-
-        if "Back-off" in a:
-            errors.append("CrashLoopBackOff")
-
-        if "ContainerCreating" in a or "Back-off pulling image" in a:
-            errors.append("ContainerNotReady")
-
-        if "FailedScheduling" in a:
-            errors.append("PodUnschedulable")
-
-        if "MemoryPressure" in a or "DiskPressure" in a:
-            errors.append("NodePressure")
-
-        if "ErrImagePull" in a or "ImagePullBackOff" in a:
-            errors.append("ImagePullFailure")
-
-    return errors
-
-def check_deployment_error(metrics, events):
-    
-
-    errors = []
-
-    # Replica Mismatch (desired vs available replicas)
-    desired_replicas = metrics.get("deployment_replicas", 0)
-    available_replicas = metrics.get("deployment_available_replicas", 0)
-    if desired_replicas != available_replicas:
-        errors.append("Replica Mismatch")
-
-    # Unavailable Pods (No ready pods available)
-    if available_replicas == 0:
-        errors.append("Unavailable Pods")
-
-    for event in events:
-        a = "".join(event.message) if event.message else ""  
-
-        if "ErrImagePull" in a or "ImagePullBackOff" in a:
-            errors.append("ImagePullFailure")
-
-        if "Back-off" in a:
-            errors.append("CrashLoopBackOff")
-
-        if "FailedScheduling" in a:
-            errors.append("FailedScheduling")
-
-        if "QuotaExceeded" in a:
-            errors.append("QuotaExceeded")
-
-        if "ProgressDeadlineExceeded" in a:
-            errors.append("ProgressDeadlineExceeded")
-
-    return errors
-
-def filter_events_for_node(events, node_name):
-    node_related_events = []
-    for event in events:
-        obj = event.involved_object
-        if obj.kind == "Node" and obj.name == node_name:
-            node_related_events.append(event)
-    return node_related_events
-
-def filter_events_for_deployment(events, namespace, deployment_name):
-    deployment_related_events = []
-    for event in events:
-        obj = event.involved_object
-        if (obj.kind == "Deployment" and
-            obj.name == deployment_name and
-            obj.namespace == namespace):
-            deployment_related_events.append(event)
-
-    return deployment_related_events
-def filter_events_for_pod(events, namespace, pod_name):
-    pod_related_events = []
-    for event in events:
-        obj = event.involved_object
-        if (obj.kind == "Pod" and
-            obj.name == pod_name and
-            obj.namespace == namespace):
-            pod_related_events.append(event)
-
-    return pod_related_events
-
-
-
+def get_pod_deployments():
+    # {(namespace, pod): "namespace/deployment"} via pod -> ReplicaSet -> Deployment ownerReferences
+    if USE_WATCH_CACHE:
+        return get_cluster_cache().get_pod_deployments()
+    core = client.CoreV1Api()
+    apps = client.AppsV1Api()
+    pods = core.list_pod_for_all_namespaces(watch=False)
+    replicasets = apps.list_replica_set_for_all_namespaces(watch=False)
+    pod_owners = {(pod.metadata.namespace, pod.metadata.name): controller_of(pod) for pod in pods.items}
+    replicaset_owners = {(rs.metadata.namespace, rs.metadata.name): controller_of(rs) for rs in replicasets.items}
+    return build_pod_deployment_map(pod_owners, replicaset_owners)
+
+# Score each cycle with a trained model (e.g. "../../models/lstm_model.h5", or a .tflite/.onnx
+# export from model_training/export_models.py); None disables it
+SCORER_MODEL = None
+# Preprocessing saved with the model (model_training/preprocessing.py), required with
+# SCORER_MODEL: the model's feature columns, label encodings and scaling
+SCORER_PREPROCESSING = None
+SCORER_ALERT_THRESHOLD = 0.5
+scorer = None
+def get_scorer():
+    # Loaded once, before the first cycle; OnlineScorer checks the feature count against the model input
+    global scorer
+    if scorer is None:
+        if not SCORER_PREPROCESSING:
+            raise ValueError("SCORER_MODEL needs SCORER_PREPROCESSING, the preprocessing saved with the model; "
+                             "raw rows are not encoded or scaled as the model was trained")
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_training"))
+        from online_scorer import OnlineScorer
+        from preprocessing import Preprocessor
+        scorer = OnlineScorer(SCORER_MODEL, preprocessor=Preprocessor.load(SCORER_PREPROCESSING))
+    return scorer
 
 def main():
-    prom_url = "http://localhost:9090"
-
     # PromQL queries
     pod_queries = {
        
         # CPU Metrics
         "cpu_usage": '((sum(rate(container_cpu_usage_seconds_total{pod="{pod}"}[5m])) or vector(0)) / (sum(kube_pod_container_resource_limits{pod="{pod}", resource="cpu"}) or sum(kube_node_status_allocatable{resource="cpu"}))) * 100',
-        "cpu_limit": 'sum(kube_pod_container_resource_limits{pod="{pod}", resource="cpu"}) or vector(0)',
-        "cpu_request": 'sum(kube_pod_container_resource_requests{pod="{pod}", resource="cpu"}) or vector(0)',
+        "cpu_limit": ('sum(kube_pod_container_resource_limits{pod="{pod}", resource="cpu"}) or vector(0)', SPEC_REFRESH_SECONDS),
+        "cpu_request": ('sum(kube_pod_container_resource_requests{pod="{pod}", resource="cpu"}) or vector(0)', SPEC_REFRESH_SECONDS),
         "cpu_throttling": 'sum(rate(container_cpu_cfs_throttled_seconds_total{pod="{pod}"}[5m])) OR vector(0)',
 
 
         # Memory Metrics
         "memory_usage": 'sum(container_memory_usage_bytes{pod="{pod}"})',
-        "memory_limit": 'sum(kube_pod_container_resource_limits{pod="{pod}", resource="memory"}) or vector(0)',
-        "memory_request": 'sum(kube_pod_container_resource_requests{pod="{pod}", resource="memory"}) or vector(0)',
+        "memory_limit": ('sum(kube_pod_container_resource_limits{pod="{pod}", resource="memory"}) or vector(0)', SPEC_REFRESH_SECONDS),
+        "memory_request": ('sum(kube_pod_container_resource_requests{pod="{pod}", resource="memory"}) or vector(0)', SPEC_REFRESH_SECONDS),
         "memory_rss": 'sum(container_memory_rss{pod="{pod}"})',
 
         # Network Metrics
@@ -256,15 +204,15 @@ def main():
     node_queries = {
         # CPU Metrics
         "node_cpu_usage": '(sum(rate(node_cpu_seconds_total{mode!="idle", node="{node}"}[5m])) or vector(0)) * 100',
-        "node_cpu_capacity": 'sum(kube_node_status_capacity{node="{node}", resource="cpu"}) or vector(0)',
-        "node_cpu_allocatable": 'sum(kube_node_status_allocatable{node="{node}", resource="cpu"}) or vector(0)',
+        "node_cpu_capacity": ('sum(kube_node_status_capacity{node="{node}", resource="cpu"}) or vector(0)', CAPACITY_REFRESH_SECONDS),
+        "node_cpu_allocatable": ('sum(kube_node_status_allocatable{node="{node}", resource="cpu"}) or vector(0)', CAPACITY_REFRESH_SECONDS),
         "node_cpu_utilization_ratio": 'sum(rate(node_cpu_seconds_total{node="{node}", mode!="idle"}[5m])) / sum(kube_node_status_allocatable{node="{node}", resource="cpu"})',
         
 
         # Memory Metrics
         "node_memory_usage": '((1 - (sum(node_memory_MemAvailable_bytes) or vector(0)) / (sum(node_memory_MemTotal_bytes) or vector(1))) * 100)',
-        "node_memory_capacity": 'sum(kube_node_status_capacity{node="{node}", resource="memory"}) or vector(0)',
-        "node_memory_allocatable": 'sum(kube_node_status_allocatable{node="{node}", resource="memory"}) or vector(0)',
+        "node_memory_capacity": ('sum(kube_node_status_capacity{node="{node}", resource="memory"}) or vector(0)', CAPACITY_REFRESH_SECONDS),
+        "node_memory_allocatable": ('sum(kube_node_status_allocatable{node="{node}", resource="memory"}) or vector(0)', CAPACITY_REFRESH_SECONDS),
         "node_memory_utilization_ratio": '1 - (node_memory_MemAvailable_bytes{node="{node}"} / node_memory_MemTotal_bytes{node="{node}"})',
         "node_memory_pressure": 'max(kube_node_status_condition{node="{node}", condition="MemoryPressure", status="true"}) or vector(0)',
 
@@ -276,7 +224,7 @@ def main():
        #"node_disk_write_bytes": 'sum(rate(node_disk_written_bytes_total{instance=~"{node}.*"}[5m])) or vector(0)',
         "node_disk_write_bytes":'sum(rate(node_disk_written_bytes_total[5m])) or vector(0)',
         "node_disk_pressure": 'max(kube_node_status_condition{node="{node}", condition="DiskPressure", status="true"}) or vector(0)',
-        "node_disk_capacity": 'sum(node_filesystem_size_bytes{instance=~"{node}.*", mountpoint="/"}) or vector(0)',
+        "node_disk_capacity": ('sum(node_filesystem_size_bytes{instance=~"{node}.*", mountpoint="/"}) or vector(0)', CAPACITY_REFRESH_SECONDS),
         #"node_disk_available": 'sum(node_filesystem_avail_bytes{instance=~"{node}.*", mountpoint="/"}) or vector(0)',
         "node_disk_utilization_ratio": '1 - ((sum(node_filesystem_avail_bytes{instance=~"{node}.*", mountpoint="/"}) or vector(0)) / (sum(node_filesystem_size_bytes{instance=~"{node}.*", mountpoint="/"}) or vector(1)))',
 
@@ -292,7 +240,7 @@ def main():
 
         # Pod Scheduling Metrics
         "node_pods_running": 'count(kube_pod_info{node="{node}"}) or vector(0)',
-        "node_pods_allocatable": 'sum(kube_node_status_allocatable_pods{node="{node}"}) or vector(0)',
+        "node_pods_allocatable": ('sum(kube_node_status_allocatable_pods{node="{node}"}) or vector(0)', CAPACITY_REFRESH_SECONDS),
         "node_pods_usage_ratio": '((count(kube_pod_info{node="{node}"}) or vector(0)) / (sum(kube_node_status_allocatable_pods{node="{node}"}) or vector(1)))',
 
         # Node Uptime and Kubelet Health
@@ -311,7 +259,7 @@ def main():
     }
     deployment_queries = {
         # Replica Metrics
-        "deployment_replicas": 'sum(kube_deployment_spec_replicas{deployment="{deployment}"})',
+        "deployment_replicas": ('sum(kube_deployment_spec_replicas{deployment="{deployment}"})', SPEC_REFRESH_SECONDS),
         "deployment_available_replicas": 'sum(kube_deployment_status_available_replicas{deployment="{deployment}"})',
         "deployment_unavailable_replicas": 'sum(kube_deployment_status_replicas_unavailable{deployment="{deployment}"})',
         "deployment_updated_replicas": 'sum(kube_deployment_status_updated_replicas{deployment="{deployment}"})',
@@ -319,14 +267,14 @@ def main():
 
         # CPU Metrics
         "deployment_cpu_usage": 'sum(rate(container_cpu_usage_seconds_total{container!="", pod=~"{deployment}-.*"}[5m]))',
-        "deployment_cpu_requests": 'sum(kube_pod_container_resource_requests_cpu_cores{pod=~"{deployment}-.*"})',
-        "deployment_cpu_limits": 'sum(kube_pod_container_resource_limits_cpu_cores{pod=~"{deployment}-.*"})',
+        "deployment_cpu_requests": ('sum(kube_pod_container_resource_requests_cpu_cores{pod=~"{deployment}-.*"})', SPEC_REFRESH_SECONDS),
+        "deployment_cpu_limits": ('sum(kube_pod_container_resource_limits_cpu_cores{pod=~"{deployment}-.*"})', SPEC_REFRESH_SECONDS),
         "deployment_cpu_utilization_ratio": 'sum(rate(container_cpu_usage_seconds_total{container!="", pod=~"{deployment}-.*"}[5m])) / clamp_min(sum(kube_pod_container_resource_limits_cpu_cores{pod=~"{deployment}-.*"}), 1)',
 
         # Memory Metrics
         "deployment_memory_usage": 'sum(container_memory_usage_bytes{container!="", pod=~"{deployment}-.*"})',
-        "deployment_memory_requests": 'sum(kube_pod_container_resource_requests_memory_bytes{pod=~"{deployment}-.*"})',
-        "deployment_memory_limits": 'sum(kube_pod_container_resource_limits_memory_bytes{pod=~"{deployment}-.*"})',
+        "deployment_memory_requests": ('sum(kube_pod_container_resource_requests_memory_bytes{pod=~"{deployment}-.*"})', SPEC_REFRESH_SECONDS),
+        "deployment_memory_limits": ('sum(kube_pod_container_resource_limits_memory_bytes{pod=~"{deployment}-.*"})', SPEC_REFRESH_SECONDS),
         "deployment_memory_utilization_ratio": 'sum(container_memory_usage_bytes{container!="", pod=~"{deployment}-.*"}) / clamp_min(sum(kube_pod_container_resource_limits_memory_bytes{pod=~"{deployment}-.*"}), 1)',
 
         # Pod Health Metrics
@@ -362,7 +310,7 @@ def main():
         # Deployment Conditions
         "deployment_progressing": 'sum(kube_deployment_status_condition{deployment="{deployment}", condition="Progressing", status="true"}) > 0',
         "deployment_available": 'sum(kube_deployment_status_condition{deployment="{deployment}", condition="Available", status="true"}) > 0',
-        "deployment_paused": 'max(kube_deployment_spec_paused{deployment="{deployment}"})',
+        "deployment_paused": ('max(kube_deployment_spec_paused{deployment="{deployment}"})', SPEC_REFRESH_SECONDS),
 
         # Crash and Errors
         #"deployment_image_pull_error": 'sum(kube_pod_container_status_waiting_reason{pod=~"{deployment}-.*", reason=~"ImagePullBackOff|ErrImagePull"})',
@@ -370,109 +318,117 @@ def main():
         #"deployment_node_not_ready": 'sum(kube_pod_status_reason{pod=~"{deployment}-.*", reason="NodeNotReady"})',
     }
 
-    data = []
-    while True:
-        timestamp = pd.Timestamp.now()
+    pod_queries, pod_refresh = split_refresh_intervals(pod_queries)
+    node_queries, node_refresh = split_refresh_intervals(node_queries)
+    deployment_queries, deployment_refresh = split_refresh_intervals(deployment_queries)
+    query_cache = QueryCache({**pod_refresh, **node_refresh, **deployment_refresh}) if QUERY_CACHE else None
+
+    # A model that cannot score the collected rows fails here, not after the first cycle
+    if SCORER_MODEL:
+        get_scorer()
+
+    if OUTPUT_FORMAT == "parquet":
+        from parquet_store import ParquetSink
+        sink = ParquetSink(OUTPUT_PARQUET_DIR, flush_rows=PARQUET_FLUSH_ROWS, flush_interval=PARQUET_FLUSH_SECONDS)
+    else:
+        # Gauges written at float32 precision, flags as 0/1 (see metric_schema)
+        sink = CsvAppendSink(OUTPUT_CSV, flush_rows=CSV_FLUSH_ROWS, flush_interval=CSV_FLUSH_SECONDS,
+                             format_value=format_csv_value)
+    try:
+        collect_loop(sink, pod_queries, node_queries, deployment_queries, query_cache)
+    finally:
+        sink.close()
+
+
+def collect_loop(sink, pod_queries, node_queries, deployment_queries, query_cache=None):
+    scheduler = TickScheduler(late=LATE_TICKS)
+    if query_cache is not None:
+        # Each refresh interval is also a wall-clock cadence: cached metrics are
+        # re-queried by the collection tick that falls on it
+        for interval in sorted(set(query_cache.refresh_intervals.values())):
+            metrics = [metric for metric, every in query_cache.refresh_intervals.items() if every == interval]
+            scheduler.every(interval, lambda tick, metrics=metrics: query_cache.expire(metrics), f"refresh-{interval}s")
+
+    def collect_cycle(tick):
+        timestamp = pd.Timestamp.fromtimestamp(tick)
+        cycle_start = time.monotonic()
 
         pods = get_k8s_pods()
-        events = fetch_new_k8s_events()
+        # Indexed once per cycle by involved object
+        events = EventIndex(fetch_new_k8s_events())
         nodes = get_k8s_nodes()
         deployments = get_k8s_deployments()
+        pod_deployments = get_pod_deployments()
 
-        node_data = {}
         deployment_data = {}
 
-        for namespace, deployment_name in deployments:
-
-            deployment_metrics = {}
-
-            for metric_name, query in deployment_queries.items():
-                
-                query = query.replace("{deployment}", deployment_name)
-
-             
-                results = run_promql_query(query)
-
-               
-                deployment_metrics[metric_name] = float(results[0]['value'][1]) if results else None
-
-            
-            deployment_events = filter_events_for_deployment(events, namespace, deployment_name)
-
-            derrors = check_deployment_error(deployment_metrics, deployment_events)
-
-            for i in ['Replica Mismatch', 'Unavailable Pods', 'ImagePullFailure', 'CrashLoopBackOff', 'FailedScheduling', 'QuotaExceeded', 'ProgressDeadlineExceeded']:
-                deployment_metrics["deployment "+i] = 1 if i in derrors else 0
-
+        # Pod, node and deployment query sets are issued as one concurrent batch
+        query_sets = {
+            "{deployment}": (deployment_queries, deployments),
+            "{node}": (node_queries, [(node,) for node in nodes]),
+            "{pod}": (pod_queries, [(namespace, pod_name) for namespace, pod_name, _ in pods]),
+        }
+        if BULK_QUERIES:
+            def collect(query_sets, failed=None, skip=None):
+                # One query per metric covers every object, so nothing is skipped
+                return collect_bulk(query_sets, executor.run_many, rates=counter_rates if CLIENT_SIDE_RATES else None,
+                                    failed=failed)
+        else:
+            collect = collect_per_object
+
+        if query_cache is not None:
+            if USE_WATCH_CACHE:
+                for kind, objects in get_cluster_cache().drain_spec_changes().items():
+                    for obj in objects:
+                        query_cache.invalidate("{%s}" % kind, obj)
+            collected = query_cache.collect(query_sets, collect)
+        else:
+            collected = collect(query_sets)
+
+        # Error labels of every object of a kind in one pass (labeling.py), with
+        # the threshold rules as of this cycle (threshold_rules.json is reloaded
+        # when edited)
+        thresholds = THRESHOLDS.current()
+        deployment_records = [collected["{deployment}"][(namespace, deployment_name)]
+                              for namespace, deployment_name in deployments]
+        label_records("deployment", deployment_records, events, deployments, thresholds,
+                      {"namespace": [namespace for namespace, _ in deployments],
+                       "deployment": [deployment_name for _, deployment_name in deployments]},
+                      prefix="deployment ")
+        for (namespace, deployment_name), deployment_metrics in zip(deployments, deployment_records):
             deployment_data[f"{namespace}/{deployment_name}"] = deployment_metrics
 
+        node_records = [collected["{node}"][(node,)] for node in nodes]
+        label_records("node", node_records, events, [(None, node) for node in nodes], thresholds, {"node": nodes})
+        node_data = dict(zip(nodes, node_records))
 
-            
-        for node in nodes:
-            node_metrics = {}
-
-            
-            for metric_name, query in node_queries.items():
-                query = query.replace("{node}", node)
-                results = run_promql_query(query)
-                node_metrics[metric_name] = float(results[0]['value'][1]) if results else None
-
-            
-            node_events = filter_events_for_node(events, node)
-
-
-            nerrors = check_node_error(node_metrics, node_events)
-
-            for i in ['CPU Pressure', 'Memory Pressure', 'Disk Pressure', 'Network Unavailable', 'Node Not Ready', 'PID Pressure', 'Node Unschedulable']:
-                node_metrics[i] = 1 if i in nerrors else 0
-
-            node_data[node] = node_metrics
-
-
-
-        pod_data = {}
-
+        pod_records = []
         for namespace, pod_name, node in pods:
-
             pod_metrics = {
                 "timestamp": timestamp,
                 "namespace": namespace,
                 "pod": pod_name,
                 "node": node
             }
+            pod_metrics.update(collected["{pod}"][(namespace, pod_name)])
+            pod_records.append(pod_metrics)
+        label_records("pod", pod_records, events, [(namespace, pod_name) for namespace, pod_name, _ in pods], thresholds,
+                      {"namespace": [namespace for namespace, _, _ in pods],
+                       "deployment": [pod_deployments[(namespace, pod_name)].partition("/")[2]
+                                      if (namespace, pod_name) in pod_deployments else None
+                                      for namespace, pod_name, _ in pods],
+                       "node": [node for _, _, node in pods]})
 
-            for metric_name, query in pod_queries.items():
-                query = query.replace("{pod}", pod_name)
+        rows = []
 
-                results = run_promql_query(query)
-                pod_metrics[metric_name] = float(results[0]['value'][1]) if results else None
+        for (namespace, pod_name, node), pod_metrics in zip(pods, pod_records):
 
-            # Filter events specific to this pod
-            pod_events = filter_events_for_pod(events, namespace, pod_name)
-
-            # Run error checks on pod metrics + events
-            perrors = check_pod_error(pod_metrics, pod_events)
-            for i in [
-                "CPU Throttling", "High CPU Usage", "OOMKilled (Out of Memory)",
-                "CrashLoopBackOff", "ContainerNotReady", "PodUnschedulable",
-                "NodePressure", "ImagePullFailure" 
-            ]:
-                pod_metrics[i] = 1 if i in perrors else 0
-
-            # Store pod metrics
-            pod_data[f"{namespace}/{pod_name}"] = pod_metrics
-
-            
-            deployment_key = next(
-                (key for key in deployment_data
-                if key.startswith(f"{namespace}/") and pod_name.startswith(key.split("/", 1)[1])),
-                None
-            )
+            deployment_key = pod_deployments.get((namespace, pod_name))
 
             node_metrics = node_data.get(node, {})
             combined_metrics = {**pod_metrics, **node_metrics}
 
-            if deployment_key:
+            if deployment_key in deployment_data:
                 combined_metrics.update(deployment_data[deployment_key])
                 combined_metrics["deployment"] = deployment_key
 
@@ -485,14 +441,23 @@ def main():
                 combined_metrics.update(temp)
                 combined_metrics["deployment"] = "None"
 
-            data.append(combined_metrics)
+            rows.append(combined_metrics)
+
 
+        sink.write(rows)
+        print(f"Added data to {OUTPUT_FORMAT} at ", timestamp)
 
-        df = pd.DataFrame(data)
-        df.to_csv("k8s_pod_metrics.csv", index=False)
-        print("Added data to csv at ", timestamp)
+        if SCORER_MODEL and rows:
+            model_scorer = get_scorer()
+            predictions = model_scorer.score(rows, scraped_at=cycle_start)
+            for (namespace, pod_name), target, score in model_scorer.alerts(SCORER_ALERT_THRESHOLD):
+                print(f"[PREDICTION] {namespace}/{pod_name}: {target} ({score:.2f})")
+            if predictions:
+                print(f"Scored {len(predictions)} pods in {model_scorer.last_predict_time * 1000:.1f} ms, "
+                      f"{model_scorer.last_latency:.2f}s after scrape start")
 
-        time.sleep(5)
+    scheduler.every(COLLECT_INTERVAL, collect_cycle, "collect")
+    scheduler.run()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,21 @@
 import subprocess
+import numpy as np
 import pandas as pd
-import time
 from datetime import datetime
+from labeling import over_threshold
+from tick_scheduler import TickScheduler
+
+# Read pods, usage, events and logs through the Kubernetes API (k8s_api_backend.py)
+# instead of one kubectl process per pod and column; False uses kubectl
+USE_API_BACKEND = True
+api_backend = None
+def get_api_backend():
+    # Created on first use, keeping its API connections across cycles
+    global api_backend
+    if api_backend is None:
+        from k8s_api_backend import ApiBackend
+        api_backend = ApiBackend()
+    return api_backend
 
 # Function to execute shell commands
 def run_command(command):
@@ -9,7 +23,13 @@ def run_command(command):
     return result.stdout.strip()
 
 # Function to fetch all trainable model parameters from Kubernetes
-def get_trainable_params():
+def get_trainable_params(tick):
+    # Every row of a cycle carries the scheduler's intended tick
+    timestamp = datetime.fromtimestamp(tick).isoformat()
+
+    if USE_API_BACKEND:
+        return pd.DataFrame(get_api_backend().trainable_params(timestamp, details=False, logs=False))
+
     command = "kubectl top pod --no-headers --all-namespaces"
     output = run_command(command)
 
@@ -19,7 +39,7 @@ def get_trainable_params():
             parts = line.split()
             namespace, pod_name, cpu, mem = parts[0], parts[1], parts[2], parts[3]
             data.append({
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "namespace": namespace,
                 "pod_name": pod_name,
                 "cpu_usage_millicores": int(cpu.replace("m", "")),
@@ -71,6 +91,12 @@ def get_disk_usage(pod_name, namespace):
 def throttle_resources(namespace, pod_name):
     print(f"[WARNING] Throttling {pod_name} in {namespace} due to high resource usage.")
 
+    if USE_API_BACKEND:
+        if get_api_backend().set_pod_resources(namespace, pod_name, {"cpu": "100m", "memory": "128Mi"},
+                                               {"cpu": "50m", "memory": "64Mi"}):
+            print(f"✅ {pod_name} successfully throttled.")
+        return
+
     throttle_yaml = f"""
     apiVersion: v1
     kind: Pod
@@ -97,27 +123,25 @@ def throttle_resources(namespace, pod_name):
 
 # Function to label and throttle based on trainable parameters
 def label_and_throttle(df):
-    for _, row in df.iterrows():
-        cpu, mem, net, disk = row["cpu_usage_millicores"], row["memory_usage_mib"], row["network_io_kbps"], row["disk_io_kbps"]
+    over = over_threshold(df)
+    df["performance_label"] = np.where(over, "Suboptimal", "Optimal")
 
-        if cpu > 400 or mem > 400 or net > 500 or disk > 500:
-            print(f"[ALERT] {row['pod_name']} in {row['namespace']} is over threshold.")
-            throttle_resources(row["namespace"], row["pod_name"])
-            row["performance_label"] = "Suboptimal"
-        else:
-            row["performance_label"] = "Optimal"
+    for namespace, pod_name in df.loc[over, ["namespace", "pod_name"]].itertuples(index=False):
+        print(f"[ALERT] {pod_name} in {namespace} is over threshold.")
+        throttle_resources(namespace, pod_name)
 
     return df
 
 # Run monitoring & throttling loop
-while True:
+def collect_cycle(tick):
     print("[INFO] Collecting trainable model parameters...")
 
-    df_params = get_trainable_params()
+    df_params = get_trainable_params(tick)
     
     if not df_params.empty:
         df_params = label_and_throttle(df_params)
         df_params.to_csv("trainable_params_dataset.csv", index=False)
 
-    print("[INFO] Sleeping for 5 seconds before next check...")
-    time.sleep(5)
+
+# Every 5 s on the wall clock; a cycle that overruns is reported and the late tick skipped
+TickScheduler().every(5, collect_cycle, "collect").run()
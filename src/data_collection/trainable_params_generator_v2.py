@@ -1,7 +1,20 @@
 import subprocess
 import pandas as pd
-import time
 from datetime import datetime
+from labeling import performance_labels
+from tick_scheduler import TickScheduler
+
+# Read pods, usage, events and logs through the Kubernetes API (k8s_api_backend.py)
+# instead of one kubectl process per pod and column; False uses kubectl
+USE_API_BACKEND = True
+api_backend = None
+def get_api_backend():
+    # Created on first use, keeping its API connections across cycles
+    global api_backend
+    if api_backend is None:
+        from k8s_api_backend import ApiBackend
+        api_backend = ApiBackend()
+    return api_backend
 
 # Function to execute shell commands
 def run_command(command):
@@ -9,7 +22,13 @@ def run_command(command):
     return result.stdout.strip()
 
 # Function to fetch all trainable model parameters from Kubernetes
-def get_trainable_params():
+def get_trainable_params(tick):
+    # Every row of a cycle carries the scheduler's intended tick
+    timestamp = datetime.fromtimestamp(tick).isoformat()
+
+    if USE_API_BACKEND:
+        return pd.DataFrame(get_api_backend().trainable_params(timestamp, details=False, logs=True))
+
     command = "kubectl top pod --no-headers --all-namespaces"
     output = run_command(command)
 
@@ -19,7 +38,7 @@ def get_trainable_params():
             parts = line.split()
             namespace, pod_name, cpu, mem = parts[0], parts[1], parts[2], parts[3]
             data.append({
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "namespace": namespace,
                 "pod_name": pod_name,
                 "cpu_usage_millicores": int(cpu.replace("m", "")),
@@ -30,6 +49,10 @@ def get_trainable_params():
                 "error_count": get_error_count(pod_name, namespace),
             })
 
+    # Stop following pods that are gone
+    if log_follower is not None:
+        log_follower.retain((row["namespace"], row["pod_name"]) for row in data)
+
     return pd.DataFrame(data)
 
 # Function to fetch Network I/O usage
@@ -69,36 +92,35 @@ def get_disk_usage(pod_name, namespace):
 
     return total_io_kb if total_io_kb > 0 else 0  # Return 0 if no valid data
 
+# Followed incrementally: each call reads only log lines written since the last cycle
+log_follower = None
+def get_log_follower():
+    global log_follower
+    if log_follower is None:
+        from k8s_api_backend import load_config
+        from log_follower import LogFollower
+        load_config()
+        log_follower = LogFollower(tail_lines=10)
+    return log_follower
+
 # Function to fetch log lines
 def get_log_lines(pod_name, namespace):
-    command = f"kubectl logs -n {namespace} {pod_name} --tail=10"
-    result = run_command(command)
+    return get_log_follower().log_lines(namespace, pod_name)
 
-    if not result.strip() or "failed" in result.lower():
-        print(f"[WARNING] Could not fetch logs for {pod_name}. Setting to empty.")
-        return ""
-
-    return result
-
-# Function to fetch error count from logs
+# Function to fetch error count from logs (running total of lines containing "error")
 def get_error_count(pod_name, namespace):
-    command = f"kubectl logs -n {namespace} {pod_name} | grep -i 'error' | wc -l"
-    result = run_command(command)
-
-    if not result.strip() or "failed" in result.lower():
-        print(f"[WARNING] Could not fetch error count for {pod_name}. Setting to 0.")
-        return 0
-
-    try:
-        return int(result)
-    except ValueError:
-        print(f"[ERROR] Unexpected error count output: '{result}' for {pod_name}. Setting to 0.")
-        return 0
+    return get_log_follower().error_count(namespace, pod_name)
 
 # Function to throttle all high-resource-consuming trainable parameters
 def throttle_resources(namespace, pod_name):
     print(f"[WARNING] Throttling {pod_name} in {namespace} due to high resource usage.")
 
+    if USE_API_BACKEND:
+        if get_api_backend().set_pod_resources(namespace, pod_name, {"cpu": "100m", "memory": "128Mi"},
+                                               {"cpu": "50m", "memory": "64Mi"}):
+            print(f"✅ {pod_name} successfully throttled.")
+        return
+
     throttle_yaml = f"""
     apiVersion: v1
     kind: Pod
@@ -125,33 +147,28 @@ def throttle_resources(namespace, pod_name):
 
 # Function to label and throttle based on trainable parameters
 def label_and_throttle(df):
-    for index, row in df.iterrows():
-        cpu, mem, net, disk, error_count = row["cpu_usage_millicores"], row["memory_usage_mib"], row["network_io_kbps"], row["disk_io_kbps"], row["error_count"]
-
-        # Labeling logic
-        if error_count > 0:
-            df.at[index, "performance_label"] = "alert"  # Alert if there are any errors in logs
-        elif cpu > 400 or mem > 400 or net > 500 or disk > 500:
-            df.at[index, "performance_label"] = "bad"   # Bad if resource usage exceeds thresholds
-        else:
-            df.at[index, "performance_label"] = "good"   # Good if everything is within limits
-
-        # Throttle if performance is bad or alert
-        if df.at[index, "performance_label"] in ["bad", "alert"]:
-            print(f"[ALERT] {row['pod_name']} in {row['namespace']} is labeled as {df.at[index, 'performance_label']}.")
-            throttle_resources(row["namespace"], row["pod_name"])
+    # Labeling logic: alert if there are any errors in logs, bad if resource
+    # usage exceeds thresholds, good if everything is within limits
+    df["performance_label"] = performance_labels(df)
+
+    # Throttle if performance is bad or alert
+    flagged = df["performance_label"] != "good"
+    for namespace, pod_name, label in df.loc[flagged, ["namespace", "pod_name", "performance_label"]].itertuples(index=False):
+        print(f"[ALERT] {pod_name} in {namespace} is labeled as {label}.")
+        throttle_resources(namespace, pod_name)
 
     return df
 
 # Run monitoring & throttling loop
-while True:
+def collect_cycle(tick):
     print("[INFO] Collecting trainable model parameters...")
 
-    df_params = get_trainable_params()
+    df_params = get_trainable_params(tick)
     
     if not df_params.empty:
         df_params = label_and_throttle(df_params)
         df_params.to_csv("trainable_params_dataset.csv", index=False)
 
-    print("[INFO] Sleeping for 5 seconds before next check...")
-    time.sleep(5)
+
+# Every 5 s on the wall clock; a cycle that overruns is reported and the late tick skipped
+TickScheduler().every(5, collect_cycle, "collect").run()
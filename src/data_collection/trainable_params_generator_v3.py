@@ -1,7 +1,20 @@
 import subprocess
 import pandas as pd
-import time
 from datetime import datetime
+from labeling import performance_labels
+from tick_scheduler import TickScheduler
+
+# Read pods, usage, events and logs through the Kubernetes API (k8s_api_backend.py)
+# instead of one kubectl process per pod and column; False uses kubectl
+USE_API_BACKEND = True
+api_backend = None
+def get_api_backend():
+    # Created on first use, keeping its API connections across cycles
+    global api_backend
+    if api_backend is None:
+        from k8s_api_backend import ApiBackend
+        api_backend = ApiBackend()
+    return api_backend
 
 # Function to execute shell commands
 def run_command(command):
@@ -9,7 +22,13 @@ def run_command(command):
     return result.stdout.strip()
 
 # Function to fetch all trainable model parameters from Kubernetes
-def get_trainable_params():
+def get_trainable_params(tick):
+    # Every row of a cycle carries the scheduler's intended tick
+    timestamp = datetime.fromtimestamp(tick).isoformat()
+
+    if USE_API_BACKEND:
+        return pd.DataFrame(get_api_backend().trainable_params(timestamp, details=True, logs=True))
+
     command = "kubectl top pod --no-headers --all-namespaces"
     output = run_command(command)
 
@@ -29,7 +48,7 @@ def get_trainable_params():
             event_logs = get_event_logs(pod_name, namespace)
             
             data.append({
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "namespace": namespace,
                 "pod_name": pod_name,
                 "cpu_usage_millicores": int(cpu.replace("m", "")),
@@ -43,12 +62,16 @@ def get_trainable_params():
                 "log_lines": get_log_lines(pod_name, namespace),
                 "error_count": get_error_count(pod_name, namespace),
                 "restart_count": pod_details.get("restart_count", 0),
-                "pod_status": pod_details.get("status", "unknown"),
+                "pod_status": pod_details.get("pod_status", "unknown"),
                 "node_name": pod_details.get("node_name", "unknown"),
                 **deployment_metrics,  # Add deployment metrics
                 "event_logs": event_logs,  # Add event logs
             })
 
+    # Stop following pods that are gone
+    if log_follower is not None:
+        log_follower.retain((row["namespace"], row["pod_name"]) for row in data)
+
     return pd.DataFrame(data)
 
 # Function to fetch pod details (resource limits, requests, status, etc.)
@@ -198,37 +221,37 @@ def get_disk_usage(pod_name, namespace):
 
     return total_io_kb if total_io_kb > 0 else 0  # Return 0 if no valid data
 
+# Followed incrementally: each call reads only log lines written since the last cycle
+log_follower = None
+def get_log_follower():
+    global log_follower
+    if log_follower is None:
+        from k8s_api_backend import load_config
+        from log_follower import LogFollower
+        load_config()
+        log_follower = LogFollower(tail_lines=10)
+    return log_follower
+
 # Function to fetch log lines
 def get_log_lines(pod_name, namespace):
-    command = f"kubectl logs -n {namespace} {pod_name} --tail=10"
-    result = run_command(command)
-
-    if not result.strip() or "failed" in result.lower():
-        print(f"[WARNING] Could not fetch logs for {pod_name}. Setting to empty.")
-        return ""
-
-    return result
+    return get_log_follower().log_lines(namespace, pod_name)
 
-# Function to fetch error count from logs
+# Function to fetch error count from logs (running total of lines containing "error")
 def get_error_count(pod_name, namespace):
-    command = f"kubectl logs -n {namespace} {pod_name} | grep -i 'error' | wc -l"
-    result = run_command(command)
-
-    if not result.strip() or "failed" in result.lower():
-        print(f"[WARNING] Could not fetch error count for {pod_name}. Setting to 0.")
-        return 0
-
-    try:
-        return int(result)
-    except ValueError:
-        print(f"[ERROR] Unexpected error count output: '{result}' for {pod_name}. Setting to 0.")
-        return 0
+    return get_log_follower().error_count(namespace, pod_name)
 
 # Function to incrementally increase resource limits
 def increment_resources(namespace, pod_name, cpu_limit, mem_limit):
     print(f"[INFO] Incrementing resources for {pod_name} in {namespace}: CPU={cpu_limit}m, Memory={mem_limit}Mi")
 
-    increment_yaml = f """
+    if USE_API_BACKEND:
+        if get_api_backend().set_pod_resources(namespace, pod_name,
+                                               {"cpu": f"{cpu_limit}m", "memory": f"{mem_limit}Mi"},
+                                               {"cpu": f"{int(cpu_limit / 2)}m", "memory": f"{int(mem_limit / 2)}Mi"}):
+            print(f"✅ {pod_name} resources incremented to CPU={cpu_limit}m, Memory={mem_limit}Mi.")
+        return
+
+    increment_yaml = f"""
     apiVersion: v1
     kind: Pod
     metadata:
@@ -251,51 +274,38 @@ def increment_resources(namespace, pod_name, cpu_limit, mem_limit):
     run_command("kubectl apply -f increment.yaml")
     print(f"✅ {pod_name} resources incremented to CPU={cpu_limit}m, Memory={mem_limit}Mi.")
 
-# Function to check if the pod is still running
-def is_pod_running(namespace, pod_name):
-    command = f"kubectl get pod -n {namespace} {pod_name} -o jsonpath='{{.status.phase}}'"
-    result = run_command(command)
-    return result.strip().lower() == "running"
-
 # Function to label and increment resources based on trainable parameters
 def label_and_increment(df):
-    for index, row in df.iterrows():
-        cpu, mem, net, disk, error_count = row["cpu_usage_millicores"], row["memory_usage_mib"], row["network_io_kbps"], row["disk_io_kbps"], row["error_count"]
-
-        # Labeling logic
-        if error_count > 0:
-            df.at[index, "performance_label"] = "alert"  # Alert if there are any errors in logs
-        elif cpu > 400 or mem > 400 or net > 500 or disk > 500:
-            df.at[index, "performance_label"] = "bad"   # Bad if resource usage exceeds thresholds
-        else:
-            df.at[index, "performance_label"] = "good"   # Good if everything is within limits
-
-        # Increment resources if performance is good
-        if df.at[index, "performance_label"] == "good":
-            current_cpu = int(row["cpu_usage_millicores"])
-            current_mem = int(row["memory_usage_mib"])
-            new_cpu = current_cpu + 100  # Increment CPU by 100m
-            new_mem = current_mem + 128  # Increment memory by 128Mi
-
-            increment_resources(row["namespace"], row["pod_name"], new_cpu, new_mem)
+    # Labeling logic: alert if there are any errors in logs, bad if resource
+    # usage exceeds thresholds, good if everything is within limits
+    df["performance_label"] = performance_labels(df)
+
+    # Increment resources if performance is good
+    good = df.loc[df["performance_label"] == "good", ["namespace", "pod_name", "cpu_usage_millicores", "memory_usage_mib"]]
+    for namespace, pod_name, cpu, mem in good.itertuples(index=False):
+        new_cpu = int(cpu) + 100  # Increment CPU by 100m
+        new_mem = int(mem) + 128  # Increment memory by 128Mi
+
+        increment_resources(namespace, pod_name, new_cpu, new_mem)
 
     return df
 
 # Run monitoring & incremental resource increase loop
-while True:
+def collect_cycle(tick):
     print("[INFO] Collecting trainable model parameters...")
 
-    df_params = get_trainable_params()
+    df_params = get_trainable_params(tick)
     
     if not df_params.empty:
         df_params = label_and_increment(df_params)
         df_params.to_csv("throttle_trainable_params_dataset.csv", index=False)
 
-        # Check if any pod has failed
-        for index, row in df_params.iterrows():
-            if not is_pod_running(row["namespace"], row["pod_name"]):
+        # Check if any pod has failed, from the phase read with the cycle's pods
+        for row in df_params.to_dict("records"):
+            if row["pod_status"] != "Running":
                 print(f"[ALERT] Pod {row['pod_name']} in {row['namespace']} has failed.")
                 break  # Stop the loop if any pod fails
 
-    print("[INFO] Sleeping for 5 seconds before next check...")
-    time.sleep(5)
+
+# Every 5 s on the wall clock; a cycle that overruns is reported and the late tick skipped
+TickScheduler().every(5, collect_cycle, "collect").run()
@@ -1,14 +1,18 @@
 import requests
 import pandas as pd
-import time
-import subprocess
-import json
 from kubernetes import client, config
+from metrics_sink import CsvAppendSink
+from tick_scheduler import TickScheduler
 
 config.load_kube_config(context="kind-my-cluster")
 prometheus_url = "http://localhost:9090"
 v1 = client.CoreV1Api()
 
+# Output CSV, written incrementally each cycle
+OUTPUT_CSV = "k8s_pod_metrics.csv"
+CSV_FLUSH_ROWS = 5000
+CSV_FLUSH_SECONDS = 30
+
 
 def run_promql_query(query):
     response = requests.get(f"{prometheus_url}/api/v1/query", params={"query": query})
@@ -203,8 +207,6 @@ def filter_events_for_pod(events, namespace, pod_name):
 
 
 def main():
-    prom_url = "http://localhost:9090"
-
     # PromQL queries
     pod_queries = {
        
@@ -371,9 +373,17 @@ def main():
         "deployment_node_not_ready": 'sum(kube_pod_status_reason{pod=~"{deployment}-.*", reason="NodeNotReady"}) or vector(0)',
     }
 
-    data = []
-    while True:
-        timestamp = pd.Timestamp.now()
+    sink = CsvAppendSink(OUTPUT_CSV, flush_rows=CSV_FLUSH_ROWS, flush_interval=CSV_FLUSH_SECONDS)
+    try:
+        collect_loop(sink, pod_queries, node_queries, deployment_queries)
+    finally:
+        sink.close()
+
+
+def collect_loop(sink, pod_queries, node_queries, deployment_queries):
+    def collect_cycle(tick):
+        # Stamped with the intended tick, not the time the cycle got to run
+        timestamp = pd.Timestamp.fromtimestamp(tick)
 
         pods = get_k8s_pods()
         events = fetch_new_k8s_events()
@@ -441,6 +451,7 @@ def main():
 
 
         pod_data = {}
+        rows = []
 
         for namespace, pod_name, node in pods:
 
@@ -501,14 +512,14 @@ def main():
                 combined_metrics.update(temp)
                 combined_metrics["deployment"] = "None"
 
-            data.append(combined_metrics)
+            rows.append(combined_metrics)
 
 
-        df = pd.DataFrame(data)
-        df.to_csv("k8s_pod_metrics.csv", index=False)
+        sink.write(rows)
         print("Added data to csv at ", timestamp)
 
-        time.sleep(5)
+    # Every 5 s on the wall clock, however long a cycle takes
+    TickScheduler().every(5, collect_cycle, "collect").run()
 
 
 if __name__ == "__main__":
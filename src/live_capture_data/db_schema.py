@@ -0,0 +1,149 @@
+# Schema of the live capture database. Timestamps are integer epoch
+# seconds so range queries compare numbers and use the indexes below.
+
+# Object column used with timestamp in each table's composite index
+INDEXED_KEYS = {
+    "pods": "pod_name",
+    "nodes": "node_name",
+    "deployments": "deployment_name",
+}
+
+# Initialize the SQLite database
+def initialize_db(conn):
+    """Initialize the SQLite database and create tables for pods, nodes, and deployments."""
+    cursor = conn.cursor()
+
+    # Create the pods table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pods (
+            timestamp INTEGER,
+            namespace TEXT,
+            pod_name TEXT,
+            node_name TEXT,
+            cpu_usage REAL,
+            cpu_limit REAL,
+            cpu_request REAL,
+            cpu_throttling REAL,
+            memory_usage REAL,
+            memory_limit REAL,
+            memory_request REAL,
+            memory_rss REAL,
+            network_receive_bytes REAL,
+            network_transmit_bytes REAL,
+            network_errors REAL,
+            restarts INTEGER,
+            oom_killed INTEGER,
+            pod_ready INTEGER,
+            pod_phase TEXT,
+            disk_read_bytes REAL,
+            disk_write_bytes REAL,
+            disk_io_errors REAL,
+            pod_scheduled INTEGER,
+            pod_pending INTEGER,
+            pod_unschedulable INTEGER,
+            container_running INTEGER,
+            container_terminated INTEGER,
+            container_waiting INTEGER,
+            pod_uptime_seconds REAL,
+            cpu_utilization_ratio REAL,
+            memory_utilization_ratio REAL
+        )
+    ''')
+
+    # Create the nodes table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS nodes (
+            timestamp INTEGER,
+            node_name TEXT,
+            node_cpu_usage REAL,
+            node_cpu_capacity REAL,
+            node_cpu_allocatable REAL,
+            node_cpu_utilization_ratio REAL,
+            node_memory_usage REAL,
+            node_memory_capacity REAL,
+            node_memory_allocatable REAL,
+            node_memory_utilization_ratio REAL,
+            node_memory_pressure INTEGER,
+            node_disk_read_bytes REAL,
+            node_disk_write_bytes REAL,
+            node_disk_pressure INTEGER,
+            node_disk_capacity REAL,
+            node_disk_available REAL,
+            node_disk_utilization_ratio REAL,
+            node_network_receive_bytes REAL,
+            node_network_transmit_bytes REAL,
+            node_network_errors REAL,
+            node_ready INTEGER,
+            node_unschedulable INTEGER,
+            node_out_of_disk INTEGER,
+            node_pods_running INTEGER,
+            node_pods_allocatable INTEGER,
+            node_pods_usage_ratio REAL,
+            node_uptime_seconds REAL,
+            node_kubelet_healthy INTEGER,
+            node_disk_io_errors REAL,
+            node_inode_utilization_ratio REAL,
+            node_hardware_temperature REAL,
+            node_pid_pressure INTEGER
+        )
+    ''')
+
+    # Create the deployments table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS deployments (
+            timestamp INTEGER,
+            namespace TEXT,
+            deployment_name TEXT,
+            deployment_replicas INTEGER,
+            deployment_available_replicas INTEGER,
+            deployment_unavailable_replicas INTEGER,
+            deployment_updated_replicas INTEGER,
+            deployment_mismatch_replicas INTEGER,
+            deployment_cpu_usage REAL,
+            deployment_cpu_requests REAL,
+            deployment_cpu_limits REAL,
+            deployment_cpu_utilization_ratio REAL,
+            deployment_memory_usage REAL,
+            deployment_memory_requests REAL,
+            deployment_memory_limits REAL,
+            deployment_memory_utilization_ratio REAL,
+            deployment_pod_restarts INTEGER,
+            deployment_pod_crashloop_backoff INTEGER,
+            deployment_pod_oom_killed INTEGER,
+            deployment_pod_terminated INTEGER,
+            deployment_pod_pending INTEGER,
+            deployment_pod_failed INTEGER,
+            deployment_pod_evicted INTEGER,
+            deployment_network_receive_bytes REAL,
+            deployment_network_transmit_bytes REAL,
+            deployment_network_errors REAL,
+            deployment_disk_read_bytes REAL,
+            deployment_disk_write_bytes REAL,
+            deployment_memory_pressure INTEGER,
+            deployment_disk_pressure INTEGER,
+            deployment_pid_pressure INTEGER,
+            deployment_unschedulable_pods INTEGER,
+            deployment_waiting_pods INTEGER,
+            deployment_backoff_limit_exceeded INTEGER,
+            deployment_age_seconds REAL,
+            deployment_unavailable_duration REAL,
+            deployment_progressing INTEGER,
+            deployment_available INTEGER,
+            deployment_paused INTEGER,
+            deployment_replica_set_mismatch INTEGER,
+            deployment_rollout_in_progress INTEGER,
+            deployment_image_pull_error INTEGER,
+            deployment_create_container_error INTEGER,
+            deployment_node_not_ready INTEGER,
+            deployment_pod_unscheduled INTEGER
+        )
+    ''')
+
+    # Time-series lookups ("last hour of pod X") use these instead of scanning
+    for table, key in INDEXED_KEYS.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{key}_timestamp ON {table} ({key}, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pods_timestamp ON pods (timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_timestamp ON nodes (timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_deployments_timestamp ON deployments (timestamp)")
+
+    conn.commit()
@@ -1,10 +1,14 @@
+import os
+import sys
 import requests
-import pandas as pd
 import time
-import subprocess
-import json
 from kubernetes import client, config
-import sqlite3  # For SQLite database
+from db_schema import initialize_db
+from retention import RetentionJob
+from sqlite_writer import MetricsWriter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection"))
+from tick_scheduler import TickScheduler
 
 # Load Kubernetes configuration
 config.load_kube_config(context="kind-chaos-cluster")
@@ -13,150 +17,21 @@ v1 = client.CoreV1Api()
 
 # Database setup
 DATABASE_NAME = "k8s_metrics.db"
-
-import sqlite3  # Add this import for SQLite
-
-# Initialize the SQLite database
-def initialize_db():
-    """Initialize the SQLite database and create tables for pods, nodes, and deployments."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-
-    # Create the pods table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pods (
-            timestamp TEXT,
-            namespace TEXT,
-            pod_name TEXT,
-            node_name TEXT,
-            cpu_usage REAL,
-            cpu_limit REAL,
-            cpu_request REAL,
-            cpu_throttling REAL,
-            memory_usage REAL,
-            memory_limit REAL,
-            memory_request REAL,
-            memory_rss REAL,
-            network_receive_bytes REAL,
-            network_transmit_bytes REAL,
-            network_errors REAL,
-            restarts INTEGER,
-            oom_killed INTEGER,
-            pod_ready INTEGER,
-            pod_phase TEXT,
-            disk_read_bytes REAL,
-            disk_write_bytes REAL,
-            disk_io_errors REAL,
-            pod_scheduled INTEGER,
-            pod_pending INTEGER,
-            pod_unschedulable INTEGER,
-            container_running INTEGER,
-            container_terminated INTEGER,
-            container_waiting INTEGER,
-            pod_uptime_seconds REAL,
-            cpu_utilization_ratio REAL,
-            memory_utilization_ratio REAL
-        )
-    ''')
-
-    # Create the nodes table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS nodes (
-            timestamp TEXT,
-            node_name TEXT,
-            node_cpu_usage REAL,
-            node_cpu_capacity REAL,
-            node_cpu_allocatable REAL,
-            node_cpu_utilization_ratio REAL,
-            node_memory_usage REAL,
-            node_memory_capacity REAL,
-            node_memory_allocatable REAL,
-            node_memory_utilization_ratio REAL,
-            node_memory_pressure INTEGER,
-            node_disk_read_bytes REAL,
-            node_disk_write_bytes REAL,
-            node_disk_pressure INTEGER,
-            node_disk_capacity REAL,
-            node_disk_available REAL,
-            node_disk_utilization_ratio REAL,
-            node_network_receive_bytes REAL,
-            node_network_transmit_bytes REAL,
-            node_network_errors REAL,
-            node_ready INTEGER,
-            node_unschedulable INTEGER,
-            node_out_of_disk INTEGER,
-            node_pods_running INTEGER,
-            node_pods_allocatable INTEGER,
-            node_pods_usage_ratio REAL,
-            node_uptime_seconds REAL,
-            node_kubelet_healthy INTEGER,
-            node_disk_io_errors REAL,
-            node_inode_utilization_ratio REAL,
-            node_hardware_temperature REAL,
-            node_pid_pressure INTEGER
-        )
-    ''')
-
-    # Create the deployments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS deployments (
-            timestamp TEXT,
-            namespace TEXT,
-            deployment_name TEXT,
-            deployment_replicas INTEGER,
-            deployment_available_replicas INTEGER,
-            deployment_unavailable_replicas INTEGER,
-            deployment_updated_replicas INTEGER,
-            deployment_mismatch_replicas INTEGER,
-            deployment_cpu_usage REAL,
-            deployment_cpu_requests REAL,
-            deployment_cpu_limits REAL,
-            deployment_cpu_utilization_ratio REAL,
-            deployment_memory_usage REAL,
-            deployment_memory_requests REAL,
-            deployment_memory_limits REAL,
-            deployment_memory_utilization_ratio REAL,
-            deployment_pod_restarts INTEGER,
-            deployment_pod_crashloop_backoff INTEGER,
-            deployment_pod_oom_killed INTEGER,
-            deployment_pod_terminated INTEGER,
-            deployment_pod_pending INTEGER,
-            deployment_pod_failed INTEGER,
-            deployment_pod_evicted INTEGER,
-            deployment_network_receive_bytes REAL,
-            deployment_network_transmit_bytes REAL,
-            deployment_network_errors REAL,
-            deployment_disk_read_bytes REAL,
-            deployment_disk_write_bytes REAL,
-            deployment_memory_pressure INTEGER,
-            deployment_disk_pressure INTEGER,
-            deployment_pid_pressure INTEGER,
-            deployment_unschedulable_pods INTEGER,
-            deployment_waiting_pods INTEGER,
-            deployment_backoff_limit_exceeded INTEGER,
-            deployment_age_seconds REAL,
-            deployment_unavailable_duration REAL,
-            deployment_progressing INTEGER,
-            deployment_available INTEGER,
-            deployment_paused INTEGER,
-            deployment_replica_set_mismatch INTEGER,
-            deployment_rollout_in_progress INTEGER,
-            deployment_image_pull_error INTEGER,
-            deployment_create_container_error INTEGER,
-            deployment_node_not_ready INTEGER,
-            deployment_pod_unscheduled INTEGER
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
+# Hand each cycle's batch to a background writer thread
+THREADED_WRITER = True
+# Roll raw rows up into 1 minute / 1 hour tables and expire old raw rows
+RETENTION_ENABLED = True
+# Wall-clock cadence (seconds) of each table's collection; rows carry the tick time
+POD_INTERVAL = 5
+NODE_INTERVAL = 5
+DEPLOYMENT_INTERVAL = 5
+# "skip" waits for the next tick after an overrun, "coalesce" runs the late tick at once
+LATE_TICKS = "skip"
 
 # Insert pod metrics into the database
-def insert_pod_metrics(metrics):
-    """Insert pod metrics into the database."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
+def insert_pod_metrics(writer, metrics):
+    """Queue pod metrics for the next batched write."""
+    writer.add('''
         INSERT INTO pods (
             timestamp, namespace, pod_name, node_name, cpu_usage, cpu_limit, cpu_request, cpu_throttling,
             memory_usage, memory_limit, memory_request, memory_rss, network_receive_bytes, network_transmit_bytes,
@@ -198,15 +73,11 @@ def insert_pod_metrics(metrics):
         metrics.get("cpu_utilization_ratio", None),
         metrics.get("memory_utilization_ratio", None)
     ))
-    conn.commit()
-    conn.close()
 
 # Insert node metrics into the database
-def insert_node_metrics(metrics):
-    """Insert node metrics into the database."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
+def insert_node_metrics(writer, metrics):
+    """Queue node metrics for the next batched write."""
+    writer.add('''
         INSERT INTO nodes (
             timestamp, node_name, node_cpu_usage, node_cpu_capacity, node_cpu_allocatable,
             node_cpu_utilization_ratio, node_memory_usage, node_memory_capacity,
@@ -254,15 +125,11 @@ def insert_node_metrics(metrics):
         metrics.get("node_hardware_temperature", None),
         metrics.get("node_pid_pressure", None)
     ))
-    conn.commit()
-    conn.close()
 
 # Insert deployment metrics into the database
-def insert_deployment_metrics(metrics):
-    """Insert deployment metrics into the database."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
+def insert_deployment_metrics(writer, metrics):
+    """Queue deployment metrics for the next batched write."""
+    writer.add('''
         INSERT INTO deployments (
             timestamp, namespace, deployment_name, deployment_replicas, deployment_available_replicas,
             deployment_unavailable_replicas, deployment_updated_replicas, deployment_mismatch_replicas,
@@ -325,8 +192,6 @@ def insert_deployment_metrics(metrics):
         metrics.get("deployment_node_not_ready", None),
         metrics.get("deployment_pod_unscheduled", None)
     ))
-    conn.commit()
-    conn.close()
 
 
 def run_promql_query(query):
@@ -355,7 +220,9 @@ def get_k8s_deployments():
 
 def main():
     # Initialize the database
-    initialize_db()
+    writer = MetricsWriter(DATABASE_NAME, threaded=THREADED_WRITER).start()
+    initialize_db(writer.conn)
+    retention = RetentionJob(DATABASE_NAME).start() if RETENTION_ENABLED else None
 
     pod_queries = {
         # CPU Metrics
@@ -522,11 +389,18 @@ def main():
         "deployment_pod_unscheduled": 'sum(kube_pod_status_unschedulable{pod=~"{deployment}-.*"})',
     }
 
-    while True:
-        timestamp = pd.Timestamp.now().isoformat()
+    try:
+        collect_loop(writer, pod_queries, node_queries, deployment_queries)
+    finally:
+        if retention is not None:
+            retention.stop()
+        writer.close()
 
 
-        # Collect pod metrics
+def collect_loop(writer, pod_queries, node_queries, deployment_queries):
+    def collect_pods(tick):
+        # Epoch seconds of the intended tick, matching the INTEGER timestamp columns
+        timestamp = int(tick)
         pods = get_k8s_pods()
         for namespace, pod_name, node in pods:
             pod_metrics = {"timestamp": timestamp, "namespace": namespace, "pod": pod_name, "node": node}
@@ -537,9 +411,13 @@ def main():
                     pod_metrics[metric_name] = float(results[0]['value'][1])
                 else:
                     pod_metrics[metric_name] = None
-            insert_pod_metrics(pod_metrics)
+            insert_pod_metrics(writer, pod_metrics)
+        # One transaction per table and tick
+        writer.flush()
+        print(f"Pod metrics collected and stored in database at {time.ctime(timestamp)}")
 
-        # Collect node metrics
+    def collect_nodes(tick):
+        timestamp = int(tick)
         nodes = get_k8s_nodes()
         for node in nodes:
             node_metrics = {"timestamp": timestamp, "node_name": node}
@@ -550,9 +428,12 @@ def main():
                     node_metrics[metric_name] = float(results[0]['value'][1])
                 else:
                     node_metrics[metric_name] = None
-            insert_node_metrics(node_metrics)
+            insert_node_metrics(writer, node_metrics)
+        writer.flush()
+        print(f"Node metrics collected and stored in database at {time.ctime(timestamp)}")
 
-        # Collect deployment metrics
+    def collect_deployments(tick):
+        timestamp = int(tick)
         deployments = get_k8s_deployments()
         for namespace, deployment_name in deployments:
             deployment_metrics = {"timestamp": timestamp, "namespace": namespace, "deployment_name": deployment_name}
@@ -563,10 +444,15 @@ def main():
                     deployment_metrics[metric_name] = float(results[0]['value'][1])
                 else:
                     deployment_metrics[metric_name] = None
-            insert_deployment_metrics(deployment_metrics)
-
-        print(f"Metrics collected and stored in database at {timestamp}")
-        time.sleep(5)
+            insert_deployment_metrics(writer, deployment_metrics)
+        writer.flush()
+        print(f"Deployment metrics collected and stored in database at {time.ctime(timestamp)}")
+
+    scheduler = TickScheduler(late=LATE_TICKS)
+    scheduler.every(POD_INTERVAL, collect_pods, "pods")
+    scheduler.every(NODE_INTERVAL, collect_nodes, "nodes")
+    scheduler.every(DEPLOYMENT_INTERVAL, collect_deployments, "deployments")
+    scheduler.run()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,63 @@
+import argparse
+import sqlite3
+from datetime import datetime
+
+from db_schema import INDEXED_KEYS, initialize_db
+
+# Converts a database written before timestamps were stored as epoch
+# seconds (e.g. db_1.db, with ISO text timestamps) to the current schema
+# in place, adding the time-series indexes on the way.
+
+
+def iso_to_epoch(value):
+    """ISO timestamps were taken from the collector's local clock."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def _columns(conn, table):
+    return {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def migrate(database):
+    conn = sqlite3.connect(database)
+    conn.create_function("iso_to_epoch", 1, iso_to_epoch, deterministic=True)
+
+    legacy = []
+    with conn:
+        for table in INDEXED_KEYS:
+            columns = _columns(conn, table)
+            if columns.get("timestamp", "INTEGER").upper() == "INTEGER":
+                continue
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+            # Renamed tables keep their indexes, which would shadow the new ones
+            for (index,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+                                         "AND sql IS NOT NULL", (f"{table}_legacy",)).fetchall():
+                conn.execute(f"DROP INDEX {index}")
+            legacy.append((table, list(columns)))
+
+    initialize_db(conn)
+
+    with conn:
+        for table, columns in legacy:
+            columns = [column for column in columns if column in _columns(conn, table)]
+            selected = ["iso_to_epoch(timestamp)" if column == "timestamp" else column for column in columns]
+            conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) "
+                         f"SELECT {', '.join(selected)} FROM {table}_legacy ORDER BY rowid")
+            conn.execute(f"DROP TABLE {table}_legacy")
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            print(f"Migrated {count} rows in {table}")
+
+    if legacy:
+        conn.execute("VACUUM")
+    else:
+        print(f"{database} already uses epoch timestamps")
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a live capture database to epoch timestamps with indexes.")
+    parser.add_argument("database", help="SQLite database to migrate in place, e.g. db_1.db")
+    args = parser.parse_args()
+    migrate(args.database)
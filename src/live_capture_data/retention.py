@@ -0,0 +1,165 @@
+import sqlite3
+import threading
+import time
+
+# Downsampling and retention for the live capture database.
+#
+# Raw rows are rolled up into <table>_1m and <table>_1h tables (same metric
+# column names, plus `bucket` and `samples`): numeric columns are averaged and
+# text columns such as pod_phase keep the bucket's last value. Raw rows and
+# old aggregates are then deleted once they fall outside their retention window.
+
+# Columns identifying one series in each raw table
+SERIES_KEYS = {
+    "pods": ("namespace", "pod_name", "node_name"),
+    "nodes": ("node_name",),
+    "deployments": ("namespace", "deployment_name"),
+}
+
+# (suffix, bucket size in seconds, seconds to keep rows at that resolution)
+RESOLUTIONS = (
+    ("1m", 60, 7 * 24 * 3600),
+    ("1h", 3600, 90 * 24 * 3600),
+)
+
+# Seconds to keep raw rows
+RAW_RETENTION = 24 * 3600
+
+# Rows are stamped when a cycle starts but written when it ends, so a
+# bucket is only rolled up once it closed at least this many seconds ago
+ROLLUP_DELAY = 120
+
+
+def _text_affinity(declared_type):
+    # SQLite's affinity rules: INT first, then CHAR/CLOB/TEXT
+    declared_type = declared_type.upper()
+    return "INT" not in declared_type and any(name in declared_type for name in ("CHAR", "CLOB", "TEXT"))
+
+
+def _metric_columns(conn, table):
+    """(numeric columns, text columns) of a raw table, besides its series keys and timestamp."""
+    keys = set(SERIES_KEYS[table]) | {"timestamp"}
+    numeric, text = [], []
+    for _, name, declared_type, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        if name not in keys:
+            (text if _text_affinity(declared_type) else numeric).append(name)
+    return numeric, text
+
+
+def create_rollup_tables(conn):
+    """Create the aggregate tables and the rollup bookkeeping table."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            table_name TEXT PRIMARY KEY,
+            rolled_up_to INTEGER
+        )
+    ''')
+    for table, keys in SERIES_KEYS.items():
+        numeric, text = _metric_columns(conn, table)
+        columns = ", ".join([f"{key} TEXT" for key in keys] + [f"{metric} REAL" for metric in numeric]
+                            + [f"{metric} TEXT" for metric in text])
+        for suffix, _, _ in RESOLUTIONS:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table}_{suffix} (
+                    bucket INTEGER,
+                    samples INTEGER,
+                    {columns},
+                    PRIMARY KEY ({", ".join(keys)}, bucket)
+                )
+            ''')
+    conn.commit()
+
+
+def rollup(conn, now=None):
+    """
+    Roll every complete bucket not rolled up yet into the aggregate tables.
+    Buckets still being filled are left for a later call.
+    """
+    now = int(time.time()) if now is None else now
+    for table, keys in SERIES_KEYS.items():
+        numeric, text = _metric_columns(conn, table)
+        metrics = ", ".join(numeric + text)
+        key_list = ", ".join(keys)
+        for suffix, seconds, _ in RESOLUTIONS:
+            target = f"{table}_{suffix}"
+            row = conn.execute("SELECT rolled_up_to FROM rollup_state WHERE table_name = ?", (target,)).fetchone()
+            start = row[0] if row else conn.execute(f"SELECT MIN(timestamp) FROM {table}").fetchone()[0]
+            if start is None:
+                continue
+            start = start // seconds * seconds
+            end = (now - ROLLUP_DELAY) // seconds * seconds
+            if end <= start:
+                continue
+
+            # With one MAX() in the query, SQLite takes the bare text columns
+            # from the row holding the maximum: the bucket's last sample
+            conn.execute(f'''
+                INSERT OR REPLACE INTO {target} (bucket, samples, {key_list}, {metrics})
+                SELECT bucket, samples, {key_list}, {metrics}
+                FROM (
+                    SELECT timestamp / {seconds} * {seconds} AS bucket, COUNT(*) AS samples, {key_list},
+                           {", ".join([f"AVG({metric}) AS {metric}" for metric in numeric] + text)},
+                           MAX(timestamp)
+                    FROM {table}
+                    WHERE timestamp >= ? AND timestamp < ?
+                    GROUP BY 1, {key_list}
+                )
+            ''', (start, end))
+            conn.execute("INSERT OR REPLACE INTO rollup_state (table_name, rolled_up_to) VALUES (?, ?)",
+                         (target, end))
+
+
+def expire(conn, now=None):
+    """Delete raw rows and aggregates that are past their retention window."""
+    now = int(time.time()) if now is None else now
+    for table in SERIES_KEYS:
+        # Never delete raw rows that have not been rolled up yet
+        targets = [f"{table}_{suffix}" for suffix, _, _ in RESOLUTIONS]
+        states = conn.execute(f"SELECT rolled_up_to FROM rollup_state WHERE table_name IN ({', '.join('?' * len(targets))})",
+                              targets).fetchall()
+        cutoff = now - RAW_RETENTION
+        if len(states) == len(targets):
+            rolled = min(state[0] for state in states)
+            conn.execute(f"DELETE FROM {table} WHERE timestamp < ?", (min(cutoff, rolled),))
+        for suffix, _, keep in RESOLUTIONS:
+            conn.execute(f"DELETE FROM {table}_{suffix} WHERE bucket < ?", (now - keep,))
+
+
+class RetentionJob:
+    """
+    Background thread running rollup() and expire() every `interval`
+    seconds on its own connection, next to the collector's MetricsWriter.
+    """
+
+    def __init__(self, database, interval=60):
+        self.database = database
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sqlite-retention", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def run_once(self, conn, now=None):
+        with conn:
+            rollup(conn, now)
+            expire(conn, now)
+
+    def _run(self):
+        # WAL lets this connection work while the writer is busy; wait for its lock if needed
+        conn = sqlite3.connect(self.database, timeout=30)
+        try:
+            create_rollup_tables(conn)
+            while not self._stop.is_set():
+                try:
+                    self.run_once(conn)
+                except sqlite3.Error as e:
+                    print(f"[ERROR] Retention run failed: {e}")
+                self._stop.wait(self.interval)
+        finally:
+            conn.close()
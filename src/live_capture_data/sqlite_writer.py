@@ -0,0 +1,77 @@
+import queue
+import sqlite3
+import threading
+from collections import defaultdict
+
+# Pragmas applied to every writer connection. page_size only takes effect
+# on a new database (or after VACUUM), so it is set before anything else.
+PRAGMAS = (
+    "PRAGMA page_size = 8192",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+
+class MetricsWriter:
+    """
+    Single persistent SQLite connection that buffers a cycle's rows and
+    writes them with executemany in one transaction per flush().
+
+    With threaded=True the batches are handed to a dedicated writer thread
+    so scraping never waits on disk; close() drains it.
+    """
+
+    def __init__(self, database, threaded=False, max_pending_batches=100):
+        self.conn = sqlite3.connect(database, check_same_thread=not threaded)
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
+        self.pending = defaultdict(list)
+        self.threaded = threaded
+        self._batches = None
+        self._thread = None
+        if threaded:
+            self._batches = queue.Queue(maxsize=max_pending_batches)
+            self._thread = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+
+    def start(self):
+        if self._thread is not None:
+            self._thread.start()
+        return self
+
+    def add(self, sql, params):
+        """Queue one row for the statement `sql`."""
+        self.pending[sql].append(params)
+
+    def flush(self):
+        """Write every queued row in a single transaction."""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, defaultdict(list)
+        if self.threaded:
+            self._batches.put(batch)
+        else:
+            self._write(batch)
+
+    def _write(self, batch):
+        with self.conn:
+            for sql, rows in batch.items():
+                self.conn.executemany(sql, rows)
+
+    def _write_loop(self):
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            try:
+                self._write(batch)
+            except sqlite3.Error as e:
+                print(f"[ERROR] Failed to write {sum(len(rows) for rows in batch.values())} rows: {e}")
+
+    def close(self):
+        self.flush()
+        if self._thread is not None and self._thread.is_alive():
+            self._batches.put(None)
+            self._thread.join()
+        self.conn.close()
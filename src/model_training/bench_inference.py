@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Benchmark: cold start, per-batch latency and peak memory of each model
+# file (Keras .h5, exported .tflite / .onnx) on windows built from a
+# collected CSV such as datasets/Dataset_4.csv, scaled with the preprocessing
+# the models were trained with. Every model runs in its own worker process so
+# start-up cost and RSS are measured in isolation.
+
+
+def csv_rows(csv_path, preprocessing, nrows=20000):
+    """Feature rows of a collected CSV scaled by a saved Preprocessor, sorted by pod and time."""
+    from preprocessing import Preprocessor
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection"))
+    from metric_schema import read_csv as read_metrics_csv
+
+    df = read_metrics_csv(csv_path, nrows=nrows)
+    keys = [col for col in ("namespace", "pod", "timestamp") if col in df]
+    if keys:
+        df = df.sort_values(keys, kind="stable")
+    return Preprocessor.load(preprocessing).transform_features(df)
+
+
+def model_windows(rows, time_steps, n_features):
+    """Windows of `rows` for a model input; the rows must have the model's feature count."""
+    from windowing import window_view
+
+    if rows.shape[1] != n_features:
+        raise ValueError(f"the preprocessing gives {rows.shape[1]} features, the model expects {n_features}")
+    return window_view(rows, time_steps)
+
+
+def csv_windows(csv_path, time_steps, n_features, preprocessing, count=None):
+    windows = model_windows(csv_rows(csv_path, preprocessing), time_steps, n_features)
+    return np.ascontiguousarray(windows[:count])
+
+
+def worker(model_path, rows_path, batch_sizes, repeats, predictions_path):
+    start = time.perf_counter()
+    from inference_runtime import load_model
+
+    model = load_model(model_path)
+    load_time = time.perf_counter() - start
+
+    _, time_steps, n_features = model.input_shape
+    rows = np.load(rows_path)
+    windows = model_windows(rows, time_steps, n_features)
+    if not len(windows):
+        sys.exit(f"{len(rows)} CSV rows are fewer than the model's {time_steps} time steps, no window to predict")
+
+    first = time.perf_counter()
+    predictions = model.predict(np.ascontiguousarray(windows[:batch_sizes[0]]))
+    first_predict = time.perf_counter() - first
+    np.save(predictions_path, predictions)
+
+    latencies = {}
+    for batch_size in batch_sizes:
+        batch = np.ascontiguousarray(windows[np.arange(batch_size) % len(windows)])
+        model.predict(batch)
+        times = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            model.predict(batch)
+            times.append(time.perf_counter() - t)
+        latencies[batch_size] = (float(np.percentile(times, 50)), float(np.percentile(times, 95)))
+
+    return {
+        "load": load_time,
+        "cold_start": load_time + first_predict,
+        "latencies": latencies,
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_worker(model_path, rows_path, batch_sizes, repeats, predictions_path):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", str(Path(model_path).resolve()), "--rows", rows_path,
+               "--repeats", str(repeats), "--predictions", predictions_path,
+               "--batch-sizes", *map(str, batch_sizes)]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        print(f"[ERROR] {model_path} failed:\n{result.stderr.strip()[-2000:]}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Keras .h5 and exported TFLite/ONNX models.")
+    parser.add_argument("models", nargs="*", help="Model files; default: models/*.h5 and models/exported/*")
+    parser.add_argument("--csv", default="../../datasets/Dataset_4.csv")
+    parser.add_argument("--preprocessing", required=True,
+                        help="Saved preprocessing of the models (preprocessing.py): their input columns and scaling")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 512])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", help=argparse.SUPPRESS)
+    parser.add_argument("--predictions", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.rows, args.batch_sizes, args.repeats, args.predictions)))
+        sys.exit(0)
+
+    models = args.models or sorted(Path("../../models").glob("*.h5")) + sorted(Path("../../models/exported").glob("*.*"))
+    with tempfile.TemporaryDirectory() as tmp:
+        rows_path = os.path.join(tmp, "rows.npy")
+        rows = csv_rows(args.csv, args.preprocessing)
+        if not len(rows):
+            sys.exit(f"{args.csv} has no rows to build windows from")
+        np.save(rows_path, rows)
+
+        reference = {}
+        print(f"{'model':<32} {'size KiB':>9} {'cold start s':>13} {'peak RSS MiB':>13} "
+              + " ".join(f"{f'b={b} p50/p95 ms':>20}" for b in args.batch_sizes) + f" {'max |diff|':>11}")
+        for model_path in models:
+            model_path = Path(model_path)
+            predictions_path = os.path.join(tmp, f"{model_path.name}.npy")
+            result = run_worker(model_path, rows_path, args.batch_sizes, args.repeats, predictions_path)
+            if result is None:
+                continue
+
+            # Exported files are compared against the .h5 they came from (same stem prefix)
+            predictions = np.load(predictions_path).astype(np.float32)
+            base = model_path.stem.split("_float16")[0].split("_dynamic")[0].split("_int8")[0]
+            if model_path.suffix == ".h5":
+                reference[base] = predictions
+            diff = float(np.abs(predictions - reference[base]).max()) if base in reference else float("nan")
+
+            latencies = " ".join(
+                f"{f'{p50 * 1000:.2f}/{p95 * 1000:.2f}':>20}"
+                for p50, p95 in (result["latencies"][str(b)] for b in args.batch_sizes)
+            )
+            print(f"{model_path.name:<32} {model_path.stat().st_size / 1024:>9.0f} {result['cold_start']:>13.2f} "
+                  f"{result['max_rss_mib']:>13.0f} {latencies} {diff:>11.4f}")
@@ -0,0 +1,105 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Exports the Keras models to TFLite (float32, float16, dynamic-range int8 or
+# full int8) and ONNX for scoring without TensorFlow. Load the results with
+# inference_runtime.load_model(); bench_inference.py compares them.
+
+QUANTIZATIONS = ("none", "float16", "dynamic", "int8")
+
+
+def representative_windows(input_shape, csv_path=None, preprocessing=None, count=200, seed=0):
+    """
+    Calibration windows for int8: real windows from a collected CSV scaled
+    with the saved `preprocessing` when both are given, otherwise uniform
+    values in the [0, 1] range the scalers produce.
+    """
+    _, time_steps, n_features = input_shape
+    if csv_path is not None and preprocessing is not None:
+        from bench_inference import csv_windows
+
+        windows = csv_windows(csv_path, time_steps, n_features, preprocessing, count)
+        if len(windows):
+            return windows
+    return np.random.default_rng(seed).random((count, time_steps, n_features), dtype=np.float32)
+
+
+def export_tflite(model_path, out_path, quantization="none", calibration=None):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "dynamic":
+        # int8 weights, float activations: no calibration data needed
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantization == "int8":
+        if calibration is None:
+            calibration = representative_windows(model.input_shape)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([window[None]] for window in calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    Path(out_path).write_bytes(converter.convert())
+    return out_path
+
+
+def export_onnx(model_path, out_path, opset=13):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    signature = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=str(out_path))
+    return out_path
+
+
+def export_all(model_path, out_dir, quantizations=QUANTIZATIONS, onnx=True, csv_path=None, preprocessing=None):
+    """Write <model>.tflite / <model>_<quantization>.tflite (and <model>.onnx) into out_dir."""
+    import tensorflow as tf
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(model_path).stem
+    input_shape = tf.keras.models.load_model(model_path, compile=False).input_shape
+
+    exported = []
+    for quantization in quantizations:
+        suffix = "" if quantization == "none" else f"_{quantization}"
+        out_path = out_dir / f"{stem}{suffix}.tflite"
+        calibration = representative_windows(input_shape, csv_path, preprocessing) if quantization == "int8" else None
+        try:
+            exported.append(export_tflite(model_path, out_path, quantization, calibration))
+        except Exception as e:
+            print(f"[WARNING] {stem} {quantization} TFLite export failed: {e}")
+
+    if onnx:
+        try:
+            exported.append(export_onnx(model_path, out_dir / f"{stem}.onnx"))
+        except ImportError:
+            print("[WARNING] tf2onnx is not installed, skipping ONNX export")
+    return exported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Keras models to TFLite/ONNX for lightweight CPU scoring.")
+    parser.add_argument("models", nargs="*", default=["../../models/lstm_model.h5", "../../models/gru_model.h5"])
+    parser.add_argument("--out", default="../../models/exported")
+    parser.add_argument("--quantization", nargs="+", choices=QUANTIZATIONS, default=list(QUANTIZATIONS))
+    parser.add_argument("--no-onnx", action="store_true")
+    parser.add_argument("--calibration-csv", default="../../datasets/Dataset_4.csv",
+                        help="Windows from this CSV calibrate int8 quantisation (with --preprocessing)")
+    parser.add_argument("--preprocessing", help="Saved preprocessing (preprocessing.py) used to scale calibration windows")
+    args = parser.parse_args()
+
+    for model_path in args.models:
+        for path in export_all(model_path, args.out, args.quantization, not args.no_onnx,
+                               args.calibration_csv, args.preprocessing):
+            print(f"Exported {model_path} -> {path} ({Path(path).stat().st_size / 1024:.0f} KiB)")
@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import numpy as np
+
+# One predict() interface over the model formats we ship: Keras .h5, and the
+# .tflite / .onnx exports from export_models.py. Only the runtime needed for
+# the given file is imported, so scoring a TFLite or ONNX model never loads
+# TensorFlow when tflite_runtime or onnxruntime is installed.
+
+
+class KerasModel:
+    def __init__(self, path):
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(path, compile=False)
+        self.input_shape = tuple(self.model.input_shape)
+
+    def predict(self, batch):
+        return self.model(batch, training=False).numpy()
+
+
+class TFLiteModel:
+    """TFLite interpreter; int8 inputs/outputs are (de)quantised here."""
+
+    def __init__(self, path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=str(path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(d) for d in self.input["shape"][1:])
+        self.batch_size = int(self.input["shape"][0])
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        if len(batch) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input["index"], batch.shape)
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = len(batch)
+
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] != np.float32 and scale:
+            batch = np.round(batch / scale + zero_point).astype(self.input["dtype"])
+        self.interpreter.set_tensor(self.input["index"], batch)
+        self.interpreter.invoke()
+
+        output = self.interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class OnnxModel:
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        shape = self.session.get_inputs()[0].shape
+        self.input_shape = (None,) + tuple(shape[1:])
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: np.asarray(batch, dtype=np.float32)})[0]
+
+
+def load_model(path, **kwargs):
+    """Model for `path`, picked by extension (.tflite, .onnx, otherwise Keras)."""
+    suffix = Path(path).suffix
+    if suffix == ".tflite":
+        return TFLiteModel(path, **kwargs)
+    if suffix == ".onnx":
+        return OnnxModel(path, **kwargs)
+    return KerasModel(path)
@@ -0,0 +1,145 @@
+import time
+
+import numpy as np
+
+from inference_runtime import load_model
+
+# Streaming inference for the LSTM/GRU models.
+#
+# The model is loaded once. Every pod gets a slot in one ring-buffer array
+# holding its last `time_steps` feature vectors, and each collection cycle
+# runs a single batched forward pass over all pods with a full window.
+
+
+class OnlineScorer:
+    """
+    Scores the rows of each collection cycle with a Keras model or one of its
+    TFLite/ONNX exports (see inference_runtime.load_model).
+
+    With a saved `preprocessor` (preprocessing.Preprocessor) rows are encoded
+    and scaled exactly as in training and predictions are unscaled. Otherwise
+    `feature_columns` are read from every row in order (missing or non-numeric
+    values count as 0) and passed through `transform(matrix)` if given.
+    Pods absent for `max_missed_cycles` cycles are dropped.
+    """
+
+    def __init__(self, model_path, feature_columns=None, target_columns=None, transform=None, preprocessor=None,
+                 entity_columns=("namespace", "pod"), max_missed_cycles=3, capacity=256):
+        if preprocessor is not None:
+            feature_columns = preprocessor.feature_columns
+            target_columns = preprocessor.target_columns
+
+        self.model = load_model(model_path)
+        _, self.time_steps, self.n_features = self.model.input_shape
+        if len(feature_columns) != self.n_features:
+            raise ValueError(f"{model_path} expects {self.n_features} features, got {len(feature_columns)} columns")
+
+        self.feature_columns = list(feature_columns)
+        self.target_columns = list(target_columns) if target_columns is not None else None
+        self.transform = transform
+        self.preprocessor = preprocessor
+        self.entity_columns = list(entity_columns)
+        self.max_missed_cycles = max_missed_cycles
+
+        self.windows = np.zeros((capacity, self.time_steps, self.n_features), dtype=np.float32)
+        self.positions = np.zeros(capacity, dtype=np.int64)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.slots = {}
+        self.last_seen = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        self.cycle = 0
+
+        self.predictions = {}
+        self.last_latency = None
+        self.last_predict_time = None
+
+        # Build the graph now so the first cycle does not pay for it
+        self.model.predict(np.zeros((1, self.time_steps, self.n_features), dtype=np.float32))
+
+    def _slot(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            if not self.free:
+                self._grow()
+            slot = self.free.pop()
+            self.slots[key] = slot
+            self.positions[slot] = 0
+            self.counts[slot] = 0
+        self.last_seen[key] = self.cycle
+        return slot
+
+    def _grow(self):
+        capacity = len(self.windows)
+        self.windows = np.concatenate([self.windows, np.zeros_like(self.windows)])
+        self.positions = np.concatenate([self.positions, np.zeros(capacity, dtype=np.int64)])
+        self.counts = np.concatenate([self.counts, np.zeros(capacity, dtype=np.int64)])
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def _evict(self):
+        for key, seen in list(self.last_seen.items()):
+            if self.cycle - seen > self.max_missed_cycles:
+                self.free.append(self.slots.pop(key))
+                del self.last_seen[key]
+                self.predictions.pop(key, None)
+
+    def _features(self, rows):
+        if self.preprocessor is not None:
+            return self.preprocessor.transform_rows(rows)
+        matrix = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for i, row in enumerate(rows):
+            for j, column in enumerate(self.feature_columns):
+                try:
+                    matrix[i, j] = float(row.get(column) or 0)
+                except (TypeError, ValueError):
+                    pass
+        if self.transform is not None:
+            matrix = np.asarray(self.transform(matrix), dtype=np.float32)
+        return matrix
+
+    def score(self, rows, scraped_at=None):
+        """
+        Push one cycle of rows and predict for every pod in it with a full window.
+        `scraped_at` is the time.monotonic() at which the cycle's scrape started.
+        Returns {(namespace, pod): prediction}.
+        """
+        self.cycle += 1
+        if rows:
+            features = self._features(rows)
+            slots = np.array([self._slot(tuple(row.get(c) for c in self.entity_columns)) for row in rows])
+
+            self.windows[slots, self.positions[slots]] = features
+            self.positions[slots] = (self.positions[slots] + 1) % self.time_steps
+            self.counts[slots] += 1
+        self._evict()
+
+        ready = [(key, slot) for key, slot in self.slots.items()
+                 if self.last_seen[key] == self.cycle and self.counts[slot] >= self.time_steps]
+        if not ready:
+            self.predictions = {}
+            return self.predictions
+
+        keys = [key for key, _ in ready]
+        ready_slots = np.array([slot for _, slot in ready])
+        # Oldest sample first: each ring starts at its next write position
+        steps = (self.positions[ready_slots, None] + np.arange(self.time_steps)) % self.time_steps
+        batch = self.windows[ready_slots[:, None], steps]
+
+        start = time.monotonic()
+        output = self.model.predict(batch)
+        if self.preprocessor is not None:
+            output = self.preprocessor.inverse_transform_targets(output)
+        end = time.monotonic()
+
+        self.last_predict_time = end - start
+        self.last_latency = end - scraped_at if scraped_at is not None else None
+        self.predictions = dict(zip(keys, output))
+        return self.predictions
+
+    def alerts(self, threshold=0.5):
+        """[(key, target, score)] for every predicted target at or above `threshold`."""
+        names = self.target_columns
+        alerts = []
+        for key, prediction in self.predictions.items():
+            for i in np.flatnonzero(prediction >= threshold):
+                alerts.append((key, names[i] if names is not None else i, float(prediction[i])))
+        return alerts
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Saved preprocessing for the models: column order, label vocabularies and
+# min/max scaling, in one JSON file next to the .h5 it was trained with, so
+# scoring starts without reloading or refitting on the historical data.
+
+FORMAT_VERSION = 1
+
+CATEGORICAL_COLUMNS = ["namespace", "pod", "node", "deployment"]
+
+# Model outputs, as in lstm_model.ipynb
+TARGET_COLUMNS = [
+    'deployment Replica Mismatch', 'deployment Unavailable Pods', 'deployment ImagePullFailure', 'deployment CrashLoopBackOff',
+    'deployment FailedScheduling', 'deployment QuotaExceeded', 'deployment ProgressDeadlineExceeded',
+    'CPU Pressure', 'Memory Pressure', 'Disk Pressure', 'Network Unavailable', 'Node Not Ready', 'PID Pressure', 'Node Unschedulable',
+    'CPU Throttling', 'High CPU Usage', 'OOMKilled (Out of Memory)', 'CrashLoopBackOff', 'ContainerNotReady', 'PodUnschedulable',
+    'NodePressure', 'ImagePullFailure',
+]
+
+# Code for categorical values not seen while fitting; known values are 1..n
+UNSEEN = 0
+
+
+def _scale(values, data_min, data_max):
+    data_range = data_max - data_min
+    # Constant columns map to 0, as MinMaxScaler does
+    data_range[data_range == 0] = 1
+    return (values - data_min) / data_range
+
+
+class Preprocessor:
+    """
+    Replaces the notebooks' LabelEncoders and MinMaxScalers.
+
+    fit()/partial_fit() learn vocabularies and per-column min/max (partial_fit
+    can be called once per chunk or per day of new data), transform_features()
+    and transform_targets() produce the float32 model inputs/outputs, and
+    save()/load() persist everything as JSON.
+    """
+
+    def __init__(self, feature_columns=None, target_columns=TARGET_COLUMNS, categorical_columns=CATEGORICAL_COLUMNS):
+        self.feature_columns = list(feature_columns) if feature_columns is not None else None
+        self.target_columns = list(target_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.vocabularies = {col: {} for col in self.categorical_columns}
+        self.feature_min = None
+        self.feature_max = None
+        self.target_min = None
+        self.target_max = None
+        self.rows_seen = 0
+
+    def _encode(self, df):
+        """Numeric frame of feature columns: categories to codes, timestamp to int64 ns, NaN to 0."""
+        encoded = {}
+        for col in self.feature_columns:
+            values = df[col] if col in df else pd.Series(0, index=df.index)
+            if col in self.vocabularies:
+                values = values.astype("string").map(self.vocabularies[col]).fillna(UNSEEN)
+            elif col == "timestamp":
+                times = pd.to_datetime(values, errors="coerce")
+                values = pd.Series(times.to_numpy(dtype="datetime64[ns]").astype("int64"), index=df.index).where(times.notna())
+            else:
+                values = pd.to_numeric(values, errors="coerce")
+            encoded[col] = values
+        return pd.DataFrame(encoded, index=df.index).fillna(0).to_numpy(dtype=np.float64)
+
+    def _targets(self, df):
+        return df.reindex(columns=self.target_columns).apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+    def fit(self, df):
+        self.__init__(self.feature_columns, self.target_columns, self.categorical_columns)
+        return self.partial_fit(df)
+
+    def partial_fit(self, df):
+        """Extend vocabularies and min/max with the rows of `df`."""
+        if self.feature_columns is None:
+            # Everything except the targets, in file order (as in lstm_model.ipynb)
+            self.feature_columns = [col for col in df.columns if col not in self.target_columns]
+
+        for col, vocabulary in self.vocabularies.items():
+            if col not in df:
+                continue
+            for value in df[col].astype("string").dropna().unique():
+                vocabulary.setdefault(value, len(vocabulary) + 1)
+
+        features = self._encode(df)
+        targets = self._targets(df)
+        if len(df):
+            if self.feature_min is None:
+                self.feature_min, self.feature_max = features.min(axis=0), features.max(axis=0)
+                self.target_min, self.target_max = targets.min(axis=0), targets.max(axis=0)
+            else:
+                self.feature_min = np.minimum(self.feature_min, features.min(axis=0))
+                self.feature_max = np.maximum(self.feature_max, features.max(axis=0))
+                self.target_min = np.minimum(self.target_min, targets.min(axis=0))
+                self.target_max = np.maximum(self.target_max, targets.max(axis=0))
+        self.rows_seen += len(df)
+        return self
+
+    def transform_features(self, df):
+        return _scale(self._encode(df), self.feature_min, self.feature_max).astype(np.float32)
+
+    def transform_targets(self, df):
+        return _scale(self._targets(df), self.target_min, self.target_max).astype(np.float32)
+
+    def inverse_transform_targets(self, scaled):
+        data_range = self.target_max - self.target_min
+        return np.asarray(scaled) * np.where(data_range == 0, 1, data_range) + self.target_min
+
+    def transform_rows(self, rows):
+        """Model inputs for a list of collected row dicts."""
+        return self.transform_features(pd.DataFrame(rows))
+
+    def save(self, path):
+        state = {
+            "version": FORMAT_VERSION,
+            "rows_seen": self.rows_seen,
+            "feature_columns": self.feature_columns,
+            "target_columns": self.target_columns,
+            "categorical_columns": self.categorical_columns,
+            "vocabularies": self.vocabularies,
+            "feature_min": self.feature_min.tolist(),
+            "feature_max": self.feature_max.tolist(),
+            "target_min": self.target_min.tolist(),
+            "target_max": self.target_max.tolist(),
+        }
+        with open(path, "w") as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} has preprocessing format {state.get('version')}, expected {FORMAT_VERSION}")
+
+        preprocessor = cls(state["feature_columns"], state["target_columns"], state["categorical_columns"])
+        preprocessor.vocabularies = state["vocabularies"]
+        preprocessor.rows_seen = state["rows_seen"]
+        for name in ("feature_min", "feature_max", "target_min", "target_max"):
+            setattr(preprocessor, name, np.array(state[name], dtype=np.float64))
+        return preprocessor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit (or extend) the saved preprocessing from collected CSVs.")
+    parser.add_argument("csv_files", nargs="+", help="Collected metrics, e.g. k8s_pod_metrics.csv")
+    parser.add_argument("--out", default="../../models/lstm_preprocessing.json")
+    parser.add_argument("--update", action="store_true", help="partial_fit on top of an existing --out file")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection"))
+    from metric_schema import read_csv as read_metrics_csv
+
+    if args.update and Path(args.out).exists():
+        preprocessor = Preprocessor.load(args.out)
+    else:
+        preprocessor = Preprocessor()
+    for csv_file in args.csv_files:
+        for chunk in read_metrics_csv(csv_file, chunksize=args.chunksize):
+            preprocessor.partial_fit(chunk)
+
+    preprocessor.save(args.out)
+    print(f"Saved preprocessing for {preprocessor.rows_seen} rows, {len(preprocessor.feature_columns)} features -> {args.out}")
@@ -0,0 +1,258 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Per-pod window store shared by training and inference.
+#
+# Collected rows interleave every pod of a cycle, so windows over the raw row
+# order mix pods. build_window_store() sorts the rows by (namespace, pod,
+# timestamp) once, splits each pod's history wherever it disappeared for
+# longer than `max_gap` seconds, and keeps only the start row of every window
+# that fits inside one such run. Windows are gathered from the sorted rows on
+# demand, so the store is about the size of the feature matrix itself.
+
+ENTITY_COLUMNS = ("namespace", "pod")
+
+# Default max_gap: this many median sampling intervals
+GAP_FACTOR = 3
+
+
+def _epoch_seconds(column):
+    if pd.api.types.is_numeric_dtype(column):
+        values = column.to_numpy(dtype="float64")
+        # The notebooks convert timestamps to int64 nanoseconds
+        return values / 1e9 if np.nanmax(values) > 1e11 else values
+    return pd.to_datetime(column, errors="coerce").to_numpy(dtype="datetime64[ns]").astype("int64") / 1e9
+
+
+class _Gather:
+    """
+    Array-like view of `data` rows at `rows[i]`, or of the `length` rows
+    starting there. Indexing with an int, slice or index array returns only
+    the requested windows.
+    """
+
+    def __init__(self, data, rows, length=None):
+        self.data = data
+        self.rows = rows
+        self.length = length
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def shape(self):
+        window = () if self.length is None else (self.length,)
+        return (len(self.rows),) + window + self.data.shape[1:]
+
+    def __getitem__(self, index):
+        rows = self.rows[index]
+        if self.length is None:
+            return self.data[rows]
+        return self.data[np.add.outer(rows, np.arange(self.length))]
+
+
+class SamplingIntervals:
+    """
+    Median interval between consecutive samples of a pod over a stream of
+    frames (e.g. CSV chunks), for a max_gap that does not depend on how the
+    rows were split. Each pod's last timestamp is carried into the next
+    frame; intervals are counted at millisecond resolution, so memory grows
+    with the number of pods and distinct intervals, not with the rows.
+    """
+
+    def __init__(self, entity_columns=ENTITY_COLUMNS):
+        self.entity_columns = list(entity_columns)
+        self.last = {}
+        self.counts = {}
+
+    def update(self, df):
+        codes, keys = pd.MultiIndex.from_frame(df[self.entity_columns].astype("string").fillna("")).factorize()
+        keys = [tuple(key) for key in keys]
+        # Each pod's last sample of the previous frames sorts in with this frame's
+        codes = np.r_[np.arange(len(keys)), codes]
+        timestamps = np.r_[[self.last.get(key, np.nan) for key in keys], _epoch_seconds(df["timestamp"])]
+        order = np.lexsort((timestamps, codes))
+        codes, timestamps = codes[order], timestamps[order]
+
+        gaps = np.diff(timestamps)
+        intervals = gaps[(codes[1:] == codes[:-1]) & (gaps > 0)]
+        for value, count in zip(*np.unique(np.round(intervals, 3), return_counts=True)):
+            self.counts[float(value)] = self.counts.get(float(value), 0) + int(count)
+
+        for code, latest in pd.Series(timestamps).groupby(codes).max().items():
+            if not np.isnan(latest):
+                self.last[keys[code]] = float(latest)
+        return self
+
+    def median(self):
+        """Median interval in seconds, None before any pod has two samples."""
+        if not self.counts:
+            return None
+        values = np.array(sorted(self.counts))
+        cumulative = np.cumsum([self.counts[value] for value in values])
+        total = cumulative[-1]
+        lower = values[np.searchsorted(cumulative, (total - 1) // 2, side="right")]
+        upper = values[np.searchsorted(cumulative, total // 2, side="right")]
+        return float(lower + upper) / 2
+
+    def max_gap(self):
+        """build_window_store's default max_gap for all the frames seen."""
+        median = self.median()
+        return GAP_FACTOR * median if median is not None else np.inf
+
+
+class WindowStore:
+    """
+    Windows of `time_steps` consecutive rows of one pod, each with the target
+    row `horizon` steps after the window's last row.
+
+    store.X and store.y index like (num_windows, time_steps, features) and
+    (num_windows, targets) arrays and can be passed to WindowBatches.
+    """
+
+    def __init__(self, features, targets, timestamps, segments, window_starts, entities, entity_keys,
+                 time_steps, horizon, feature_columns, target_columns):
+        self.features = features
+        self.targets = targets
+        self.timestamps = timestamps
+        self.segments = segments
+        self.window_starts = window_starts
+        self.entities = entities
+        self.entity_keys = entity_keys
+        self.time_steps = time_steps
+        self.horizon = horizon
+        self.feature_columns = list(feature_columns)
+        self.target_columns = list(target_columns)
+
+        self.X = _Gather(features, window_starts, time_steps)
+        self.y = _Gather(targets, window_starts + time_steps - 1 + horizon) if targets is not None else None
+
+    def __len__(self):
+        return len(self.window_starts)
+
+    def __getitem__(self, index):
+        if self.y is None:
+            return self.X[index]
+        return self.X[index], self.y[index]
+
+    def subset(self, index):
+        """Store over the selected windows, sharing this store's arrays."""
+        return WindowStore(self.features, self.targets, self.timestamps, self.segments,
+                           self.window_starts[index], self.entities, self.entity_keys,
+                           self.time_steps, self.horizon, self.feature_columns, self.target_columns)
+
+    def split(self, test_fraction=0.2, shuffle=False, seed=None):
+        """
+        (train, test) stores. Without shuffle the test windows are the most
+        recent ones, like train_test_split(shuffle=False) on time-ordered rows.
+        """
+        if shuffle:
+            order = np.random.default_rng(seed).permutation(len(self))
+        else:
+            order = np.argsort(self.timestamps[self.window_starts], kind="stable")
+        cut = len(self) - int(len(self) * test_fraction)
+        return self.subset(np.sort(order[:cut])), self.subset(np.sort(order[cut:]))
+
+    def window_entities(self, index=slice(None)):
+        """(namespace, pod) of the given windows."""
+        return [self.entity_keys[i] for i in np.atleast_1d(self.entities[self.window_starts[index]])]
+
+    def latest(self):
+        """
+        The most recent complete window of every pod whose last run is at
+        least `time_steps` rows long: ([(namespace, pod), ...], X).
+        """
+        last_rows = np.flatnonzero(np.r_[self.entities[1:] != self.entities[:-1], True])
+        starts = last_rows - self.time_steps + 1
+        keep = (starts >= 0)
+        keep[keep] = self.segments[starts[keep]] == self.segments[last_rows[keep]]
+        starts = starts[keep]
+        keys = [self.entity_keys[i] for i in self.entities[starts]]
+        return keys, _Gather(self.features, starts, self.time_steps)[:]
+
+    def save(self, path):
+        """Write the store as .npy arrays plus meta.json into directory `path`."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "features": self.features,
+            "timestamps": self.timestamps,
+            "segments": self.segments,
+            "window_starts": self.window_starts,
+            "entities": self.entities,
+        }
+        if self.targets is not None:
+            arrays["targets"] = self.targets
+        for name, array in arrays.items():
+            np.save(path / f"{name}.npy", array)
+
+        meta = {
+            "time_steps": self.time_steps,
+            "horizon": self.horizon,
+            "feature_columns": self.feature_columns,
+            "target_columns": self.target_columns,
+            "entity_keys": [list(key) for key in self.entity_keys],
+        }
+        with open(path / "meta.json", "w") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Open a saved store; with mmap_mode="r" rows are paged in only when a window is read."""
+        path = Path(path)
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+
+        def array(name):
+            file = path / f"{name}.npy"
+            return np.load(file, mmap_mode=mmap_mode) if file.exists() else None
+
+        return cls(array("features"), array("targets"), array("timestamps"), array("segments"),
+                   array("window_starts"), array("entities"), [tuple(key) for key in meta["entity_keys"]],
+                   meta["time_steps"], meta["horizon"], meta["feature_columns"], meta["target_columns"])
+
+
+def build_window_store(df, feature_columns, target_columns=None, time_steps=10, horizon=1,
+                       entity_columns=ENTITY_COLUMNS, max_gap=None, dtype=np.float32):
+    """
+    Sort `df` by entity and time and index every window that stays within
+    one pod and one uninterrupted run of samples.
+
+    A pod's history is split where consecutive samples are more than
+    `max_gap` seconds apart (default: 3x the median sampling interval).
+    horizon=1 targets the row right after the window, like create_sequences.
+    """
+    entity_columns = list(entity_columns)
+    target_columns = list(target_columns) if target_columns is not None else None
+
+    entity_codes, entity_index = pd.MultiIndex.from_frame(df[entity_columns].astype("string").fillna("")).factorize()
+    timestamps = _epoch_seconds(df["timestamp"])
+    order = np.lexsort((timestamps, entity_codes))
+
+    entities = entity_codes[order].astype(np.int32)
+    timestamps = timestamps[order]
+    features = df[feature_columns].to_numpy(dtype=dtype)[order]
+    targets = df[target_columns].to_numpy(dtype=dtype)[order] if target_columns is not None else None
+
+    same_entity = entities[1:] == entities[:-1]
+    gaps = np.diff(timestamps)
+    if max_gap is None:
+        intervals = gaps[same_entity & (gaps > 0)]
+        max_gap = GAP_FACTOR * float(np.median(intervals)) if len(intervals) else np.inf
+
+    # A new run starts at every new pod and after every gap (or unparseable timestamp)
+    breaks = np.r_[True, ~same_entity | ~(gaps <= max_gap)]
+    segments = np.cumsum(breaks).astype(np.int32) - 1
+    run_starts = np.flatnonzero(breaks)
+    run_lengths = np.diff(np.r_[run_starts, len(segments)])
+
+    position = np.arange(len(segments)) - run_starts[segments]
+    span = time_steps - 1 + (horizon if targets is not None else 0)
+    window_starts = np.flatnonzero(position + span < run_lengths[segments])
+
+    return WindowStore(features, targets, timestamps, segments, window_starts, entities,
+                       [tuple(key) for key in entity_index], time_steps, horizon,
+                       feature_columns, target_columns or [])
@@ -0,0 +1,243 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import Preprocessor
+from sequence_store import ENTITY_COLUMNS, SamplingIntervals, build_window_store
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection"))
+from metric_schema import read_csv as read_metrics_csv
+
+# Out-of-core training for the LSTM/GRU models.
+#
+# Pass 1 streams the CSVs in chunks to fit the preprocessing (vocabularies and
+# min/max) and measure the median sampling interval, which fixes the gap that
+# splits a pod's history for every chunk. Every epoch then streams them again:
+# chunks are read and scaled on background threads while the model trains,
+# cut into per-pod windows (each pod's last rows are carried into the next
+# chunk so no window is lost at a boundary) and fed to model.fit as batches
+# through tf.data. Memory use is bounded by a few chunks.
+
+
+def build_lstm(time_steps, n_features, n_outputs):
+    from tensorflow.keras.layers import LSTM, Dense, Input
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential([
+        Input(shape=(time_steps, n_features)),
+        LSTM(128, return_sequences=False),
+        Dense(64, activation='relu'),
+        Dense(n_outputs),
+    ])
+    model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+    return model
+
+
+def build_gru(time_steps, n_features, n_outputs):
+    from tensorflow.keras.layers import GRU, BatchNormalization, Dense, Dropout, Input
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential([
+        Input(shape=(time_steps, n_features)),
+        GRU(128, return_sequences=True),
+        Dropout(0.6),
+        BatchNormalization(),
+        GRU(64, return_sequences=False),
+        Dropout(0.2),
+        BatchNormalization(),
+        Dense(32, activation='relu'),
+        Dense(n_outputs, activation='sigmoid'),
+    ])
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+MODELS = {"lstm": build_lstm, "gru": build_gru}
+
+
+def read_chunks(csv_files, chunksize):
+    # Parsed straight into the compact metric_schema dtypes
+    for csv_file in csv_files:
+        yield from read_metrics_csv(csv_file, chunksize=chunksize)
+
+
+def fit_preprocessing(csv_files, chunksize, preprocessor=None, intervals=None):
+    """
+    One streaming pass of partial_fit over every chunk. With a
+    SamplingIntervals as `intervals`, the same chunks are added to it.
+    """
+    preprocessor = preprocessor or Preprocessor()
+    for chunk in read_chunks(csv_files, chunksize):
+        preprocessor.partial_fit(chunk)
+        if intervals is not None:
+            intervals.update(chunk)
+    return preprocessor
+
+
+def sampling_max_gap(csv_files, chunksize):
+    """Default max_gap over all rows of the CSVs, in one streaming pass."""
+    intervals = SamplingIntervals()
+    for chunk in read_chunks(csv_files, chunksize):
+        intervals.update(chunk)
+    return intervals.max_gap()
+
+
+def read_ahead(chunks, workers, depth):
+    """
+    Read chunks on a background thread and transform them on `workers`
+    threads, keeping at most `depth` chunks in flight. Yields in file order.
+    The transforms hold the GIL for much of their pandas/Python work, so this
+    mainly overlaps reading and scaling with training rather than scaling
+    chunks in parallel.
+    """
+    pending = queue.Queue(maxsize=depth)
+    done = object()
+
+    def produce():
+        try:
+            for chunk in chunks:
+                pending.put(chunk)
+        finally:
+            pending.put(done)
+
+    threading.Thread(target=produce, name="chunk-reader", daemon=True).start()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk-parse") as pool:
+        in_flight = []
+        while True:
+            item = pending.get()
+            if item is done:
+                break
+            in_flight.append(pool.submit(item))
+            if len(in_flight) >= depth:
+                yield in_flight.pop(0).result()
+        for future in in_flight:
+            yield future.result()
+
+
+class ChunkedWindows:
+    """
+    Iterable of (X, y) float32 batches over per-pod windows of the given
+    CSVs, streamed chunk by chunk. Each iteration is one epoch.
+
+    max_gap=None measures the median sampling interval over all the CSVs
+    once (an extra pass; fit_preprocessing can measure it instead), so the
+    windows are the same whatever the chunksize.
+    """
+
+    def __init__(self, csv_files, preprocessor, time_steps=10, horizon=1, batch_size=32, chunksize=100000,
+                 shuffle=True, seed=None, max_gap=None, parse_workers=2, read_ahead_chunks=2):
+        self.csv_files = list(csv_files)
+        self.preprocessor = preprocessor
+        self.time_steps = time_steps
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.chunksize = chunksize
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.max_gap = max_gap if max_gap is not None else sampling_max_gap(self.csv_files, chunksize)
+        self.parse_workers = parse_workers
+        self.read_ahead_chunks = read_ahead_chunks
+
+        self.n_features = len(preprocessor.feature_columns)
+        self.n_targets = len(preprocessor.target_columns)
+        self.feature_names = [f"feature_{i}" for i in range(self.n_features)]
+        self.target_names = [f"target_{i}" for i in range(self.n_targets)]
+
+    def _scale(self, chunk):
+        frame = pd.DataFrame(self.preprocessor.transform_features(chunk), columns=self.feature_names, index=chunk.index)
+        frame[self.target_names] = self.preprocessor.transform_targets(chunk)
+        for col in list(ENTITY_COLUMNS) + ["timestamp"]:
+            frame[col] = chunk[col]
+        return frame
+
+    def _tasks(self):
+        # Each task scales one chunk when a parse worker picks it up
+        for chunk in read_chunks(self.csv_files, self.chunksize):
+            yield lambda chunk=chunk: self._scale(chunk)
+
+    def __iter__(self):
+        span = self.time_steps - 1 + self.horizon
+        carry = None
+        for chunk in read_ahead(self._tasks(), self.parse_workers, self.read_ahead_chunks):
+            frame = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+            store = build_window_store(frame, self.feature_names, self.target_names, self.time_steps, self.horizon,
+                                       max_gap=self.max_gap)
+            # Each pod's last `span` rows (from the carry and this chunk together,
+            # so a pod with fewer rows in this chunk keeps its earlier history)
+            # continue into the next chunk. They are one row short of a window
+            # plus target, so no window repeats.
+            carry = frame.groupby(list(ENTITY_COLUMNS), sort=False, dropna=False).tail(span)
+
+            order = self.rng.permutation(len(store)) if self.shuffle else np.arange(len(store))
+            for start in range(0, len(store), self.batch_size):
+                yield store[np.sort(order[start:start + self.batch_size])]
+
+    def to_dataset(self, prefetch=None):
+        import tensorflow as tf
+
+        signature = (
+            tf.TensorSpec((None, self.time_steps, self.n_features), tf.float32),
+            tf.TensorSpec((None, self.n_targets), tf.float32),
+        )
+        dataset = tf.data.Dataset.from_generator(self.__iter__, output_signature=signature)
+        return dataset.prefetch(tf.data.AUTOTUNE if prefetch is None else prefetch)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the LSTM/GRU model on collected CSVs without loading them whole.")
+    parser.add_argument("csv_files", nargs="+", help="Collected metrics, e.g. k8s_pod_metrics.csv")
+    parser.add_argument("--model", choices=sorted(MODELS), default="lstm")
+    parser.add_argument("--out", help="Model path (default: ../../models/<model>_model.h5)")
+    parser.add_argument("--preprocessing", help="Preprocessing path (default: next to the model)")
+    parser.add_argument("--reuse-preprocessing", action="store_true",
+                        help="Load --preprocessing instead of fitting it again")
+    parser.add_argument("--validation-csv", nargs="*", default=[])
+    parser.add_argument("--time-steps", type=int, default=10)
+    parser.add_argument("--horizon", type=int, default=1)
+    parser.add_argument("--max-gap", type=float,
+                        help="Seconds between samples that split a pod's history (default: 3x the median interval)")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--prefetch", type=int, help="Batches prefetched by tf.data (default: AUTOTUNE)")
+    parser.add_argument("--parse-workers", type=int, default=2,
+                        help="Threads scaling chunks ahead of training (GIL-bound, so mostly overlap rather than parallelism)")
+    parser.add_argument("--read-ahead", type=int, default=2, help="Chunks read ahead of training")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    out = Path(args.out or f"../../models/{args.model}_model.h5")
+    preprocessing_path = Path(args.preprocessing or out.with_name(f"{args.model}_preprocessing.json"))
+
+    if args.reuse_preprocessing:
+        preprocessor = Preprocessor.load(preprocessing_path)
+        max_gap = args.max_gap
+    else:
+        intervals = SamplingIntervals()
+        preprocessor = fit_preprocessing(args.csv_files, args.chunksize, intervals=intervals)
+        preprocessor.save(preprocessing_path)
+        max_gap = args.max_gap if args.max_gap is not None else intervals.max_gap()
+    print(f"Preprocessing: {preprocessor.rows_seen} rows, {len(preprocessor.feature_columns)} features -> {preprocessing_path}")
+
+    def windows(files, shuffle, max_gap):
+        return ChunkedWindows(files, preprocessor, args.time_steps, args.horizon, args.batch_size, args.chunksize,
+                              shuffle=shuffle, seed=args.seed, max_gap=max_gap,
+                              parse_workers=args.parse_workers, read_ahead_chunks=args.read_ahead)
+
+    # Validation histories are split with the training data's gap
+    train = windows(args.csv_files, shuffle=True, max_gap=max_gap)
+    print(f"Max gap: {train.max_gap:.1f}s")
+    validation = windows(args.validation_csv, shuffle=False, max_gap=train.max_gap).to_dataset(args.prefetch) if args.validation_csv else None
+
+    model = MODELS[args.model](args.time_steps, train.n_features, train.n_targets)
+    model.summary()
+    model.fit(train.to_dataset(args.prefetch), validation_data=validation, epochs=args.epochs, verbose=1)
+    model.save(out)
+    print(f"Saved {out}")
@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Sliding-window sequence building for the LSTM/GRU models.
+#
+# Windows are strided views over the feature matrix, so building them costs
+# no memory; only the batch handed to the model is ever copied.
+
+
+def window_view(X, time_steps, stride=1):
+    """
+    Read-only (num_windows, time_steps, features) view of X where window i
+    covers rows i*stride .. i*stride + time_steps - 1. Nothing is copied.
+    """
+    X = np.asarray(X)
+    if len(X) < time_steps:
+        return np.empty((0, time_steps) + X.shape[1:], dtype=X.dtype)
+    # sliding_window_view puts the window axis last: (N - T + 1, F, T)
+    windows = np.moveaxis(sliding_window_view(X, time_steps, axis=0), -1, 1)
+    return windows[::stride]
+
+
+def create_sequences(X, y, time_steps=10, horizon=1, stride=1):
+    """
+    Drop-in replacement for the notebooks' create_sequences loop.
+
+    Returns (X_seq, y_seq) where X_seq[i] is a window of `time_steps` rows
+    and y_seq[i] is the target `horizon` rows after the window's last row.
+    horizon=1 matches lstm_model.ipynb (y[i + time_steps]); the GRU
+    notebook's PREDICTION_HORIZON=h corresponds to horizon=h + 1.
+
+    Both results are views into X and y.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    count = len(X) - time_steps - horizon + 1
+    if count <= 0:
+        return (np.empty((0, time_steps) + X.shape[1:], dtype=X.dtype),
+                np.empty((0,) + y.shape[1:], dtype=y.dtype))
+
+    X_seq = window_view(X[:count + time_steps - 1], time_steps, stride)
+    y_seq = y[time_steps - 1 + horizon:][::stride][:len(X_seq)]
+    return X_seq, y_seq
+
+
+class WindowBatches:
+    """
+    Lazily materialises (X, y) batches from window views, so training on a
+    long capture holds one batch of windows in memory instead of all of them.
+
+    Iterating yields one epoch of float32 batches (reshuffled each epoch when
+    shuffle=True). Pass the object to model.fit() through to_dataset().
+    """
+
+    def __init__(self, windows, targets=None, batch_size=32, shuffle=False, seed=None, dtype=np.float32):
+        self.windows = windows
+        self.targets = targets
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.dtype = dtype
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return math.ceil(len(self.windows) / self.batch_size)
+
+    def __iter__(self):
+        count = len(self.windows)
+        order = self.rng.permutation(count) if self.shuffle else None
+        for start in range(0, count, self.batch_size):
+            if order is None:
+                index = slice(start, start + self.batch_size)
+            else:
+                # Sorted indices keep each gather reading memory forwards
+                index = np.sort(order[start:start + self.batch_size])
+            X = np.array(self.windows[index], dtype=self.dtype)
+            if self.targets is None:
+                yield X
+            else:
+                yield X, np.array(self.targets[index], dtype=self.dtype)
+
+    def to_dataset(self, prefetch=None):
+        """tf.data.Dataset over the batches, prefetching `prefetch` batches (AUTOTUNE by default)."""
+        import tensorflow as tf
+
+        x_spec = tf.TensorSpec((None,) + self.windows.shape[1:], tf.as_dtype(self.dtype))
+        if self.targets is None:
+            signature = x_spec
+        else:
+            signature = (x_spec, tf.TensorSpec((None,) + self.targets.shape[1:], tf.as_dtype(self.dtype)))
+
+        dataset = tf.data.Dataset.from_generator(self.__iter__, output_signature=signature)
+        return dataset.prefetch(tf.data.AUTOTUNE if prefetch is None else prefetch)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The scripts import their neighbours by module name; put the source folders on the path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("data_collection", "model_training", "live_capture_data"):
+    sys.path.insert(0, os.path.join(ROOT, "src", folder))
+
+DATASETS = os.path.join(ROOT, "datasets")
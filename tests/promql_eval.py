@@ -0,0 +1,263 @@
+import math
+import re
+
+# Instant-vector PromQL evaluator for the subset the collector templates use,
+# over a fixed list of series. rate(x[5m]) returns the stored sample as the
+# rate. Results have the HTTP API shape: [{"metric": {...}, "value": [t, "v"]}].
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+      (?P<number>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+    | (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<range>\[[^\]]*\])
+    | (?P<name>[a-zA-Z_:][\w:]*)
+    | (?P<op>=~|!~|!=|[-+*/(){},=])
+    )""", re.VERBOSE)
+
+AGGREGATIONS = {"sum", "max", "min", "avg", "count", "group"}
+
+
+def _tokens(query):
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"cannot tokenize {query[pos:]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+        while pos < len(query) and query[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def _signature(labels, on=None):
+    if on is None:
+        return tuple(sorted((k, v) for k, v in labels.items() if k != "__name__"))
+    return tuple((k, labels.get(k, "")) for k in sorted(on))
+
+
+def _arith(op, a, b):
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if b == 0:
+        return math.nan if a == 0 else math.copysign(math.inf, a)
+    return a / b
+
+
+class Evaluator:
+    def __init__(self, series, now=1000.0):
+        # series: [(labels incl. __name__, value)]
+        self.series = [(dict(labels), float(value)) for labels, value in series]
+        self.now = now
+
+    def query(self, query):
+        self.tokens = _tokens(query)
+        self.pos = 0
+        value = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"trailing tokens in {query!r}: {self.tokens[self.pos:]}")
+        if isinstance(value, float):
+            value = [({}, value)]
+        return [{"metric": {k: v for k, v in labels.items() if k != "__name__"}, "value": [self.now, repr(v)]}
+                for labels, v in value]
+
+    # Parsing, lowest precedence first
+
+    def _peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def _take(self, expected=None):
+        token = self._peek()
+        if expected is not None and token[1] != expected:
+            raise ValueError(f"expected {expected!r}, got {token}")
+        self.pos += 1
+        return token
+
+    def _labels(self):
+        self._take("(")
+        labels = []
+        while self._peek()[1] != ")":
+            labels.append(self._take()[1])
+            if self._peek()[1] == ",":
+                self._take(",")
+        self._take(")")
+        return labels
+
+    def _modifiers(self):
+        on = None
+        group_left = False
+        if self._peek()[1] == "on":
+            self._take()
+            on = self._labels()
+        if self._peek()[1] == "group_left":
+            self._take()
+            group_left = True
+            if self._peek()[1] == "(":
+                self._labels()
+        return on, group_left
+
+    def _or(self):
+        left = self._additive()
+        while self._peek()[1] == "or":
+            self._take()
+            on, _ = self._modifiers()
+            right = self._additive()
+            seen = {_signature(labels, on) for labels, _ in left}
+            left = left + [(labels, v) for labels, v in right if _signature(labels, on) not in seen]
+        return left
+
+    def _additive(self):
+        left = self._multiplicative()
+        while self._peek()[1] in ("+", "-"):
+            op = self._take()[1]
+            on, group_left = self._modifiers()
+            left = self._binary(op, left, self._multiplicative(), on, group_left)
+        return left
+
+    def _multiplicative(self):
+        left = self._unary()
+        while self._peek()[1] in ("*", "/"):
+            op = self._take()[1]
+            on, group_left = self._modifiers()
+            left = self._binary(op, left, self._unary(), on, group_left)
+        return left
+
+    def _unary(self):
+        if self._peek()[1] == "-":
+            self._take()
+            return self._binary("*", -1.0, self._unary(), None, False)
+        return self._primary()
+
+    def _primary(self):
+        kind, text = self._peek()
+        if kind == "number":
+            self._take()
+            return float(text)
+        if text == "(":
+            self._take("(")
+            value = self._or()
+            self._take(")")
+            return value
+        if kind != "name":
+            raise ValueError(f"unexpected token {text!r}")
+        self._take()
+        if text in AGGREGATIONS and self._peek()[1] in ("by", "("):
+            by = None
+            if self._peek()[1] == "by":
+                self._take()
+                by = self._labels()
+            self._take("(")
+            value = self._or()
+            self._take(")")
+            return self._aggregate(text, value, by or [])
+        if self._peek()[1] == "(":
+            return self._call(text)
+        return self._select(text)
+
+    def _args(self):
+        self._take("(")
+        args = []
+        while self._peek()[1] != ")":
+            if self._peek()[0] == "string":
+                args.append(self._take()[1][1:-1])
+            else:
+                args.append(self._or())
+            if self._peek()[1] == ",":
+                self._take(",")
+        self._take(")")
+        return args
+
+    def _call(self, name):
+        args = self._args()
+        if name == "vector":
+            return [({}, args[0])]
+        if name == "time":
+            return self.now
+        if name == "rate":
+            return [({k: v for k, v in labels.items() if k != "__name__"}, value) for labels, value in args[0]]
+        if name == "label_replace":
+            vector, dst, replacement, src, regex = args
+            out = []
+            for labels, value in vector:
+                labels = dict(labels)
+                match = re.fullmatch(regex, labels.get(src, ""))
+                if match:
+                    new = match.expand(re.sub(r"\$(\d+)", r"\\g<\1>", replacement))
+                    if new:
+                        labels[dst] = new
+                    else:
+                        labels.pop(dst, None)
+                out.append((labels, value))
+            return out
+        raise ValueError(f"unsupported function {name}")
+
+    def _select(self, name):
+        matchers = [("__name__", "=", name)]
+        if self._peek()[1] == "{":
+            self._take("{")
+            while self._peek()[1] != "}":
+                label = self._take()[1]
+                op = self._take()[1]
+                value = self._take()[1][1:-1]
+                matchers.append((label, op, value))
+                if self._peek()[1] == ",":
+                    self._take(",")
+            self._take("}")
+        if self._peek()[0] == "range":
+            self._take()
+
+        def matches(labels):
+            for label, op, value in matchers:
+                actual = labels.get(label, "")
+                if op == "=" and actual != value or op == "!=" and actual == value:
+                    return False
+                if op == "=~" and not re.fullmatch(value, actual) or op == "!~" and re.fullmatch(value, actual):
+                    return False
+            return True
+
+        return [(dict(labels), value) for labels, value in self.series if matches(labels)]
+
+    def _aggregate(self, name, vector, by):
+        groups = {}
+        for labels, value in vector:
+            key = tuple((label, labels.get(label, "")) for label in by)
+            groups.setdefault(key, []).append(value)
+        out = []
+        for key, values in groups.items():
+            result = {
+                "sum": sum(values), "max": max(values), "min": min(values), "avg": sum(values) / len(values),
+                "count": float(len(values)), "group": 1.0,
+            }[name]
+            out.append(({label: value for label, value in key if value}, result))
+        return out
+
+    def _binary(self, op, left, right, on, group_left):
+        if isinstance(left, float) and isinstance(right, float):
+            return _arith(op, left, right)
+        if isinstance(right, float):
+            return [({k: v for k, v in labels.items() if k != "__name__"}, _arith(op, value, right))
+                    for labels, value in left]
+        if isinstance(left, float):
+            return [({k: v for k, v in labels.items() if k != "__name__"}, _arith(op, left, value))
+                    for labels, value in right]
+        one_side = {}
+        for labels, value in right:
+            one_side.setdefault(_signature(labels, on), (labels, value))
+        out = []
+        for labels, value in left:
+            match = one_side.get(_signature(labels, on))
+            if match is None:
+                continue
+            result = {k: v for k, v in labels.items() if k != "__name__"}
+            if not group_left and on is not None:
+                result = {k: v for k, v in result.items() if k in on}
+            out.append((result, _arith(op, value, match[1])))
+        return out
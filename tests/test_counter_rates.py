@@ -0,0 +1,58 @@
+from counter_rates import CounterRates
+from promql_bulk import collect_bulk
+
+QUERIES = {"disk_io_errors": 'sum(rate(container_fs_errors_total{pod="{pod}"}[5m])) or vector(0)'}
+PODS = [("shop", "web")]
+
+
+def counter(value, sample_time):
+    labels = {"__name__": "container_fs_errors_total", "namespace": "shop", "pod": "web"}
+    return [{"metric": labels, "value": [sample_time, str(value)]}]
+
+
+def timestamps(sample_time):
+    return [{"metric": {"namespace": "shop", "pod": "web"}, "value": [sample_time, str(sample_time)]}]
+
+
+def cycle(rates, values=None, times=None, server=None):
+    """One collect_bulk call; raw value/timestamp queries answer `values`/`times` (None = failed)."""
+    def run_many(queries):
+        results = {}
+        for key, query in queries.items():
+            if key[-1] == "value":
+                results[key] = values
+            elif key[-1] == "timestamp":
+                results[key] = times
+            else:
+                results[key] = server
+        return results
+
+    collected = collect_bulk({"{pod}": (QUERIES, PODS)}, run_many, rates=rates)
+    return collected["{pod}"][("shop", "web")]["disk_io_errors"]
+
+
+def primed():
+    rates = CounterRates()
+    cycle(rates, counter(10, 100.0), timestamps(100.0), server=[])
+    return rates
+
+
+def test_rate_from_consecutive_samples():
+    rates = primed()
+    assert cycle(rates, counter(20, 105.0), timestamps(105.0)) == 2.0
+
+
+def test_failed_raw_query_is_missing_not_zero():
+    rates = primed()
+    assert cycle(rates, None, timestamps(105.0)) is None
+    assert cycle(rates, counter(20, 105.0), None) is None
+
+
+def test_no_sample_uses_template_default():
+    rates = primed()
+    assert cycle(rates, [], []) == 0.0
+
+
+def test_failed_server_query_is_missing_not_default():
+    assert cycle(None, server=None) is None
+    assert cycle(None, server=[]) == 0.0
@@ -0,0 +1,31 @@
+import pytest
+
+from k8s_api_backend import parse_cadvisor
+
+# /metrics/cadvisor of one node: a two-container pod with its pod cgroup
+# (container="") and sandbox (container="POD") series, as the kubelet reports them
+CADVISOR = """\
+# HELP container_fs_reads_bytes_total Cumulative count of bytes read
+# TYPE container_fs_reads_bytes_total counter
+container_fs_reads_bytes_total{container="",device="/dev/sda",id="/kubepods/pod1",image="",name="",namespace="shop",pod="web"} 6144 1700000000000
+container_fs_reads_bytes_total{container="POD",device="/dev/sda",id="/kubepods/pod1/sandbox",image="pause",name="k8s_POD_web",namespace="shop",pod="web"} 1024 1700000000000
+container_fs_reads_bytes_total{container="app",device="/dev/sda",id="/kubepods/pod1/app",image="app",name="k8s_app_web",namespace="shop",pod="web"} 4096 1700000000000
+container_fs_reads_bytes_total{container="sidecar",device="/dev/sda",id="/kubepods/pod1/sidecar",image="proxy",name="k8s_sidecar_web",namespace="shop",pod="web"} 1024 1700000000000
+container_fs_writes_bytes_total{container="",device="/dev/sda",id="/kubepods/pod1",image="",name="",namespace="shop",pod="web"} 2048 1700000000000
+container_fs_writes_bytes_total{container="app",device="/dev/sda",id="/kubepods/pod1/app",image="app",name="k8s_app_web",namespace="shop",pod="web"} 2048 1700000000000
+container_fs_reads_bytes_total{container="",device="/dev/sda",id="/system.slice",image="",name="",namespace="",pod=""} 99999 1700000000000
+# TYPE container_network_transmit_bytes_total counter
+container_network_transmit_bytes_total{container="POD",id="/kubepods/pod1/sandbox",interface="eth0",namespace="shop",pod="web"} 10240 1700000000000
+container_network_transmit_bytes_total{container="POD",id="/kubepods/pod1/sandbox",interface="tunl0",namespace="shop",pod="web"} 5120 1700000000000
+"""
+
+
+def test_disk_io_counts_each_container_once():
+    totals = parse_cadvisor(CADVISOR)
+    assert list(totals) == [("shop", "web")]
+    # app 4096 + 2048, sidecar 1024; the pod cgroup and sandbox series are left out
+    assert totals[("shop", "web")]["disk"] == pytest.approx((4096 + 2048 + 1024) / 1024)
+
+
+def test_network_reads_the_sandbox_eth0_series():
+    assert parse_cadvisor(CADVISOR)[("shop", "web")]["network"] == pytest.approx(10.0)
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from kubernetes import client
+
+from k8s_watch import EventStream
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def event(uid, resource_version, minutes):
+    return client.CoreV1Event(metadata=client.V1ObjectMeta(uid=uid, resource_version=resource_version),
+                              involved_object=client.V1ObjectReference(),
+                              last_timestamp=START + timedelta(minutes=minutes))
+
+
+@pytest.fixture
+def stream():
+    # Seen UIDs expire at once, as they would after uid_ttl
+    return EventStream(uid_ttl=-1)
+
+
+def uids(events):
+    return [e.metadata.uid for e in events]
+
+
+def test_relist_only_emits_events_newer_than_the_last_handled(stream):
+    stream.on_list([event("a", "105", 0), event("b", "110", 1)])
+    stream.on_event("ADDED", event("c", "120", 2))
+    assert uids(stream.drain()) == ["a", "b", "c"]
+
+    # 410 Gone: the relist still holds a, b and c; d was created meanwhile
+    stream.on_list([event("a", "105", 0), event("b", "110", 1), event("c", "120", 2), event("d", "130", 3)])
+    assert uids(stream.drain()) == ["d"]
+
+
+def test_relist_falls_back_to_event_time(stream):
+    stream.on_list([event("a", "x1", 0), event("b", "x2", 1)])
+    stream.drain()
+
+    stream.on_list([event("a", "x1", 0), event("b", "x2", 1), event("c", "x3", 2)])
+    assert uids(stream.drain()) == ["c"]
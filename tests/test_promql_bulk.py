@@ -0,0 +1,88 @@
+import pytest
+
+from promql_bulk import GROUP_LABELS, collect_bulk, to_bulk_query
+from promql_eval import Evaluator
+
+# Templates as in trainable_params_generator_FinalVersion.py
+POD_QUERIES = {
+    "cpu_usage": '((sum(rate(container_cpu_usage_seconds_total{pod="{pod}"}[5m])) or vector(0)) / (sum(kube_pod_container_resource_limits{pod="{pod}", resource="cpu"}) or sum(kube_node_status_allocatable{resource="cpu"}))) * 100',
+    "cpu_limit": 'sum(kube_pod_container_resource_limits{pod="{pod}", resource="cpu"}) or vector(0)',
+    "cpu_utilization_ratio": '(sum(rate(container_cpu_usage_seconds_total{pod="{pod}"}[5m])) or vector(0))/ (sum(kube_pod_container_resource_limits{pod="{pod}", resource="cpu"}) or vector(1))',
+    "disk_io_errors": 'sum(rate(container_fs_errors_total{pod="{pod}"}[5m])) or vector(0)',
+}
+NODE_QUERIES = {
+    "node_cpu_usage": '(sum(rate(node_cpu_seconds_total{mode!="idle", node="{node}"}[5m])) or vector(0)) * 100',
+    "node_network_errors": 'sum(rate(node_network_receive_errs_total{instance=~"{node}.*"}[5m]) or vector(0)) + sum(rate(node_network_transmit_errs_total{instance=~"{node}.*"}[5m]) or vector(0))',
+    "node_disk_utilization_ratio": '1 - ((sum(node_filesystem_avail_bytes{instance=~"{node}.*", mountpoint="/"}) or vector(0)) / (sum(node_filesystem_size_bytes{instance=~"{node}.*", mountpoint="/"}) or vector(1)))',
+}
+
+PODS = [("shop", "limited"), ("shop", "unlimited"), ("shop", "idle")]
+NODES = [("node-a",), ("node-b",)]
+
+
+def series(name, value, **labels):
+    return {"__name__": name, **labels}, value
+
+
+SERIES = [
+    series("kube_pod_info", 1, namespace="shop", pod="limited", node="node-a"),
+    series("kube_pod_info", 1, namespace="shop", pod="unlimited", node="node-a"),
+    series("kube_pod_info", 1, namespace="shop", pod="idle", node="node-b"),
+    series("kube_node_info", 1, node="node-a"),
+    series("kube_node_info", 1, node="node-b"),
+    series("container_cpu_usage_seconds_total", 0.5, namespace="shop", pod="limited", container="app"),
+    series("container_cpu_usage_seconds_total", 0.25, namespace="shop", pod="limited", container="sidecar"),
+    series("container_cpu_usage_seconds_total", 1.0, namespace="shop", pod="unlimited", container="app"),
+    # Only "limited" has a limit series; "idle" has no usage either
+    series("kube_pod_container_resource_limits", 2, namespace="shop", pod="limited", resource="cpu", container="app"),
+    series("kube_node_status_allocatable", 4, node="node-a", resource="cpu"),
+    series("kube_node_status_allocatable", 4, node="node-b", resource="cpu"),
+    series("node_cpu_seconds_total", 0.5, node="node-a", cpu="0", mode="user"),
+    series("node_cpu_seconds_total", 9.0, node="node-a", cpu="0", mode="idle"),
+    series("node_network_receive_errs_total", 3, instance="node-a:9100", device="eth0"),
+    series("node_filesystem_avail_bytes", 25, instance="node-a:9100", mountpoint="/"),
+    series("node_filesystem_size_bytes", 100, instance="node-a:9100", mountpoint="/"),
+]
+
+
+@pytest.fixture
+def prometheus():
+    return Evaluator(SERIES)
+
+
+def per_object(prometheus, queries, placeholder, objects):
+    # As collect_per_object: the placeholder replaced by the object name, first series' value
+    collected = {}
+    for obj in objects:
+        metrics = collected[obj] = {}
+        for name, template in queries.items():
+            result = prometheus.query(template.replace(placeholder, obj[-1]))
+            metrics[name] = float(result[0]["value"][1]) if result else None
+    return collected
+
+
+def test_objects_without_limit_or_usage_series_match_per_object(prometheus):
+    def run_many(queries):
+        return {key: prometheus.query(query) for key, query in queries.items()}
+
+    bulk = collect_bulk({"{pod}": (POD_QUERIES, PODS), "{node}": (NODE_QUERIES, NODES)}, run_many)
+
+    assert bulk["{pod}"] == per_object(prometheus, POD_QUERIES, "{pod}", PODS)
+    assert bulk["{node}"] == per_object(prometheus, NODE_QUERIES, "{node}", NODES)
+    # No limit: usage as a percentage of the cluster's allocatable CPU
+    assert bulk["{pod}"][("shop", "unlimited")]["cpu_usage"] == pytest.approx(1.0 / 8 * 100)
+    # No usage series: a genuine zero, not a missing value
+    assert bulk["{pod}"][("shop", "idle")]["cpu_usage"] == 0.0
+    assert bulk["{node}"][("node-b",)]["node_network_errors"] == 0.0
+
+
+def test_fallbacks_are_kept_per_object():
+    query, default = to_bulk_query(POD_QUERIES["cpu_usage"], "{pod}")
+    assert default is None
+    assert "vector(0)" in query and 'sum(kube_node_status_allocatable{resource="cpu"})' in query
+    assert "or on(namespace, pod)" in query
+
+    query, default = to_bulk_query(POD_QUERIES["cpu_limit"], "{pod}")
+    assert default == 0.0
+    assert "vector" not in query
+    assert query.startswith(f"sum by ({', '.join(GROUP_LABELS['{pod}'])})")
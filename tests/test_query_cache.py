@@ -0,0 +1,97 @@
+from query_cache import QueryCache
+
+PODS = [("shop", "web"), ("shop", "worker")]
+QUERIES = {"cpu_limit": "limit{pod}", "cpu_usage": "usage{pod}"}
+
+
+class FakeCollect:
+    """
+    collect_per_object stand-in: `values[(metric, obj)]`, with keys in
+    `failing` failing. With `bulk`, a metric is queried for every object and
+    `skip` is ignored, as collect_bulk does.
+    """
+
+    def __init__(self, values, failing=(), bulk=False):
+        self.values = values
+        self.failing = set(failing)
+        self.bulk = bulk
+        self.queried = []
+
+    def __call__(self, query_sets, failed=None, skip=None):
+        collected = {}
+        for placeholder, (templates, objects) in query_sets.items():
+            per_object = collected[placeholder] = {tuple(obj): {} for obj in objects}
+            for metric in templates:
+                for obj, metrics in per_object.items():
+                    if not self.bulk and (placeholder, obj, metric) in skip:
+                        continue
+                    self.queried.append((metric, obj))
+                    if (metric, obj) in self.failing:
+                        metrics[metric] = None
+                        failed.add((placeholder, obj, metric))
+                    else:
+                        metrics[metric] = self.values.get((metric, obj))
+        return collected
+
+
+def test_no_series_result_is_cached():
+    cache = QueryCache({"cpu_limit": 300})
+    # "worker" has no limit series: None, but a successful query
+    collect = FakeCollect({("cpu_limit", PODS[0]): 2.0, ("cpu_usage", PODS[0]): 0.5})
+
+    first = cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+    collect.queried.clear()
+    second = cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+
+    assert collect.queried == [("cpu_usage", PODS[0]), ("cpu_usage", PODS[1])]
+    assert second == first
+    assert second["{pod}"][PODS[1]] == {"cpu_limit": None, "cpu_usage": None}
+    assert list(second["{pod}"][PODS[0]]) == list(QUERIES)
+
+
+def test_failed_query_is_retried():
+    cache = QueryCache({"cpu_limit": 300})
+    collect = FakeCollect({("cpu_limit", PODS[0]): 2.0}, failing=[("cpu_limit", PODS[1])])
+    cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+
+    collect.failing.clear()
+    collect.values[("cpu_limit", PODS[1])] = 4.0
+    collect.queried.clear()
+    result = cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+
+    assert ("cpu_limit", PODS[0]) not in collect.queried
+    assert ("cpu_limit", PODS[1]) in collect.queried
+    assert result["{pod}"][PODS[1]]["cpu_limit"] == 4.0
+
+
+def test_new_object_is_queried_alone():
+    cache = QueryCache({"cpu_limit": 300})
+    collect = FakeCollect({("cpu_limit", PODS[0]): 2.0, ("cpu_limit", PODS[1]): 4.0})
+    cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+
+    new_pod = ("shop", "batch")
+    collect.values[("cpu_limit", new_pod)] = 1.0
+    collect.queried.clear()
+    result = cache.collect({"{pod}": (QUERIES, PODS + [new_pod])}, collect)
+
+    assert [key for key in collect.queried if key[0] == "cpu_limit"] == [("cpu_limit", new_pod)]
+    assert {obj: metrics["cpu_limit"] for obj, metrics in result["{pod}"].items()} == {
+        PODS[0]: 2.0, PODS[1]: 4.0, new_pod: 1.0}
+    assert list(result["{pod}"][new_pod]) == list(QUERIES)
+
+
+def test_bulk_requeries_the_whole_metric_only_when_needed():
+    cache = QueryCache({"cpu_limit": 300})
+    collect = FakeCollect({("cpu_limit", PODS[0]): 2.0, ("cpu_limit", PODS[1]): 4.0}, bulk=True)
+    cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+
+    collect.queried.clear()
+    cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+    assert all(metric == "cpu_usage" for metric, _ in collect.queried)
+
+    cache.invalidate("{pod}", PODS[1])
+    collect.values[("cpu_limit", PODS[1])] = 8.0
+    collect.queried.clear()
+    result = cache.collect({"{pod}": (QUERIES, PODS)}, collect)
+    assert ("cpu_limit", PODS[0]) in collect.queried
+    assert result["{pod}"][PODS[1]]["cpu_limit"] == 8.0
@@ -0,0 +1,30 @@
+import sqlite3
+
+import pytest
+
+from db_schema import initialize_db
+from retention import create_rollup_tables, rollup
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    initialize_db(conn)
+    create_rollup_tables(conn)
+    yield conn
+    conn.close()
+
+
+def test_rollup_averages_numbers_and_keeps_the_last_text_value(conn):
+    # Three samples of one pod in the minute starting at 6000, out of order
+    for timestamp, cpu_usage, pod_phase in ((6020, 0.5, "Running"), (6040, 1.0, "Failed"), (6000, 0.0, "Pending")):
+        conn.execute("INSERT INTO pods (timestamp, namespace, pod_name, node_name, cpu_usage, restarts, pod_phase) "
+                     "VALUES (?, 'shop', 'web', 'node-a', ?, 1, ?)", (timestamp, cpu_usage, pod_phase))
+
+    rollup(conn, now=6060 + 3600 * 2)
+
+    bucket, samples, cpu_usage, restarts, pod_phase = conn.execute(
+        "SELECT bucket, samples, cpu_usage, restarts, pod_phase FROM pods_1m").fetchone()
+    assert (bucket, samples, restarts, pod_phase) == (6000, 3, 1.0, "Failed")
+    assert cpu_usage == pytest.approx(0.5)
+    assert conn.execute("SELECT pod_phase FROM pods_1h").fetchone() == ("Failed",)
@@ -0,0 +1,54 @@
+from tick_scheduler import TickScheduler
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def run_ticks(late, durations, start=1003.0, period=5, cycles=8):
+    """(tick, started at) of each run, with run i taking durations.get(tick, 0.1) seconds."""
+    clock = FakeClock(start)
+    runs = []
+
+    def task(tick):
+        runs.append((tick, clock.now))
+        clock.now += durations.get(tick, 0.1)
+
+    scheduler = TickScheduler(late=late, clock=clock, sleep=clock.sleep).every(period, task, "collect")
+    for _ in range(cycles):
+        clock.sleep(scheduler.run_pending())
+    return runs, scheduler.tasks[0]
+
+
+def test_on_time_ticks_all_run():
+    runs, task = run_ticks("skip", {})
+    assert [tick for tick, _ in runs[:4]] == [1005, 1010, 1015, 1020]
+    assert task.missed == 0 and task.overruns == 0
+
+
+def test_skip_waits_for_next_tick_after_short_overrun():
+    # The 1005 run finishes at 1012: 2 s past tick 1010, less than one period
+    runs, task = run_ticks("skip", {1005: 7})
+    assert [tick for tick, _ in runs[:3]] == [1005, 1015, 1020]
+    assert all(started - tick < 1 for tick, started in runs)
+    assert task.missed == 1 and task.overruns == 1
+
+
+def test_coalesce_runs_late_tick_at_once():
+    runs, task = run_ticks("coalesce", {1005: 7})
+    assert runs[:3] == [(1005, 1005), (1010, 1012), (1015, 1015)]
+    assert task.missed == 0 and task.overruns == 1
+
+
+def test_skip_after_overrun_of_several_periods():
+    # Finishes at 1018: ticks 1010 and 1015 are missed
+    runs, task = run_ticks("skip", {1005: 13})
+    assert [tick for tick, _ in runs[:2]] == [1005, 1020]
+    assert task.missed == 2
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from sequence_store import SamplingIntervals
+from train import ChunkedWindows, fit_preprocessing
+
+DATASET_4 = os.path.join(DATASETS, "Dataset_4.csv")
+
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    return fit_preprocessing([DATASET_4], 100000)
+
+
+def count_windows(preprocessor, chunksize):
+    batches = ChunkedWindows([DATASET_4], preprocessor, chunksize=chunksize, shuffle=False)
+    return sum(len(X) for X, _ in batches)
+
+
+def test_window_count_does_not_depend_on_chunksize(preprocessor):
+    whole = count_windows(preprocessor, 100000)
+    assert whole > 0
+    for chunksize in (500, 50):
+        assert count_windows(preprocessor, chunksize) == whole
+
+
+def test_max_gap_is_measured_over_all_chunks(tmp_path):
+    # Every 10 s, then every 25 s with one 50 s hole: the whole file's median
+    # (10 s) splits at the hole; a chunk of only 25 s samples alone would not
+    times = list(range(0, 1000, 10)) + [1000 + 25 * i for i in range(10)] + [1275 + 25 * i for i in range(10)]
+    csv = tmp_path / "metrics.csv"
+    pd.DataFrame({
+        "timestamp": pd.to_datetime(times, unit="s").strftime("%Y-%m-%d %H:%M:%S"),
+        "namespace": "shop",
+        "pod": "web",
+        "cpu_usage": np.arange(len(times), dtype=float),
+    }).to_csv(csv, index=False)
+
+    intervals = SamplingIntervals()
+    preprocessor = fit_preprocessing([csv], 7, intervals=intervals)
+    assert intervals.max_gap() == 30
+
+    counts = set()
+    for chunksize in (1000, 20, 7):
+        batches = ChunkedWindows([csv], preprocessor, chunksize=chunksize, shuffle=False)
+        assert batches.max_gap == 30
+        counts.add(sum(len(X) for X, _ in batches))
+    # 110 samples before the hole and 10 after; a window and its target take 11
+    assert counts == {110 - 10}